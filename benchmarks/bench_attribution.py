@@ -0,0 +1,138 @@
+import os
+import json
+import random
+import argparse
+
+from gene_construtor_utils import normalize_text, hybrid_similarity, AbstractIndex
+from geneset_constructor import _guess_pmids_for_extract, PMID_MATCH_THRESHOLD
+from benchmarks import synthetic
+
+# PMID attribution cost is per phenotype, so these run over a fixed number of
+# phenotypes whatever the scale (at most synthetic.ABSTRACT_SAMPLE have abstracts).
+SIMILARITY_PHENOTYPES = 5
+ATTRIBUTION_PHENOTYPES = 20
+
+# Regression fixture for AbstractIndex: abstracts and extracts with the PMID
+# that scoring every abstract with hybrid_similarity attributes them to.
+# Regenerate with: python -m benchmarks.bench_attribution
+FIXTURE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "attribution.json")
+FIXTURE_PHENOTYPES = 12
+
+
+def _sample(workload, n):
+    names = list(workload["abstracts"])[:n]
+    return [(workload["abstracts"][name], workload["extracted"][name]) for name in names]
+
+
+def brute_force_pmid(extract, abstracts, threshold=PMID_MATCH_THRESHOLD):
+    """The attribution before AbstractIndex: score every abstract, earliest wins ties."""
+    if not extract or not abstracts or not normalize_text(extract):
+        return None
+    scores = [
+        (str(doc.get("pmid", "")).strip(), hybrid_similarity(extract, doc.get("title", "") + " " + doc.get("abstract", "")))
+        for doc in abstracts
+    ]
+    scores.sort(key=lambda x: x[1], reverse=True)
+    top_pmid, top_score = scores[0]
+    return top_pmid if top_score >= threshold else None
+
+
+def make_attribution_fixture(n_phenotypes=FIXTURE_PHENOTYPES, seed=0):
+    """
+    Synthetic phenotypes plus the cases the index bounds have to get right:
+    heavy paraphrases that land near the threshold, duplicated abstracts
+    (ties), quotes spliced from two abstracts, unrelated text and empty extracts.
+    """
+    workload = synthetic.make_workload(n_phenotypes, seed, abstract_sample=n_phenotypes)
+    rng = random.Random(f"attribution-{seed}")
+    cases = []
+    for name, docs in workload["abstracts"].items():
+        docs = [dict(d) for d in docs]
+        for d in rng.sample(docs, 2):
+            docs.append(dict(d, pmid=str(int(d["pmid"]) + 5000)))
+
+        extracts = [e["Source Reference"] for e in workload["extracted"][name]]
+        for e in list(extracts):
+            words = e.split()
+            for keep in (0.6, 0.45, 0.3):
+                extracts.append(" ".join(w for w in words if rng.random() < keep))
+        for _ in range(3):
+            a, b = rng.sample(docs, 2)
+            extracts.append(" ".join(a["abstract"].split()[:12] + b["abstract"].split()[-12:]))
+        extracts.append(" ".join(rng.choice(synthetic.WORDS) for _ in range(15)))
+        extracts += ["", "...", docs[0]["title"]]
+
+        cases.append({
+            "phenotype": name,
+            "abstracts": docs,
+            "extracts": [{"text": e, "pmid": brute_force_pmid(e, docs)} for e in extracts],
+        })
+    return {"threshold": PMID_MATCH_THRESHOLD, "cases": cases}
+
+
+def test_index_matches_hybrid_similarity():
+    """AbstractIndex attributes every fixture extract as brute-force scoring does."""
+    with open(FIXTURE_FILE) as f:
+        fixture = json.load(f)
+    assert fixture["threshold"] == PMID_MATCH_THRESHOLD
+
+    mismatches = []
+    for case in fixture["cases"]:
+        index = AbstractIndex(case["abstracts"])
+        for e in case["extracts"]:
+            expected = [e["pmid"]] if e["pmid"] else []
+            reference = brute_force_pmid(e["text"], case["abstracts"])
+            got = _guess_pmids_for_extract(e["text"], index)
+            if got != expected or reference != e["pmid"]:
+                mismatches.append((case["phenotype"], e["text"][:60], expected, reference, got))
+    assert not mismatches, mismatches
+
+
+def bench_hybrid_similarity(benchmark, workload):
+    pairs = [
+        (e["Source Reference"], d["title"] + " " + d["abstract"])
+        for docs, entries in _sample(workload, SIMILARITY_PHENOTYPES)
+        for e in entries for d in docs
+    ]
+    benchmark.extra_info["pairs"] = len(pairs)
+    benchmark(lambda: [hybrid_similarity(extract, text) for extract, text in pairs])
+
+
+def bench_guess_pmids(benchmark, workload):
+    """One AbstractIndex per phenotype, as _correct_extracted_pmids_for_phenotype does."""
+    sample = _sample(workload, ATTRIBUTION_PHENOTYPES)
+    benchmark.extra_info["extracts"] = sum(len(entries) for _, entries in sample)
+
+    def run():
+        for docs, entries in sample:
+            index = AbstractIndex(docs)
+            for e in entries:
+                _guess_pmids_for_extract(e["Source Reference"], index)
+
+    benchmark(run)
+
+
+def bench_guess_pmids_unindexed(benchmark, workload):
+    """Abstract lists passed directly (an index is built per call)."""
+    sample = _sample(workload, SIMILARITY_PHENOTYPES)
+
+    def run():
+        for docs, entries in sample:
+            for e in entries:
+                _guess_pmids_for_extract(e["Source Reference"], docs)
+
+    benchmark(run)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate the PMID attribution regression fixture.")
+    parser.add_argument("--phenotypes", type=int, default=FIXTURE_PHENOTYPES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fixture = make_attribution_fixture(args.phenotypes, args.seed)
+    os.makedirs(os.path.dirname(FIXTURE_FILE), exist_ok=True)
+    with open(FIXTURE_FILE, "w") as f:
+        json.dump(fixture, f, indent=1)
+    n = sum(len(c["extracts"]) for c in fixture["cases"])
+    print(f"Wrote {n} extracts over {len(fixture['cases'])} phenotypes to {FIXTURE_FILE}")
@@ -0,0 +1,16 @@
+from geneset_constructor import merge_extracted_and_verified
+from utils import check_is_gene_annotated
+
+
+def bench_merge_extracted_and_verified(benchmark, workload):
+    benchmark.extra_info["extracted"] = sum(len(v) for v in workload["extracted"].values())
+    benchmark.extra_info["verified"] = sum(len(v) for v in workload["verified"].values())
+    merged = benchmark(merge_extracted_and_verified, workload["extracted"], workload["verified"])
+    assert len(merged) == len(workload["phenotypes"])
+
+
+def bench_check_is_gene_annotated(benchmark, workload):
+    pmids, ga_pmids = workload["candidate_pmids"], workload["ga_pmids"]
+    benchmark.extra_info["pmids"] = len(pmids)
+    kept = benchmark(check_is_gene_annotated, pmids, ga_pmids)
+    assert len(kept) >= len(ga_pmids)
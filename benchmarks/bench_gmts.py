@@ -0,0 +1,38 @@
+import os
+import shutil
+
+from construct_llms_gmts import make_consensus_gmt
+from evaluation import parse_gmt, compare_similarity
+from genesets import CACHE_SUFFIX
+from benchmarks.synthetic import MODELS
+
+
+def _drop_cache(path):
+    shutil.rmtree(path + CACHE_SUFFIX, ignore_errors=True)
+
+
+def bench_parse_gmt_cold(benchmark, gmt_files):
+    """First load of a GMT: parse the text and write its binary cache."""
+    path = gmt_files["reference"]
+    benchmark.pedantic(parse_gmt, args=(path, "HP_"), setup=lambda: _drop_cache(path), rounds=5)
+
+
+def bench_parse_gmt_cached(benchmark, gmt_files):
+    path = gmt_files["reference"]
+    parse_gmt(path)
+    sets = benchmark(parse_gmt, path, "HP_")
+    assert sets
+
+
+def bench_make_consensus_gmt(benchmark, gmt_files, tmp_path):
+    for model in MODELS:
+        parse_gmt(gmt_files[model])
+    out_gmt = str(tmp_path / "consensus_gene_sets.gmt")
+    benchmark(make_consensus_gmt, *(gmt_files[m] for m in MODELS), out_gmt)
+    assert os.path.getsize(out_gmt) > 0
+
+
+def bench_compare_similarity(benchmark, gmt_files, tmp_path):
+    original, new = parse_gmt(gmt_files["reference"]), parse_gmt(gmt_files[MODELS[0]])
+    stats = benchmark(compare_similarity, original, new, str(tmp_path / "gene_set_similarity.csv"))
+    assert stats["per_set"]["names"]
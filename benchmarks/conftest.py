@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks import synthetic
+
+# Workloads are generated once per scale and shared by every benchmark.
+# Each benchmark is parametrized by scale, so saved results are compared
+# scale by scale ("bench_merge[1000]").
+_workloads = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--scale", type=int, action="append", default=None,
+        help=f"Number of synthetic phenotypes; repeat for several scales (default: {synthetic.SCALES[0]}).",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = metafunc.config.getoption("scale") or [synthetic.SCALES[0]]
+        metafunc.parametrize("scale", scales, scope="session")
+
+
+@pytest.fixture(scope="session")
+def workload(scale):
+    if scale not in _workloads:
+        _workloads[scale] = synthetic.make_workload(scale)
+    return _workloads[scale]
+
+
+@pytest.fixture(scope="session")
+def gmt_files(workload, scale, tmp_path_factory):
+    """{"reference": path, <model>: path} for the workload's GMTs."""
+    gmt_dir = tmp_path_factory.mktemp(f"gmt_{scale}")
+    paths = {"reference": str(gmt_dir / "reference.gmt")}
+    synthetic.write_gmt(paths["reference"], workload["reference"])
+    for model, sets in zip(synthetic.MODELS, workload["models"]):
+        paths[model] = str(gmt_dir / f"{model}.gmt")
+        synthetic.write_gmt(paths[model], sets)
+    return paths
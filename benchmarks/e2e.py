@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+import subprocess
+
+from benchmarks import synthetic, ollama_sim, pubtator_sim
+
+# End-to-end throughput run of main.py (maker + checker) against the simulated
+# Ollama and PubTator servers, in a scratch directory laid out as the pipeline
+# expects (input phenotypes, out/phenotype_to_gene_sets.txt, abstracts/pmids.txt).
+# Arguments it does not know are passed on to main.py (e.g. --schedule sjf).
+# The pipelines' own PubTator pacing (0.3 s per search page, 3 exports per
+# second) is real time and is not affected by --time_scale.
+# The run fails if a generation stage made no LLM calls or a maker model wrote
+# no gene set, since throughput measured without generation is meaningless.
+# A work dir holding a previous run's state (STATE_PATHS) is refused unless
+# --clean removes it first: main.py would skip the phenotypes it already
+# processed, and the counts and trace would be the old run's.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUMMARY_FILE = "e2e_summary.json"
+STATE_PATHS = ("out", "abstracts/gene_annotated_abstracts", "abstracts/gene_related_abstracts", "checked_pmids.json")
+GENERATE_STAGES = ("generate_qwen", "generate_deepseek", "generate_llama3", "gen_llama")
+
+
+def previous_state(work_dir):
+    """Paths in work_dir left by an earlier run."""
+    return [p for p in STATE_PATHS if os.path.exists(os.path.join(work_dir, p))]
+
+
+def clear_state(work_dir):
+    for p in previous_state(work_dir):
+        path = os.path.join(work_dir, p)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def prepare_work_dir(work_dir, n_phenotypes, genes_per_set, seed=0):
+    """Write the pipeline inputs for n synthetic phenotypes; returns the input file."""
+    os.makedirs(os.path.join(work_dir, "out"), exist_ok=True)
+    os.makedirs(os.path.join(work_dir, "abstracts"), exist_ok=True)
+
+    phenotypes = synthetic.make_phenotypes(n_phenotypes, seed)
+    for p in phenotypes:
+        p["definition"] = p["description"]
+    input_file = os.path.join(work_dir, "out", "e2e_phenotypes.json")
+    with open(input_file, "w") as f:
+        json.dump(phenotypes, f, indent=2)
+
+    reference = synthetic.reference_gene_sets(phenotypes, synthetic.gene_symbols(seed=seed), seed)
+    with open(os.path.join(work_dir, "out", "phenotype_to_gene_sets.txt"), "w") as f:
+        f.write("hpo_id\thpo_name\tgenes\n")
+        for p in phenotypes:
+            genes = reference[synthetic.msigdb_name(p)][:genes_per_set]
+            f.write(f"{p['id']}\t{p['name']}\t{','.join(genes)}\n")
+
+    pmids_file = os.path.join(work_dir, "abstracts", "pmids.txt")
+    if not os.path.exists(pmids_file):
+        with open(pmids_file, "w") as f:
+            f.writelines(f"{pmid}\n" for pmid in pubtator_sim.gene_annotated_pmids())
+    return input_file
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def _get_json(url):
+    import requests
+    try:
+        return requests.get(url, timeout=10).json()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def check_generation(work_dir):
+    """
+    LLM calls per generation stage from the trace, and a list of problems:
+    stages that made no calls and maker models without generation outputs.
+    """
+    from tracing import load_trace
+    from utils import MAKER_MODELS
+
+    trace_file = os.path.join(work_dir, "out", "traces", "pipeline_trace.jsonl")
+    records = load_trace(trace_file) if os.path.exists(trace_file) else []
+    calls = {stage: 0 for stage in GENERATE_STAGES}
+    for r in records:
+        if r.get("type") == "node" and r.get("stage") in calls:
+            calls[r["stage"]] += r.get("llm_calls", 0)
+
+    problems = [f"stage {stage} made no LLM calls" for stage, n in calls.items() if n == 0]
+    for model in MAKER_MODELS:
+        out_dir = os.path.join(work_dir, "out", "phenotype_generations", model)
+        if not os.path.isdir(out_dir) or not any(f.endswith(".json") for f in os.listdir(out_dir)):
+            problems.append(f"no generation outputs for {model}")
+    return calls, problems
+
+
+def run(args, main_args):
+    work_dir = os.path.abspath(args.work_dir)
+    if args.clean:
+        clear_state(work_dir)
+    input_file = prepare_work_dir(work_dir, args.phenotypes, args.genes_per_set, args.seed)
+
+    servers = []
+    ollama_url, pubtator_url = args.ollama_host, args.pubtator_url
+    if not ollama_url:
+        server = ollama_sim.make_server(
+            port=0, profiles=ollama_sim.load_profiles(args.profiles), num_parallel=args.num_parallel,
+            max_loaded=args.max_loaded, time_scale=args.time_scale, malformed_rate=args.malformed_rate,
+            relevance=args.relevance, seed=args.seed,
+        )
+        servers.append(server)
+        ollama_url = _serve(server)
+    if not pubtator_url:
+        server = pubtator_sim.make_server(
+            port=0, max_pages=args.max_pages, latency=args.pubtator_latency,
+            error_rate=args.pubtator_error_rate, time_scale=args.time_scale, seed=args.seed,
+        )
+        servers.append(server)
+        pubtator_url = _serve(server)
+    print(f"Ollama: {ollama_url}\nPubTator: {pubtator_url}\nWork dir: {work_dir}")
+
+    env = dict(os.environ, OLLAMA_HOST=ollama_url, PUBTATOR_BASE_URL=pubtator_url,
+               PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])))
+    command = [sys.executable, os.path.join(REPO_DIR, "main.py"), "--input_file", input_file, *main_args]
+    log_path = os.path.join(work_dir, "e2e.log")
+
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        returncode = subprocess.run(command, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+    wall = time.perf_counter() - start
+
+    processed_file = os.path.join(work_dir, "out", "processed_phenotypes.txt")
+    processed = 0
+    if os.path.exists(processed_file):
+        with open(processed_file) as f:
+            processed = len({line.strip() for line in f if line.strip()})
+
+    generate_calls, problems = check_generation(work_dir)
+    summary = {
+        "command": command[1:],
+        "returncode": returncode,
+        "generate_calls": generate_calls,
+        "problems": problems,
+        "wall_seconds": wall,
+        "phenotypes": args.phenotypes,
+        "processed": processed,
+        "phenotypes_per_hour": processed / wall * 3600 if wall else 0.0,
+        "time_scale": args.time_scale,
+        "ollama": _get_json(f"{ollama_url}/sim/stats"),
+        "pubtator": _get_json(f"{pubtator_url}/sim/stats"),
+    }
+    for server in servers:
+        server.shutdown()
+    with open(os.path.join(work_dir, SUMMARY_FILE), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def print_report(summary, work_dir):
+    print(f"\nmain.py exited with {summary['returncode']} after {summary['wall_seconds']:.1f}s "
+          f"(log: {os.path.join(work_dir, 'e2e.log')})")
+    print(f"Processed {summary['processed']}/{summary['phenotypes']} phenotypes "
+          f"({summary['phenotypes_per_hour']:.1f} per hour)")
+
+    models = summary["ollama"].get("models", {})
+    if models:
+        print(f"\n{'model':<20}{'calls':>8}{'prompt tok':>12}{'output tok':>12}{'malformed':>11}"
+              f"{'loads':>7}{'evicted':>9}{'queue s':>10}{'busy s':>10}")
+        for model, s in sorted(models.items()):
+            print(f"{model:<20}{s['requests']:>8}{s['prompt_tokens']:>12}{s['eval_tokens']:>12}{s['malformed']:>11}"
+                  f"{s['loads']:>7}{s['evictions']:>9}{s['queue_seconds']:>10.1f}{s['busy_seconds']:>10.1f}")
+        print("(queue and busy seconds are simulated time)")
+    pubtator = summary["pubtator"]
+    if "search" in pubtator:
+        print(f"\nPubTator: {pubtator['search']} searches, {pubtator['export']} exports, {pubtator['errors']} errors")
+
+    trace_file = os.path.join(work_dir, "out", "traces", "pipeline_trace.jsonl")
+    if os.path.exists(trace_file):
+        from tracing import print_summary
+        print()
+        print_summary(trace_file)
+
+    print("\nGeneration LLM calls: " + ", ".join(f"{k} {v}" for k, v in summary["generate_calls"].items()))
+    for problem in summary["problems"]:
+        print(f"FAILED: {problem}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run main.py end to end against simulated Ollama and PubTator servers. "
+                    "Unknown arguments are passed to main.py."
+    )
+    parser.add_argument("--work_dir", type=str, required=True, help="Scratch directory the pipeline runs in.")
+    parser.add_argument("--clean", action="store_true",
+                        help="Remove a previous run's outputs, abstracts and trace from the work dir first.")
+    parser.add_argument("--phenotypes", type=int, default=5)
+    parser.add_argument("--genes_per_set", type=int, default=3, help="Genes per phenotype for the checker.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time_scale", type=float, default=0.1, help="Multiplier on simulated delays.")
+    parser.add_argument("--ollama_host", type=str, default=None, help="Use a running server instead of starting one.")
+    parser.add_argument("--pubtator_url", type=str, default=None, help="Use a running server instead of starting one.")
+    parser.add_argument("--profiles", type=str, default=None, help="Model profiles JSON (see ollama_sim.py).")
+    parser.add_argument("--num_parallel", type=int, default=None)
+    parser.add_argument("--max_loaded", type=int, default=None)
+    parser.add_argument("--malformed_rate", type=float, default=0.05)
+    parser.add_argument("--relevance", type=float, default=0.5)
+    parser.add_argument("--max_pages", type=int, default=1, help="Most PubTator search pages per query.")
+    parser.add_argument("--pubtator_latency", type=float, default=0.05)
+    parser.add_argument("--pubtator_error_rate", type=float, default=0.0)
+    args, main_args = parser.parse_known_args()
+    leftover = previous_state(os.path.abspath(args.work_dir))
+    if leftover and not args.clean:
+        parser.error(f"{args.work_dir} holds a previous run ({', '.join(leftover)}); "
+                     "pass --clean to remove it or use a new --work_dir")
+
+    summary = run(args, main_args)
+    print_report(summary, os.path.abspath(args.work_dir))
+    sys.exit(summary["returncode"] or (1 if summary["problems"] else 0))
@@ -0,0 +1,65 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported by the CLIs and by every worker process
+MODULES = [
+    "utils",
+    "instructs",
+    "pubtator",
+    "rag_pipeline_gene_set_maker",
+    "rag_pipeline_gene_checker",
+    "geneset_constructor",
+    "construct_llms_gmts",
+    "evaluation",
+    "similarity_plot",
+    "lost_genes_plot",
+    "new_genes_plot",
+    "phenotype_extractor",
+    "main",
+]
+
+
+def time_command(args, repeats):
+    """Median wall time in seconds of a fresh interpreter running args."""
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run(args, cwd=REPO_DIR, env=env, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+    return statistics.median(times), None
+
+
+def run(modules, repeats):
+    baseline, _ = time_command([sys.executable, "-c", "pass"], repeats)
+    print(f"Interpreter start-up: {baseline * 1000:.0f} ms (subtracted below)\n")
+    print(f"{'target':<40}{'ms':>10}")
+
+    rows = [(m, [sys.executable, "-c", f"import {m}"]) for m in modules]
+    rows.append(("evaluation.py --help", [sys.executable, "evaluation.py", "--help"]))
+
+    results = {}
+    for label, args in rows:
+        seconds, error = time_command(args, repeats)
+        if error:
+            print(f"{label:<40}{'error':>10}  {error}")
+            continue
+        results[label] = max(seconds - baseline, 0.0)
+        print(f"{label:<40}{results[label] * 1000:>10.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the import time of the pipeline modules.")
+    parser.add_argument("--modules", nargs="+", default=MODULES, help="Modules to import (default: all).")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module; the median is reported.")
+    args = parser.parse_args()
+    run(args.modules, args.repeats)
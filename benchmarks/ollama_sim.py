@@ -0,0 +1,441 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Stand-in for the Ollama chat API, for load-testing the pipelines without GPUs.
+# POST /api/chat answers with canned replies streamed as NDJSON, paced like a
+# real server:
+#   - prefill and decode tokens per second per model (PROFILES)
+#   - model load latency, and eviction of the least recently used idle model
+#     (swap) when OLLAMA_MAX_LOADED_MODELS are loaded; idle models unload
+#     after keep_alive seconds
+#   - OLLAMA_NUM_PARALLEL slots per model, sharing its decode throughput, and
+#     a 503 once OLLAMA_MAX_QUEUE requests are waiting
+#   - a malformed_rate share of replies is broken: truncated in JSON mode,
+#     otherwise also fenced, wrapped in prose or given trailing commas
+# Replies are decided by the prompt: {"binary_score"} for graders, gene lists
+# for the maker (genes are read from the abstracts in the context), a
+# Validation object for the checker. Thinking models prefix a <think> block.
+# All sleeps are multiplied by time_scale; the durations reported in the final
+# chunk (load_duration, prompt_eval_duration, ...) are divided by it, so they
+# stay in simulated time. GET /sim/stats returns per-model counters.
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = 4
+SIM_VERSION = "0.0.0-sim"
+
+PROFILES = {
+    "qwen3:32b": {"prefill_tps": 900, "decode_tps": 25, "load_seconds": 14.0, "unload_seconds": 1.0, "think": True},
+    "deepseek-r1:8b": {"prefill_tps": 2500, "decode_tps": 70, "load_seconds": 5.0, "unload_seconds": 0.5, "think": True},
+    "llama3.1:8b": {"prefill_tps": 3000, "decode_tps": 80, "load_seconds": 4.0, "unload_seconds": 0.5, "think": False},
+}
+DEFAULT_PROFILE = {"prefill_tps": 2000, "decode_tps": 50, "load_seconds": 5.0, "unload_seconds": 0.5, "think": False}
+
+# Symbols as generated by benchmarks/synthetic.gene_symbols
+GENE = re.compile(r"\b[A-Z]{2,4}\d{1,2}\b")
+DOC = re.compile(r"PMID: (\d+)\nTitle: .*?\nJournal: (.*?)\nAbstract: (.*?)(?=\n\nPMID: |\Z)", re.DOTALL)
+
+
+class ServerBusy(Exception):
+    pass
+
+
+# REPLIES
+def classify(messages):
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = " ".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    if "binary_score" in system:
+        return "grade"
+    if "Identify genes associated with phenotype" in user:
+        return "extract"
+    if "Is gene '" in user:
+        return "check"
+    return "chat"
+
+
+def _sentence_with(text, word):
+    for sentence in re.split(r"(?<=\.)\s+", text):
+        if word in sentence:
+            return sentence
+    return ""
+
+
+def reply(kind, messages, rng, relevance):
+    """The well-formed reply to a prompt, as a JSON string."""
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    if kind == "grade":
+        return json.dumps({"binary_score": "yes" if rng.random() < relevance else "no"})
+
+    if kind == "extract":
+        entries, seen = [], set()
+        for pmid, journal, abstract in DOC.findall(user):
+            for gene in GENE.findall(abstract):
+                if gene not in seen:
+                    seen.add(gene)
+                    entries.append({"Gene": gene, "Source Reference": _sentence_with(abstract, gene),
+                                    "PMID": pmid, "Journal": journal.strip()})
+        return json.dumps(entries, indent=2)
+
+    if kind == "check":
+        m = re.search(r"Is gene '([^']+)'", user)
+        gene = m.group(1) if m else ""
+        docs = DOC.findall(user)
+        support = next((_sentence_with(a, gene) for _, _, a in docs if gene and gene in a), "")
+        valid = bool(support) and rng.random() < 0.9
+        return json.dumps({
+            "Gene": gene,
+            "Validation": "yes" if valid else "no",
+            "Supporting Extract": support if valid else "",
+            "PMIDS": [pmid for pmid, _, a in docs if gene and gene in a] if valid else [],
+        })
+
+    return json.dumps({"response": "ok"})
+
+
+def think_block(rng):
+    words = ["the", "abstract", "mentions", "gene", "phenotype", "so", "check", "whether", "evidence", "supports"]
+    return "<think>\n" + " ".join(rng.choice(words) for _ in range(rng.randint(40, 160))) + "\n</think>\n\n"
+
+
+def malform(text, rng, json_mode):
+    """Break a reply the way local models do."""
+    cut = text[:max(1, int(len(text) * rng.uniform(0.3, 0.9)))]
+    if json_mode:
+        return cut
+    kind = rng.choice(["truncate", "fence", "prose", "trailing_comma"])
+    if kind == "truncate":
+        return cut
+    if kind == "fence":
+        return f"```json\n{text}\n```"
+    if kind == "prose":
+        return f"Here is the requested JSON:\n{text}\nLet me know if you need anything else."
+    return re.sub(r"(\"|\d|\])(\s*)([}\]])", r"\1,\2\3", text, count=3)
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+# SCHEDULER
+class Scheduler:
+    """Loaded models, their busy slots and the request queue, under one condition variable."""
+
+    def __init__(self, profiles, num_parallel=1, max_loaded=1, max_queue=512, keep_alive=300.0,
+                 batch_efficiency=0.6, time_scale=1.0):
+        if time_scale <= 0:
+            raise ValueError(f"time_scale must be positive, got {time_scale}")
+        self.profiles = profiles
+        self.num_parallel = num_parallel
+        self.max_loaded = max_loaded
+        self.max_queue = max_queue
+        self.keep_alive = keep_alive
+        self.batch_efficiency = batch_efficiency
+        self.time_scale = time_scale
+        self.cond = threading.Condition()
+        self.loaded = {}  # model -> {"active", "last_used"}
+        self.loading = set()
+        self.queued = 0
+        self.stats = {}
+        self.rejected = 0
+
+    def profile(self, model):
+        return self.profiles.get(model, DEFAULT_PROFILE)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def model_stats(self, model):
+        return self.stats.setdefault(model, {
+            "requests": 0, "prompt_tokens": 0, "eval_tokens": 0, "malformed": 0,
+            "loads": 0, "evictions": 0, "queue_seconds": 0.0, "busy_seconds": 0.0,
+        })
+
+    def _expire(self, now):
+        for model, entry in list(self.loaded.items()):
+            if entry["active"] == 0 and now - entry["last_used"] > self.keep_alive * self.time_scale:
+                del self.loaded[model]
+
+    def _make_room(self):
+        """(True, evicted model or None) if another model can be loaded now."""
+        if len(self.loaded) + len(self.loading) < self.max_loaded:
+            return True, None
+        idle = [(e["last_used"], m) for m, e in self.loaded.items() if e["active"] == 0]
+        if not idle:
+            return False, None
+        _, victim = min(idle)
+        del self.loaded[victim]
+        self.model_stats(victim)["evictions"] += 1
+        return True, victim
+
+    def acquire(self, model):
+        """Block until model is loaded with a free slot; returns the seconds spent loading it."""
+        start = time.monotonic()
+        with self.cond:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ServerBusy()
+            self.queued += 1
+            load_seconds = 0.0
+            try:
+                while True:
+                    self._expire(time.monotonic())
+                    entry = self.loaded.get(model)
+                    if entry is not None and entry["active"] < self.num_parallel:
+                        entry["active"] += 1
+                        self.model_stats(model)["queue_seconds"] += (time.monotonic() - start) / self.time_scale
+                        return load_seconds
+                    if entry is None and model not in self.loading:
+                        room, evicted = self._make_room()
+                        if room:
+                            self.loading.add(model)
+                            seconds = self.profile(model)["load_seconds"]
+                            if evicted:
+                                seconds += self.profile(evicted)["unload_seconds"]
+                            self.cond.release()
+                            try:
+                                self.sleep(seconds)
+                            finally:
+                                self.cond.acquire()
+                            self.loading.discard(model)
+                            self.loaded[model] = {"active": 0, "last_used": time.monotonic()}
+                            self.model_stats(model)["loads"] += 1
+                            load_seconds += seconds
+                            self.cond.notify_all()
+                            continue
+                    self.cond.wait(timeout=1.0)
+            finally:
+                self.queued -= 1
+
+    def release(self, model, busy_seconds):
+        with self.cond:
+            entry = self.loaded.get(model)
+            if entry is not None:
+                entry["active"] -= 1
+                entry["last_used"] = time.monotonic()
+            self.model_stats(model)["busy_seconds"] += busy_seconds / self.time_scale
+            self.cond.notify_all()
+
+    def decode_rate(self, model):
+        """Tokens per second of one request, with the model's slots sharing its throughput."""
+        with self.cond:
+            entry = self.loaded.get(model)
+            active = max(1, entry["active"] if entry else 1)
+        aggregate = self.profile(model)["decode_tps"] * (1 + (active - 1) * self.batch_efficiency)
+        return aggregate / active
+
+    def snapshot(self):
+        with self.cond:
+            return {
+                "loaded": {m: e["active"] for m, e in self.loaded.items()},
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "models": json.loads(json.dumps(self.stats)),
+            }
+
+
+# HTTP
+class OllamaHandler(BaseHTTPRequestHandler):
+    server_version = "OllamaSim"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def do_GET(self):
+        scheduler = self.server.scheduler
+        if self.path == "/":
+            data = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/api/version":
+            self._json(200, {"version": SIM_VERSION})
+        elif self.path == "/api/tags":
+            self._json(200, {"models": [{"name": m, "model": m} for m in scheduler.profiles]})
+        elif self.path == "/api/ps":
+            self._json(200, {"models": [{"name": m, "model": m} for m in scheduler.snapshot()["loaded"]]})
+        elif self.path == "/sim/stats":
+            self._json(200, scheduler.snapshot())
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self._json(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except json.JSONDecodeError as e:
+            self._json(400, {"error": f"invalid JSON: {e}"})
+            return
+        model = request.get("model")
+        if not model:
+            self._json(400, {"error": "model is required"})
+            return
+        self.server.chat(self, request)
+
+
+class OllamaSimServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, scheduler, malformed_rate=0.05, relevance=0.5, seed=0):
+        super().__init__(address, OllamaHandler)
+        self.scheduler = scheduler
+        self.malformed_rate = malformed_rate
+        self.relevance = relevance
+        self.seed = seed
+
+    def chat(self, handler, request):
+        scheduler = self.scheduler
+        model = request["model"]
+        messages = request.get("messages", [])
+        json_mode = request.get("format") is not None
+        profile = scheduler.profile(model)
+
+        # temperature 0: the same prompt always gets the same reply
+        digest = hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode("utf-8")).hexdigest()
+        rng = random.Random(f"{self.seed}:{digest}")
+        text = reply(classify(messages), messages, rng, self.relevance)
+        malformed = rng.random() < self.malformed_rate
+        if malformed:
+            text = malform(text, rng, json_mode)
+        if profile.get("think") and not json_mode:
+            text = think_block(rng) + text
+
+        prompt_tokens = estimate_tokens("".join(m.get("content", "") for m in messages))
+        pieces = re.findall(r".{1,%d}" % (CHUNK_TOKENS * CHARS_PER_TOKEN), text, re.DOTALL)
+
+        start = time.monotonic()
+        try:
+            load_seconds = scheduler.acquire(model)
+        except ServerBusy:
+            handler._json(503, {"error": "server busy, please try again. maximum pending requests exceeded"})
+            return
+        slot_start = time.monotonic()
+        try:
+            stats = scheduler.model_stats(model)
+            with scheduler.cond:
+                stats["requests"] += 1
+                stats["prompt_tokens"] += prompt_tokens
+                stats["eval_tokens"] += len(pieces) * CHUNK_TOKENS
+                stats["malformed"] += malformed
+
+            scheduler.sleep(prompt_tokens / profile["prefill_tps"])
+            prefill_end = time.monotonic()
+
+            stream = request.get("stream", True)
+            if stream:
+                handler.send_response(200)
+                handler.send_header("Content-Type", "application/x-ndjson")
+                handler.end_headers()
+            for piece in pieces:
+                scheduler.sleep(CHUNK_TOKENS / scheduler.decode_rate(model))
+                if stream:
+                    self._write_line(handler, {
+                        "model": model, "created_at": _now(),
+                        "message": {"role": "assistant", "content": piece}, "done": False,
+                    })
+            end = time.monotonic()
+
+            scale = scheduler.time_scale
+            final = {
+                "model": model, "created_at": _now(),
+                "message": {"role": "assistant", "content": "" if stream else text},
+                "done": True, "done_reason": "stop",
+                "total_duration": int((end - start) / scale * 1e9),
+                "load_duration": int(load_seconds * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int((prefill_end - slot_start) / scale * 1e9),
+                "eval_count": len(pieces) * CHUNK_TOKENS,
+                "eval_duration": int((end - prefill_end) / scale * 1e9),
+            }
+            if stream:
+                self._write_line(handler, final)
+            else:
+                handler._json(200, final)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            scheduler.release(model, time.monotonic() - slot_start)
+
+    @staticmethod
+    def _write_line(handler, obj):
+        handler.wfile.write(json.dumps(obj).encode("utf-8") + b"\n")
+        handler.wfile.flush()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def load_profiles(path=None):
+    """PROFILES, updated from a JSON file {model: {field: value}} (missing fields from DEFAULT_PROFILE)."""
+    profiles = {m: dict(p) for m, p in PROFILES.items()}
+    if path:
+        with open(path, "r") as f:
+            for model, fields in json.load(f).items():
+                profiles[model] = {**DEFAULT_PROFILE, **profiles.get(model, {}), **fields}
+    return profiles
+
+
+def make_server(host="127.0.0.1", port=11434, profiles=None, num_parallel=None, max_loaded=None,
+                max_queue=None, keep_alive=300.0, batch_efficiency=0.6, time_scale=1.0,
+                malformed_rate=0.05, relevance=0.5, seed=0):
+    """A server ready for serve_forever(); limits default to the OLLAMA_* variables as in Ollama."""
+    scheduler = Scheduler(
+        profiles or load_profiles(),
+        num_parallel=num_parallel or int(os.environ.get("OLLAMA_NUM_PARALLEL", 1)),
+        max_loaded=max_loaded or int(os.environ.get("OLLAMA_MAX_LOADED_MODELS", 1)),
+        max_queue=max_queue or int(os.environ.get("OLLAMA_MAX_QUEUE", 512)),
+        keep_alive=keep_alive,
+        batch_efficiency=batch_efficiency,
+        time_scale=time_scale,
+    )
+    return OllamaSimServer((host, port), scheduler, malformed_rate=malformed_rate, relevance=relevance, seed=seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated Ollama chat server for load tests.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--profiles", type=str, default=None,
+                        help="JSON file {model: {prefill_tps, decode_tps, load_seconds, unload_seconds, think}}.")
+    parser.add_argument("--num_parallel", type=int, default=None, help="Slots per model (default: OLLAMA_NUM_PARALLEL or 1).")
+    parser.add_argument("--max_loaded", type=int, default=None,
+                        help="Models kept loaded at once (default: OLLAMA_MAX_LOADED_MODELS or 1).")
+    parser.add_argument("--max_queue", type=int, default=None, help="Waiting requests before 503 (default: OLLAMA_MAX_QUEUE or 512).")
+    parser.add_argument("--keep_alive", type=float, default=300.0, help="Seconds an idle model stays loaded.")
+    parser.add_argument("--batch_efficiency", type=float, default=0.6,
+                        help="Throughput each extra busy slot adds, as a share of one slot's.")
+    parser.add_argument("--time_scale", type=float, default=1.0, help="Multiplier on every simulated delay (0.1 = 10x faster).")
+    parser.add_argument("--malformed_rate", type=float, default=0.05, help="Share of replies that are broken JSON.")
+    parser.add_argument("--relevance", type=float, default=0.5, help="Share of abstracts graders keep.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host, args.port, load_profiles(args.profiles), args.num_parallel, args.max_loaded, args.max_queue,
+        args.keep_alive, args.batch_efficiency, args.time_scale, args.malformed_rate, args.relevance, args.seed,
+    )
+    print(f"Simulated Ollama listening on http://{args.host}:{args.port} "
+          f"({server.scheduler.num_parallel} slots per model, {server.scheduler.max_loaded} loaded at once)")
+    server.serve_forever()
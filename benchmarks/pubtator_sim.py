@@ -0,0 +1,184 @@
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.synthetic import WORDS, JOURNALS, gene_symbols
+
+# Stand-in for the two PubTator3 endpoints the pipelines use (see pubtator.py):
+#   GET /search/?text=...&page=N                     -> {"results": [{"pmid"}], "total_pages"}
+#   GET /publications/export/biocjson?pmids=<pmid>   -> {"PubTator3": [{"journal", "passages"}]}
+# Results are derived from the query and the PMID, so they are the same on
+# every run. PMIDs come from PMID_SPACE; an ANNOTATED_RATE share of them have
+# gene annotations (gene_annotated_pmids lists those, for abstracts/pmids.txt).
+# Gene queries ("@GENE_X AND ...") return abstracts that mention X.
+# Each request waits latency * time_scale seconds; error_rate of them get a 503.
+FIRST_PMID = 30000000
+PMID_SPACE = 100000
+ANNOTATED_RATE = 0.85
+RESULTS_PER_PAGE = 10
+
+
+def gene_annotated_pmids():
+    return [pmid for pmid in range(FIRST_PMID, FIRST_PMID + PMID_SPACE) if _has_genes(pmid)]
+
+
+def _has_genes(pmid):
+    return random.Random(f"annotated-{pmid}").random() < ANNOTATED_RATE
+
+
+def _words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+class Literature:
+    """Deterministic search results and abstracts."""
+
+    def __init__(self, max_pages=2, seed=0):
+        self.max_pages = max_pages
+        self.seed = seed
+        self.genes = gene_symbols(seed=seed)
+        self.lock = threading.Lock()
+        self.extra_genes = {}  # pmid -> genes a gene query promised it mentions
+
+    def search(self, text, page):
+        rng = random.Random(f"{self.seed}:search:{text}")
+        total_pages = rng.randint(1, self.max_pages)
+        gene = text.split()[0][len("@GENE_"):] if text.startswith("@GENE_") else None
+        if gene:
+            total_pages = 1
+        if page > total_pages:
+            return {"results": [], "total_pages": total_pages}
+
+        page_rng = random.Random(f"{self.seed}:search:{text}:{page}")
+        pmids = [FIRST_PMID + page_rng.randrange(PMID_SPACE) for _ in range(RESULTS_PER_PAGE if not gene else 3)]
+        if gene:
+            with self.lock:
+                for pmid in pmids:
+                    self.extra_genes.setdefault(pmid, set()).add(gene)
+        return {"results": [{"pmid": pmid} for pmid in pmids], "total_pages": total_pages}
+
+    def export(self, pmid):
+        rng = random.Random(f"{self.seed}:abstract:{pmid}")
+        genes = rng.sample(self.genes, rng.randint(1, 3)) if _has_genes(pmid) else []
+        with self.lock:
+            genes += sorted(self.extra_genes.get(pmid, set()) - set(genes))
+
+        sentences = [_words(rng, rng.randint(8, 16)).capitalize() + "." for _ in range(rng.randint(3, 6))]
+        for gene in genes:
+            sentences.insert(rng.randint(0, len(sentences)), f"{gene} {_words(rng, rng.randint(6, 12))}.")
+        title = _words(rng, rng.randint(5, 10)).capitalize()
+        abstract = " ".join(sentences)
+        offset = len(title) + 1
+
+        annotations = []
+        for gene in genes:
+            at = abstract.find(gene)
+            annotations.append({
+                "infons": {"type": "Gene", "name": gene, "identifier": str(1000 + self.genes.index(gene))
+                           if gene in self.genes else None, "accession": f"@GENE_{gene}"},
+                "text": gene,
+                "locations": [{"offset": offset + at, "length": len(gene)}],
+            })
+        return {"PubTator3": [{
+            "pmid": pmid,
+            "journal": rng.choice(JOURNALS),
+            "passages": [
+                {"infons": {"type": "title"}, "offset": 0, "text": title, "annotations": []},
+                {"infons": {"type": "abstract"}, "offset": offset, "text": abstract, "annotations": annotations},
+            ],
+        }]}
+
+
+class PubtatorHandler(BaseHTTPRequestHandler):
+    server_version = "PubtatorSim"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+
+        if path == "/sim/stats":
+            self._json(200, server.snapshot())
+            return
+        endpoint = "search" if path == "/search" else "export" if path == "/publications/export/biocjson" else None
+        if endpoint is None:
+            self._json(404, {"error": "not found"})
+            return
+
+        time.sleep(server.latency * server.time_scale)
+        with server.lock:
+            server.stats[endpoint] = server.stats.get(endpoint, 0) + 1
+            failed = server.rng.random() < server.error_rate
+            server.stats["errors"] += failed
+        if failed:
+            self._json(503, {"error": "service unavailable"})
+        elif endpoint == "search":
+            self._json(200, server.literature.search(params.get("text", ""), int(params.get("page", 1))))
+        else:
+            try:
+                pmid = int(params.get("pmids", "").split(",")[0])
+            except ValueError:
+                self._json(400, {"error": "pmids must be numeric"})
+                return
+            self._json(200, server.literature.export(pmid))
+
+
+class PubtatorSimServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, literature, latency=0.05, error_rate=0.0, time_scale=1.0, seed=0):
+        super().__init__(address, PubtatorHandler)
+        self.literature = literature
+        self.latency = latency
+        self.error_rate = error_rate
+        self.time_scale = time_scale
+        self.rng = random.Random(f"errors-{seed}")
+        self.lock = threading.Lock()
+        self.stats = {"search": 0, "export": 0, "errors": 0}
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+def make_server(host="127.0.0.1", port=8090, max_pages=2, latency=0.05, error_rate=0.0, time_scale=1.0, seed=0):
+    return PubtatorSimServer((host, port), Literature(max_pages, seed), latency, error_rate, time_scale, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated PubTator3 API for load tests.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--max_pages", type=int, default=2, help="Most search result pages for a query.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request.")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Share of requests answered with a 503.")
+    parser.add_argument("--time_scale", type=float, default=1.0, help="Multiplier on the latency.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write_pmids", type=str, default=None,
+                        help="Write the gene-annotated PMIDs to this file (abstracts/pmids.txt) and exit.")
+    args = parser.parse_args()
+
+    if args.write_pmids:
+        with open(args.write_pmids, "w") as f:
+            f.writelines(f"{pmid}\n" for pmid in gene_annotated_pmids())
+        print(f"Wrote gene-annotated PMIDs to {args.write_pmids}")
+    else:
+        server = make_server(args.host, args.port, args.max_pages, args.latency, args.error_rate, args.time_scale, args.seed)
+        print(f"Simulated PubTator listening on http://{args.host}:{args.port} (PUBTATOR_BASE_URL)")
+        server.serve_forever()
@@ -0,0 +1,292 @@
+import os
+import json
+import random
+import argparse
+
+# Deterministic synthetic workloads for the benchmarks, sized by the number of
+# phenotypes (100 to 10,000). Everything derives from one seed, so a scale
+# always produces the same data:
+#   - phenotypes shaped like out/phenotype_details.json
+#   - PubTator-style abstracts {"pmid", "title", "abstract", "journal"}
+#   - extractor JSON {"Gene", "Source Reference", "PMID", "Journal"}, where
+#     part of the quotes are paraphrased as LLMs do
+#   - checker outputs {"Gene", "Validation", "Supporting Extract", "PMIDS", "Journal"}
+#   - a reference GMT (MSigDB HP_ names) and one perturbed copy per model
+# Abstracts are only kept for the first ABSTRACT_SAMPLE phenotypes; the
+# extractions of the others are generated from abstracts that are then dropped.
+SCALES = (100, 1000, 10000)
+ABSTRACTS_PER_PHENOTYPE = 10
+ABSTRACT_SAMPLE = 50
+GENES_PER_SET = (5, 60)
+N_GENES = 5000
+MODELS = ("qwen", "deepseek", "llama")
+
+QUALIFIERS = [
+    "Abnormal", "Aplasia of the", "Hypoplasia of the", "Increased", "Decreased",
+    "Dysplasia of the", "Duplication of the", "Absent", "Enlarged", "Short",
+    "Broad", "Narrow", "Progressive", "Congenital", "Recurrent", "Asymmetric",
+    "Bilateral", "Unilateral", "Irregular", "Fused",
+]
+ANATOMY = [
+    "ulna", "radius", "femur", "tibia", "fibula", "humerus", "clavicle", "scapula",
+    "skull", "mandible", "maxilla", "palate", "tongue", "cornea", "retina", "lens",
+    "iris", "cochlea", "kidney", "ureter", "bladder", "liver", "spleen", "pancreas",
+    "thyroid", "adrenal", "heart", "aorta", "atrium", "ventricle", "lung", "trachea",
+    "bronchus", "diaphragm", "cerebellum", "cortex", "hippocampus", "thalamus",
+    "spinal cord", "vertebra",
+]
+FINDINGS = [
+    "morphology", "size", "density", "ossification", "function", "shape",
+    "position", "volume", "structure", "signal", "thickness", "length",
+    "mineralization", "vascularization", "innervation",
+]
+WORDS = [
+    "patients", "variant", "mutation", "pathogenic", "missense", "frameshift",
+    "heterozygous", "homozygous", "cohort", "phenotype", "syndrome", "expression",
+    "protein", "function", "pathway", "signaling", "development", "regulation",
+    "clinical", "features", "families", "sequencing", "exome", "genome", "analysis",
+    "associated", "identified", "observed", "reported", "revealed", "affected",
+    "individuals", "disorder", "congenital", "autosomal", "dominant", "recessive",
+    "inheritance", "penetrance", "deletion", "duplication", "splice", "truncating",
+    "transcript", "domain", "mouse", "model", "zebrafish", "knockout", "tissue",
+]
+VERBS = ["cause", "underlie", "are associated with", "were identified in", "segregate with", "contribute to"]
+JOURNALS = [
+    "Am J Hum Genet", "Hum Mol Genet", "Eur J Hum Genet", "Genet Med", "J Med Genet",
+    "Nat Genet", "Clin Genet", "Orphanet J Rare Dis", "Hum Mutat", "PLoS Genet",
+]
+
+
+def gene_symbols(n=N_GENES, seed=0):
+    """n distinct HGNC-like symbols ('KRT14', 'ABCB11', ...)."""
+    rng = random.Random(f"genes-{seed}")
+    letters = "ABCDEFGHIJKLMNOPRSTUWZ"
+    genes, seen = [], set()
+    while len(genes) < n:
+        symbol = "".join(rng.choice(letters) for _ in range(rng.randint(2, 4))) + str(rng.randint(1, 99))
+        if symbol not in seen:
+            seen.add(symbol)
+            genes.append(symbol)
+    return genes
+
+
+def make_phenotypes(n, seed=0):
+    """n phenotypes with distinct names, as in phenotype_details.json."""
+    combos = len(QUALIFIERS) * len(ANATOMY) * len(FINDINGS)
+    if n > combos:
+        raise ValueError(f"At most {combos} synthetic phenotypes, got {n}")
+    rng = random.Random(f"phenotypes-{seed}")
+    phenotypes = []
+    for i, combo in enumerate(rng.sample(range(combos), n)):
+        q, rest = divmod(combo, len(ANATOMY) * len(FINDINGS))
+        a, f = divmod(rest, len(FINDINGS))
+        name = f"{QUALIFIERS[q]} {ANATOMY[a]} {FINDINGS[f]}"
+        phenotypes.append({
+            "id": f"HP:{9000000 + i:07d}",
+            "name": name,
+            "description": f"{name} as observed on clinical examination or imaging.",
+            "synonyms": [f"{QUALIFIERS[q]} {FINDINGS[f]} of the {ANATOMY[a]}"],
+        })
+    return phenotypes
+
+
+def msigdb_name(phenotype):
+    """'Aplasia of the ulna morphology' -> 'HP_APLASIA_OF_THE_ULNA_MORPHOLOGY'"""
+    return "HP_" + "_".join(phenotype["name"].upper().split())
+
+
+def reference_gene_sets(phenotypes, genes, seed=0):
+    """{MSigDB name: [genes]} with set sizes drawn from GENES_PER_SET."""
+    rng = random.Random(f"reference-{seed}")
+    return {msigdb_name(p): rng.sample(genes, rng.randint(*GENES_PER_SET)) for p in phenotypes}
+
+
+def model_gene_sets(reference, genes, seed=0, drop=0.25, add=0.15):
+    """
+    One perturbed copy of the reference per model: each model loses a share
+    of every set's genes, adds unrelated ones and misses a few sets entirely.
+    """
+    models = []
+    for m in range(len(MODELS)):
+        rng = random.Random(f"model-{seed}-{m}")
+        sets = {}
+        for name, members in reference.items():
+            if rng.random() < 0.05:
+                continue
+            kept = [g for g in members if rng.random() >= drop]
+            kept += rng.sample(genes, int(len(members) * add))
+            sets[name] = list(dict.fromkeys(kept))
+        models.append(sets)
+    return models
+
+
+def _sentence(rng, length):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def make_abstracts(phenotype, genes, n, rng, first_pmid):
+    """
+    n abstracts about a phenotype; each mentions a few of its genes in a
+    supporting sentence. Returns (abstracts, [(gene, pmid, sentence)]).
+    """
+    abstracts, mentions = [], []
+    for i in range(n):
+        pmid = str(first_pmid + i)
+        sentences = [_sentence(rng, rng.randint(8, 16)).capitalize() + "." for _ in range(rng.randint(3, 6))]
+        for gene in rng.sample(genes, min(len(genes), rng.randint(1, 3))):
+            support = (f"{gene} variants {rng.choice(VERBS)} {phenotype['name'].lower()} "
+                       f"in {_sentence(rng, rng.randint(4, 8))}.")
+            sentences.insert(rng.randint(0, len(sentences)), support)
+            mentions.append((gene, pmid, support))
+        abstracts.append({
+            "pmid": pmid,
+            "title": f"{phenotype['name']}: {_sentence(rng, rng.randint(4, 9))}",
+            "abstract": " ".join(sentences),
+            "journal": rng.choice(JOURNALS),
+        })
+    return abstracts, mentions
+
+
+def paraphrase(text, rng):
+    """Drop and swap a few words, as LLM 'direct quotes' often do."""
+    words = [w for w in text.split() if rng.random() > 0.15]
+    for _ in range(max(1, len(words) // 8)):
+        i = rng.randrange(len(words))
+        j = min(len(words) - 1, i + 1)
+        words[i], words[j] = words[j], words[i]
+    return " ".join(words)
+
+
+def make_extractions(mentions, journals, rng):
+    """Extractor JSON for a phenotype's gene mentions (with repeats and wrong PMIDs)."""
+    entries = []
+    for gene, pmid, support in mentions:
+        quote = support if rng.random() < 0.5 else paraphrase(support, rng)
+        # the extractor sometimes cites the wrong abstract
+        cited = pmid if rng.random() < 0.8 else str(int(pmid) + 1)
+        entries.append({"Gene": gene, "Source Reference": quote, "PMID": cited, "Journal": journals[pmid]})
+    # and repeats a gene it already reported
+    if entries and rng.random() < 0.3:
+        entries.append(dict(rng.choice(entries)))
+    return entries
+
+
+def make_checker_outputs(mentions, journals, rng):
+    """Checker results per gene, as stored by the checker (validated ones carry PMIDs)."""
+    by_gene = {}
+    for gene, pmid, support in mentions:
+        by_gene.setdefault(gene, []).append((pmid, support))
+    outputs = []
+    for gene, cites in by_gene.items():
+        valid = rng.random() < 0.7
+        outputs.append({
+            "Gene": gene,
+            "Validation": "yes" if valid else "no",
+            "Supporting Extract": cites[0][1] if valid else "",
+            "PMIDS": [pmid for pmid, _ in cites] if valid else [],
+            "Journal": journals[cites[0][0]],
+        })
+    return outputs
+
+
+def make_workload(n_phenotypes, seed=0, abstracts_per_phenotype=ABSTRACTS_PER_PHENOTYPE,
+                  abstract_sample=ABSTRACT_SAMPLE):
+    """
+    Everything the benchmarks need for one scale:
+    {"phenotypes", "genes", "reference", "models", "abstracts" (sampled phenotypes only),
+     "extracted", "verified" (validated checker outputs), "checks" (all checker outputs),
+     "candidate_pmids" (search results), "ga_pmids" (gene-annotated PMIDs)}.
+    Extracted, verified and abstracts are keyed by phenotype name.
+    """
+    genes = gene_symbols(seed=seed)
+    phenotypes = make_phenotypes(n_phenotypes, seed)
+    reference = reference_gene_sets(phenotypes, genes, seed)
+
+    rng = random.Random(f"literature-{seed}")
+    abstracts, extracted, verified, checks = {}, {}, {}, {}
+    candidate_pmids, ga_pmids = [], set()
+    next_pmid = 10000000
+    for i, phenotype in enumerate(phenotypes):
+        name = phenotype["name"]
+        docs, mentions = make_abstracts(
+            phenotype, reference[msigdb_name(phenotype)], abstracts_per_phenotype, rng, next_pmid
+        )
+        next_pmid += abstracts_per_phenotype
+        journals = {d["pmid"]: d["journal"] for d in docs}
+        if i < abstract_sample:
+            abstracts[name] = docs
+
+        extracted[name] = make_extractions(mentions, journals, rng)
+        checks[name] = make_checker_outputs(mentions, journals, rng)
+        verified[name] = [c for c in checks[name] if c["Validation"] == "yes"]
+
+        # the search also returns as many PMIDs without gene annotations
+        ga_pmids.update(int(d["pmid"]) for d in docs)
+        candidate_pmids.extend(int(d["pmid"]) for d in docs)
+        candidate_pmids.extend(rng.randint(1, 9999999) for _ in range(abstracts_per_phenotype))
+
+    return {
+        "phenotypes": phenotypes,
+        "genes": genes,
+        "reference": reference,
+        "models": model_gene_sets(reference, genes, seed),
+        "abstracts": abstracts,
+        "extracted": extracted,
+        "verified": verified,
+        "checks": checks,
+        "candidate_pmids": candidate_pmids,
+        "ga_pmids": ga_pmids,
+    }
+
+
+# WRITERS
+def write_gmt(path, gene_sets):
+    """Plain GMT of gene symbols (no ID mapping, unlike utils.write_gmt)."""
+    with open(path, "w") as f:
+        for name, genes in gene_sets.items():
+            f.write(f"{name}\tNA\t" + "\t".join(genes) + "\n")
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def write_workload(workload, out_dir, model="llama"):
+    """
+    Lay a workload out as the pipeline does, relative to out_dir:
+    out/phenotype_details.json, abstracts/gene_annotated_abstracts/<name>.json,
+    out/phenotype_generations/<model>/<name>.json, out/phenotype_checks/<model>/<name>/<gene>.json,
+    gene_annotated_pmids.txt, and the GMTs under gmt/ (reference.gmt, <model>.gmt).
+    """
+    _write_json(os.path.join(out_dir, "out", "phenotype_details.json"), workload["phenotypes"])
+    for name, docs in workload["abstracts"].items():
+        _write_json(os.path.join(out_dir, "abstracts", "gene_annotated_abstracts", f"{name}.json"), docs)
+    for name, entries in workload["extracted"].items():
+        _write_json(os.path.join(out_dir, "out", "phenotype_generations", model, f"{name}.json"), entries)
+    for name, outputs in workload["checks"].items():
+        for output in outputs:
+            _write_json(os.path.join(out_dir, "out", "phenotype_checks", model, name, f"{output['Gene']}.json"), output)
+    with open(os.path.join(out_dir, "gene_annotated_pmids.txt"), "w") as f:
+        f.writelines(f"{pmid}\n" for pmid in sorted(workload["ga_pmids"]))
+
+    gmt_dir = os.path.join(out_dir, "gmt")
+    os.makedirs(gmt_dir, exist_ok=True)
+    write_gmt(os.path.join(gmt_dir, "reference.gmt"), workload["reference"])
+    for model_name, sets in zip(MODELS, workload["models"]):
+        write_gmt(os.path.join(gmt_dir, f"{model_name}.gmt"), sets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic pipeline workload to disk.")
+    parser.add_argument("--phenotypes", type=int, default=SCALES[0], help=f"Number of phenotypes (e.g. {SCALES}).")
+    parser.add_argument("--out", type=str, required=True, help="Output directory.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--abstract_sample", type=int, default=ABSTRACT_SAMPLE,
+                        help="Phenotypes whose abstracts are written.")
+    args = parser.parse_args()
+
+    workload = make_workload(args.phenotypes, seed=args.seed, abstract_sample=args.abstract_sample)
+    write_workload(workload, args.out)
+    print(f"Wrote {len(workload['phenotypes'])} synthetic phenotypes to {args.out}")
@@ -0,0 +1,201 @@
+import os
+import json
+import zlib
+import fcntl
+import argparse
+import threading
+from contextlib import contextmanager
+
+# Per-model store of checker results: a fixed number of JSONL shard segments
+# (phenotypes are hashed to a shard, so all genes of a phenotype share a file)
+# plus index.json recording the shard count and which phenotypes are stored.
+# Writers hold an flock on index.lock, so several checker processes can share
+# a model's store.
+STORE_DIR = "out/check_store"
+NUM_SHARDS = 64
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+
+_lock = threading.Lock()
+_index_cache = {}
+
+
+def _model_dir(model, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, model)
+
+
+def _shard_name(shard):
+    return f"segment-{shard:05d}.jsonl"
+
+
+def _shard_for(phenotype, num_shards):
+    return zlib.crc32(phenotype.encode("utf-8")) % num_shards
+
+
+def load_index(model, store_dir=None):
+    path = os.path.join(_model_dir(model, store_dir), INDEX_FILE)
+    if not os.path.exists(path):
+        return {"num_shards": NUM_SHARDS, "phenotypes": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_index(model, index, store_dir=None):
+    path = os.path.join(_model_dir(model, store_dir), INDEX_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _locked(model_dir):
+    """Exclusive lock on a model's store across threads and processes."""
+    with _lock:
+        os.makedirs(model_dir, exist_ok=True)
+        with open(os.path.join(model_dir, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def store_exists(model, store_dir=None):
+    return os.path.exists(os.path.join(_model_dir(model, store_dir), INDEX_FILE))
+
+
+def append_check(model, phenotype, gene, generation, store_dir=None):
+    """Append one checker result; a later record for the same phenotype/gene replaces it."""
+    model_dir = _model_dir(model, store_dir)
+    key = (store_dir or STORE_DIR, model)
+
+    with _locked(model_dir):
+        index = _index_cache.get(key)
+        if index is None:
+            index = _index_cache[key] = load_index(model, store_dir)
+
+        shard = _shard_for(phenotype, index["num_shards"])
+        if phenotype not in index["phenotypes"]:
+            # re-read so phenotypes added by other workers are kept
+            index = _index_cache[key] = load_index(model, store_dir)
+            index["phenotypes"][phenotype] = shard
+            _save_index(model, index, store_dir)
+
+        record = {"phenotype": phenotype, "gene": gene, "generation": generation}
+        with open(os.path.join(model_dir, _shard_name(shard)), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_checks(model, phenotypes=None, store_dir=None):
+    """
+    Bulk-load checker results as {phenotype: {gene: generation}}.
+    If phenotypes is given, only the shards holding them are read.
+    """
+    model_dir = _model_dir(model, store_dir)
+    num_shards = load_index(model, store_dir)["num_shards"]
+
+    if phenotypes is None:
+        shards = range(num_shards)
+        wanted = None
+    else:
+        wanted = set(phenotypes)
+        shards = sorted({_shard_for(p, num_shards) for p in wanted})
+
+    results = {}
+    for shard in shards:
+        path = os.path.join(model_dir, _shard_name(shard))
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    # partial last line from an interrupted writer
+                    continue
+                if wanted is not None and rec["phenotype"] not in wanted:
+                    continue
+                results.setdefault(rec["phenotype"], {})[rec["gene"]] = rec["generation"]
+    return results
+
+
+def compact(model, store_dir=None):
+    """Rewrite every shard keeping only the latest record per phenotype/gene."""
+    model_dir = _model_dir(model, store_dir)
+    with _locked(model_dir):
+        checks = load_checks(model, store_dir=store_dir)
+        index = load_index(model, store_dir)
+
+        by_shard = {}
+        for phenotype, genes in checks.items():
+            by_shard.setdefault(_shard_for(phenotype, index["num_shards"]), []).extend(
+                {"phenotype": phenotype, "gene": g, "generation": gen} for g, gen in genes.items()
+            )
+
+        for shard in by_shard:
+            path = os.path.join(model_dir, _shard_name(shard))
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for rec in by_shard.get(shard, []):
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            os.replace(tmp, path)
+
+
+def import_from_directory(in_dir, model, store_dir=None):
+    """Import the legacy <phenotype>/<gene>.json layout into the store."""
+    n = 0
+    for phenotype in sorted(os.listdir(in_dir)):
+        pheno_path = os.path.join(in_dir, phenotype)
+        if not os.path.isdir(pheno_path):
+            continue
+        for gene_file in sorted(os.listdir(pheno_path)):
+            if not gene_file.endswith(".json"):
+                continue
+            gpath = os.path.join(pheno_path, gene_file)
+            try:
+                with open(gpath, "r") as f:
+                    generation = json.load(f)
+            except Exception as e:
+                print(f"Could not read verified file {gpath}: {e}")
+                continue
+            append_check(model, phenotype, os.path.splitext(gene_file)[0], generation, store_dir)
+            n += 1
+    print(f"Imported {n} checker results from {in_dir}")
+    return n
+
+
+def export_to_directory(model, out_dir, store_dir=None):
+    """Export the store to the legacy <phenotype>/<gene>.json layout."""
+    n = 0
+    for phenotype, genes in load_checks(model, store_dir=store_dir).items():
+        pheno_dir = os.path.join(out_dir, phenotype)
+        os.makedirs(pheno_dir, exist_ok=True)
+        for gene, generation in genes.items():
+            with open(os.path.join(pheno_dir, f"{gene}.json"), "w") as f:
+                json.dump(generation, f, indent=2)
+            n += 1
+    print(f"Exported {n} checker results to {out_dir}")
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import, export or compact the checker results store.")
+    parser.add_argument("action", choices=["import", "export", "compact"])
+    parser.add_argument("--model", type=str, required=True, help="Name of the LLM model (e.g., llama3.1:8b)")
+    parser.add_argument(
+        "--dir", type=str, default=None,
+        help="Legacy per-gene directory (default: out/phenotype_checks/<model>)"
+    )
+    args = parser.parse_args()
+
+    legacy_dir = args.dir or f"out/phenotype_checks/{args.model}"
+    if args.action == "import":
+        import_from_directory(legacy_dir, args.model)
+    elif args.action == "export":
+        export_to_directory(args.model, legacy_dir)
+    else:
+        compact(args.model)
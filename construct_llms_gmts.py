@@ -1,81 +1,111 @@
 import os
 import json
-import matplotlib.pyplot as plt
-from collections import defaultdict
-from matplotlib.backends.backend_pdf import PdfPages
-from utils import id_mapping
-import re
-import mygene
+from utils import id_mapping, prefetch_ids
+from genesets import load_gene_sets, normalize_name
 import argparse
 
 
 def load_gmt(filepath):
     """Load a GMT file into a dict: {gene_set_name: set(genes)}"""
-    gene_sets = {}
-    with open(filepath) as f:
-        for line in f:
-            parts = line.strip().split('\t')
-            if len(parts) > 2:
-                gene_sets[parts[0]] = set(parts[2:])
-    return gene_sets
-
-def make_consensus_gmt(qwen_file, deepseek_file, llama_file, out_gmt="consensus_gene_sets.gmt"):
-    qwen = load_gmt(qwen_file)
-    deepseek = load_gmt(deepseek_file)
-    llama = load_gmt(llama_file)
-
-    q_sets = set(qwen.keys())
-    d_sets = set(deepseek.keys())
-    l_sets = set(llama.keys())
+    return load_gene_sets(filepath, skip_empty=True)
+
+def build_vote_matrix(model_sets, weights=None):
+    """
+    Weighted votes for every (gene set, gene) pair across any number of models.
+
+    model_sets is a list of {gene_set_name: set(genes)}, one per model. A sparse
+    (set, model) x gene incidence matrix is collapsed to sets x genes with one
+    sparse product, each model's rows scaled by its weight (default 1).
+    Returns (set_names, genes, votes) with votes a CSR matrix of sets x genes.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    n_models = len(model_sets)
+    weights = np.ones(n_models) if weights is None else np.asarray(weights, dtype=float)
+    if len(weights) != n_models:
+        raise ValueError(f"Got {len(weights)} weights for {n_models} models")
+
+    set_names = sorted(set().union(*(m.keys() for m in model_sets)))
+    genes = sorted(set().union(*(g for m in model_sets for g in m.values())))
+    set_index = {name: i for i, name in enumerate(set_names)}
+    gene_index = {g: i for i, g in enumerate(genes)}
+
+    # incidence: row s * n_models + m holds the genes model m puts in set s
+    rows, cols = [], []
+    for m, sets in enumerate(model_sets):
+        for name, members in sets.items():
+            row = set_index[name] * n_models + m
+            rows.extend([row] * len(members))
+            cols.extend(gene_index[g] for g in members)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(set_names) * n_models, len(genes)),
+    )
 
-    # gene sets appearing in at least 2 models
-    shared_pairs = ( d_sets & q_sets ) | (l_sets & q_sets) | (l_sets & d_sets)
+    # aggregation: set s sums its n_models rows, each scaled by that model's weight
+    agg_rows = np.repeat(np.arange(len(set_names)), n_models)
+    agg_cols = np.arange(len(set_names) * n_models)
+    aggregate = sparse.csr_matrix(
+        (np.tile(weights, len(set_names)), (agg_rows, agg_cols)),
+        shape=(len(set_names), len(set_names) * n_models),
+    )
 
+    votes = (aggregate @ incidence).tocsr()
+    votes.sort_indices()
+    return set_names, genes, votes
+
+
+def consensus_gene_sets(gmt_files, weights=None, thresholds=(2,)):
+    """
+    Consensus gene sets for each vote threshold: a gene is kept in a set if the
+    weights of the models that put it there add up to at least the threshold.
+    Returns {threshold: {gene_set_name: sorted genes}}; empty sets are dropped.
+    """
+    import numpy as np
+
+    set_names, genes, votes = build_vote_matrix([load_gmt(f) for f in gmt_files], weights)
+    genes = np.asarray(genes, dtype=object)
+
+    results = {}
+    for t in thresholds:
+        # small tolerance so fractional weights that sum to t still count
+        keep = votes.data >= t - 1e-9
+        consensus = {}
+        for i, name in enumerate(set_names):
+            lo, hi = votes.indptr[i], votes.indptr[i + 1]
+            selected = genes[votes.indices[lo:hi][keep[lo:hi]]]
+            if len(selected):
+                consensus[name] = list(selected)
+        results[t] = consensus
+    return results
+
+
+def write_consensus_gmt(consensus, out_gmt):
+    os.makedirs(os.path.dirname(out_gmt) or ".", exist_ok=True)
     with open(out_gmt, "w") as out:
-        for gs in sorted(shared_pairs):
-            # Collect genes present in each model for this gene set
-            g_q = qwen.get(gs, set())
-            g_d = deepseek.get(gs, set())
-            g_l = llama.get(gs, set())
-
-            # Count appearances of each gene across models (max 3)
-            gene_counts = defaultdict(int)
-            for g in g_q: gene_counts[g] += 1
-            for g in g_d: gene_counts[g] += 1
-            for g in g_l: gene_counts[g] += 1
-
-            # Keep genes appearing in at least 2 models
-            consensus_genes = [g for g, count in gene_counts.items() if count >= 2]
+        for gs, genes in consensus.items():
+            out.write(gs + "\tconsensus\t" + "\t".join(genes) + "\n")
+    print(f"Consensus GMT saved to: {out_gmt}")
 
-            # Only write if consensus has genes
-            if consensus_genes:
-                out.write(gs + "\tconsensus\t" + "\t".join(sorted(consensus_genes)) + "\n")
 
-    print(f"Consensus GMT saved to: {out_gmt}")
+def threshold_gmt_path(out_gmt, threshold):
+    """consensus_gene_sets.gmt -> consensus_gene_sets_min2.gmt"""
+    root, ext = os.path.splitext(out_gmt)
+    return f"{root}_min{threshold:g}{ext}"
 
 
+def make_consensus_gmt(qwen_file, deepseek_file, llama_file, out_gmt="consensus_gene_sets.gmt"):
+    # gene sets and genes appearing in at least 2 of the 3 models
+    consensus = consensus_gene_sets([qwen_file, deepseek_file, llama_file], thresholds=(2,))[2]
+    write_consensus_gmt(consensus, out_gmt)
 
 
-def normalize_name(name):
-    name = name.lower()
-    name = name.replace("_", " ")
-    name = re.sub(r"\s+", " ", name)
-    name = re.sub(r"[^a-z0-9\s]", "", name)
-    return name.strip()
 
 
 def build_shared_gmt(consensus_gmt, phenotype_gene_file, output_gmt="phenotype_consensus_gene_sets.gmt"):
-    
+
     # Load consensus gene sets
-    def load_gmt(file_path):
-        gene_sets = {}
-        with open(file_path, "r") as f:
-            for line in f:
-                parts = line.strip().split("\t")
-                if len(parts) > 2:
-                    gene_sets[parts[0]] = set(parts[2:])
-        return gene_sets
-    
     consensus_sets = load_gmt(consensus_gmt)
     consensus_lookup = {normalize_name(name): name for name in consensus_sets.keys()}
 
@@ -95,6 +125,9 @@ def build_shared_gmt(consensus_gmt, phenotype_gene_file, output_gmt="phenotype_c
 
     matched = {}
 
+    # one remote lookup for every symbol not resolvable locally
+    prefetch_ids([g for norm in pheno_lookup if norm in consensus_lookup for g in pheno_lookup[norm][1]])
+
     # Match normalized names
     for norm in pheno_lookup:
         if norm in consensus_lookup:
@@ -133,34 +166,51 @@ def build_shared_gmt(consensus_gmt, phenotype_gene_file, output_gmt="phenotype_c
 
 
 
-def main(qwen_gmt, deepseek_gmt, llama_gmt):
+def main(gmts, weights=None, thresholds=(2,)):
 
     consensus_out = "consensus_gene_sets.gmt"
     phenotype_gene_file = "out/phenotype_to_gene_sets.txt"
     shared_out = "out/phenotype_consensus_gene_sets.gmt"
 
-    # Build consensus GMT
-    make_consensus_gmt(
-        qwen_gmt,
-        deepseek_gmt,
-        llama_gmt,
-        out_gmt=consensus_out
-    )
+    # Build consensus GMTs, one per vote threshold
+    results = consensus_gene_sets(gmts, weights=weights, thresholds=thresholds)
+    if len(thresholds) == 1:
+        write_consensus_gmt(results[thresholds[0]], consensus_out)
+        primary_out = consensus_out
+    else:
+        for t in thresholds:
+            write_consensus_gmt(results[t], threshold_gmt_path(consensus_out, t))
+        primary_out = threshold_gmt_path(consensus_out, thresholds[0])
 
-    # Build HPO phenotype-filtered consensus GMT
+    # Build HPO phenotype-filtered consensus GMT (from the first threshold)
     build_shared_gmt(
-        consensus_gmt=consensus_out,
+        consensus_gmt=primary_out,
         phenotype_gene_file=phenotype_gene_file,
         output_gmt=shared_out
     )
 
-    print(f"Consensus GMT written to: {consensus_out}")
+    print(f"Consensus GMT written to: {primary_out}")
     print(f"Shared phenotype GMT written to: {shared_out}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Build consensus GMT from model GMTs.")
 
+    parser.add_argument(
+        "--gmts", type=str, nargs="+", default=None,
+        help="Any number of model GMTs to vote over (overrides --qwen_gmt/--deepseek_gmt/--llama_gmt)."
+    )
+
+    parser.add_argument(
+        "--weights", type=float, nargs="+", default=None,
+        help="Vote weight per GMT, in the same order (default: 1 each)."
+    )
+
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[2],
+        help="Minimum total vote weight for a gene to be kept; one consensus GMT is written per threshold."
+    )
+
     parser.add_argument(
         "--qwen_gmt", type=str, required=False,
         default="out/genesets/qwen/genesets_entrez_qwen.gmt"
@@ -178,8 +228,5 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
 
-    main(
-        qwen_gmt=args.qwen_gmt,
-        deepseek_gmt=args.deepseek_gmt,
-        llama_gmt=args.llama_gmt
-    )
+    gmts = args.gmts or [args.qwen_gmt, args.deepseek_gmt, args.llama_gmt]
+    main(gmts, weights=args.weights, thresholds=args.thresholds)
@@ -0,0 +1,386 @@
+import os
+import json
+import time
+
+from utils import MAKER_MODELS, CHECKER_MODELS
+
+MAKER_ABSTRACTS_DIR = "abstracts/gene_annotated_abstracts"
+CHECKER_ABSTRACTS_DIR = "abstracts/gene_related_abstracts"
+
+# Observed vs predicted seconds per pipeline, used to calibrate the estimates
+CALL_TIMINGS_FILE = "out/call_timings.json"
+
+# Rough per-call costs in seconds before any run history is available
+DEFAULT_SECONDS_PER_CALL = {
+    "pubtator_request": 0.4,
+    "maker_grade": 4.0,
+    "maker_generate": 90.0,
+    "checker_grade": 3.0,
+    "checker_generate": 10.0,
+}
+
+# Graph node names (see tracing.trace_node) mapped to the call kinds above
+STAGE_KINDS = {
+    "grade_qwen": "maker_grade",
+    "grade_deepseek": "maker_grade",
+    "grade_llama3": "maker_grade",
+    "generate_qwen": "maker_generate",
+    "generate_deepseek": "maker_generate",
+    "generate_llama3": "maker_generate",
+    "grade_llama": "checker_grade",
+    "gen_llama": "checker_generate",
+}
+
+# Trace stages of the PubTator retrieval nodes (maker per phenotype, checker per gene)
+RETRIEVE_STAGES = ("retrieve", "retrieve_gene")
+
+# Fallbacks when nothing has been cached yet for a phenotype / gene
+DEFAULT_MAKER_ABSTRACTS = 50
+DEFAULT_CHECKER_ABSTRACTS = 1
+DEFAULT_ABSTRACT_CHARS = 1500
+MAKER_SEARCH_PAGES = 25
+CHECKER_SEARCH_PAGES = 1
+
+# Fraction of abstracts a grader keeps, used to size the generation context
+DEFAULT_GRADE_KEEP_RATE = 0.5
+CHARS_PER_TOKEN = 4
+QUESTION_CHARS = 300
+
+SCHEDULE_POLICIES = ["input", "sjf", "fit", "parents"]
+
+
+def _load_cached(path):
+    """Return (number of abstracts, total characters) of a cache file, or None if absent."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if isinstance(data, dict):
+        data = [data]
+    chars = sum(
+        len(d.get("title") or "") + len(d.get("journal") or "") + len(d.get("abstract") or "")
+        for d in data
+    )
+    return len(data), chars
+
+
+def _prompt_chars():
+    """Characters of the fixed prompt text for each call kind."""
+    from instructs import (
+        rag_prompt, rag_prompt2, grade_abstracts_instructions, grade_abstracts_instructions2
+    )
+    return {
+        "maker_grade": len(grade_abstracts_instructions) + QUESTION_CHARS,
+        "maker_generate": len(rag_prompt) + QUESTION_CHARS,
+        "checker_grade": len(grade_abstracts_instructions2) + QUESTION_CHARS,
+        "checker_generate": len(rag_prompt2) + QUESTION_CHARS,
+    }
+
+
+def _tokens(chars):
+    return int(chars / CHARS_PER_TOKEN)
+
+
+def load_call_seconds(trace_file=None):
+    """
+    Seconds per call as {kind: {model: seconds}}, with a "default" entry per kind.
+    Mean per-call times recorded by tracing override the defaults.
+    Returns (call_seconds, from_traces).
+    """
+    call_seconds = {kind: {"default": s} for kind, s in DEFAULT_SECONDS_PER_CALL.items()}
+
+    from tracing import TRACE_FILE, load_trace
+    trace_file = trace_file or TRACE_FILE
+    if not os.path.exists(trace_file):
+        return call_seconds, False
+
+    totals = {}
+    http_seconds, http_requests = 0.0, 0
+    for r in load_trace(trace_file):
+        if r.get("type") == "llm" and "error" not in r and r.get("stage") in STAGE_KINDS:
+            key = (STAGE_KINDS[r["stage"]], r.get("model"))
+            seconds, calls = totals.get(key, (0.0, 0))
+            totals[key] = (seconds + r.get("seconds", 0.0), calls + 1)
+        elif r.get("type") == "node" and r.get("stage") in RETRIEVE_STAGES and r.get("http_requests"):
+            http_seconds += r.get("seconds", 0.0)
+            http_requests += r["http_requests"]
+
+    for (kind, model), (seconds, calls) in totals.items():
+        call_seconds[kind][model] = seconds / calls
+    if http_requests:
+        call_seconds["pubtator_request"]["default"] = http_seconds / http_requests
+
+    return call_seconds, bool(totals or http_requests)
+
+
+def _seconds(call_seconds, kind, model="default"):
+    per_model = call_seconds[kind]
+    return per_model.get(model, per_model["default"])
+
+
+def load_calibration():
+    """
+    Load observed/predicted ratios per pipeline from past runs.
+    Returns {"maker": ratio, "checker": ratio}; missing kinds default to 1.0.
+    """
+    calibration = {"maker": 1.0, "checker": 1.0}
+    if not os.path.exists(CALL_TIMINGS_FILE):
+        return calibration
+    with open(CALL_TIMINGS_FILE, "r") as f:
+        timings = json.load(f)
+    for kind, totals in timings.items():
+        if totals.get("predicted", 0) > 0 and totals.get("observed", 0) > 0:
+            calibration[kind] = totals["observed"] / totals["predicted"]
+    return calibration
+
+
+def record_observed(kind, predicted_seconds, observed_seconds):
+    """Accumulate predicted vs observed seconds for a pipeline run."""
+    if predicted_seconds <= 0:
+        return
+
+    if os.path.exists(CALL_TIMINGS_FILE):
+        with open(CALL_TIMINGS_FILE, "r") as f:
+            timings = json.load(f)
+    else:
+        timings = {}
+
+    totals = timings.setdefault(kind, {"predicted": 0.0, "observed": 0.0, "runs": 0})
+    totals["predicted"] += predicted_seconds
+    totals["observed"] += observed_seconds
+    totals["runs"] += 1
+
+    os.makedirs(os.path.dirname(CALL_TIMINGS_FILE), exist_ok=True)
+    with open(CALL_TIMINGS_FILE, "w") as f:
+        json.dump(timings, f, indent=2)
+
+
+def estimate_maker(name, call_seconds=None, prompt_chars=None):
+    """
+    Estimate the maker pipeline cost for a phenotype.
+    Every model grades every abstract, then generates once over the kept abstracts.
+    """
+    call_seconds = call_seconds or load_call_seconds()[0]
+    prompt_chars = prompt_chars or _prompt_chars()
+
+    cached = _load_cached(os.path.join(MAKER_ABSTRACTS_DIR, f"{name}.json"))
+    if cached is None:
+        n_abstracts = DEFAULT_MAKER_ABSTRACTS
+        abstract_chars = n_abstracts * DEFAULT_ABSTRACT_CHARS
+        http_requests = MAKER_SEARCH_PAGES + n_abstracts
+    else:
+        n_abstracts, abstract_chars = cached
+        http_requests = 0
+
+    models = {}
+    for model in MAKER_MODELS:
+        grade_chars = n_abstracts * prompt_chars["maker_grade"] + abstract_chars
+        generate_chars = prompt_chars["maker_generate"] + abstract_chars * DEFAULT_GRADE_KEEP_RATE
+        generate_calls = 1 if n_abstracts else 0
+        models[model] = {
+            "llm_calls": n_abstracts + generate_calls,
+            "prompt_tokens": _tokens(grade_chars) + (_tokens(generate_chars) if generate_calls else 0),
+            "seconds": n_abstracts * _seconds(call_seconds, "maker_grade", model)
+                       + generate_calls * _seconds(call_seconds, "maker_generate", model),
+        }
+
+    http_seconds = http_requests * _seconds(call_seconds, "pubtator_request")
+    return {
+        "abstracts": n_abstracts,
+        "cached": cached is not None,
+        "http_requests": http_requests,
+        "models": models,
+        "seconds": http_seconds + sum(m["seconds"] for m in models.values()),
+    }
+
+
+def estimate_checker(name, genes, done_genes=(), call_seconds=None, prompt_chars=None):
+    """
+    Estimate the checker pipeline cost for a phenotype's remaining genes.
+    Each gene gets its own retrieval, one grading pass and one generation.
+    """
+    call_seconds = call_seconds or load_call_seconds()[0]
+    prompt_chars = prompt_chars or _prompt_chars()
+
+    done = set(done_genes)
+    remaining = [g for g in genes if g not in done]
+
+    http_requests = 0
+    n_abstracts = 0
+    abstract_chars = 0
+    for gene in remaining:
+        cached = _load_cached(os.path.join(CHECKER_ABSTRACTS_DIR, f"{name}_{gene}.json"))
+        if cached is None:
+            cached = (DEFAULT_CHECKER_ABSTRACTS, DEFAULT_CHECKER_ABSTRACTS * DEFAULT_ABSTRACT_CHARS)
+            http_requests += CHECKER_SEARCH_PAGES + DEFAULT_CHECKER_ABSTRACTS
+        n_abstracts += cached[0]
+        abstract_chars += cached[1]
+
+    models = {}
+    for model in CHECKER_MODELS:
+        grade_chars = n_abstracts * prompt_chars["checker_grade"] + abstract_chars
+        generate_chars = (len(remaining) * prompt_chars["checker_generate"]
+                          + abstract_chars * DEFAULT_GRADE_KEEP_RATE)
+        models[model] = {
+            "llm_calls": n_abstracts + len(remaining),
+            "prompt_tokens": _tokens(grade_chars) + _tokens(generate_chars),
+            "seconds": n_abstracts * _seconds(call_seconds, "checker_grade", model)
+                       + len(remaining) * _seconds(call_seconds, "checker_generate", model),
+        }
+
+    http_seconds = http_requests * _seconds(call_seconds, "pubtator_request")
+    return {
+        "genes": len(remaining),
+        "abstracts": n_abstracts,
+        "http_requests": http_requests,
+        "models": models,
+        "seconds": http_seconds + sum(m["seconds"] for m in models.values()),
+    }
+
+
+def estimate_phenotype(phenotype, gene_sets, processed_genes=None, calibration=None,
+                       call_seconds=None, prompt_chars=None):
+    """
+    Estimate the total cost (maker + checker) to fully complete one phenotype.
+    Raw estimates are scaled by the observed/predicted ratios of past runs.
+    """
+    name = phenotype["name"]
+    processed_genes = processed_genes or {}
+    calibration = calibration or load_calibration()
+    call_seconds = call_seconds or load_call_seconds()[0]
+    prompt_chars = prompt_chars or _prompt_chars()
+
+    maker = estimate_maker(name, call_seconds, prompt_chars)
+    checker = estimate_checker(name, gene_sets.get(name, []), processed_genes.get(name, []),
+                               call_seconds, prompt_chars)
+
+    return {
+        "name": name,
+        "maker": maker,
+        "checker": checker,
+        "seconds": maker["seconds"] * calibration["maker"]
+                   + checker["seconds"] * calibration["checker"],
+    }
+
+
+def _estimate_all(phenotypes, gene_sets, processed_genes=None):
+    call_seconds, from_traces = load_call_seconds()
+    # Per-call timings from traces are already measured, so skip the coarse calibration
+    calibration = {"maker": 1.0, "checker": 1.0} if from_traces else load_calibration()
+    prompt_chars = _prompt_chars()
+    return [
+        (p, estimate_phenotype(p, gene_sets, processed_genes, calibration, call_seconds, prompt_chars))
+        for p in phenotypes
+    ]
+
+
+def schedule_phenotypes(phenotypes, gene_sets, policy="input", walltime=None, processed_genes=None,
+                        ontology=None):
+    """
+    Order phenotypes for processing.
+
+    Policies:
+      - input:   keep input-file order
+      - sjf:     shortest estimated job first
+      - fit:     shortest job first, keeping only phenotypes that fit in the walltime (seconds)
+      - parents: HPO ancestors before their descendants (needs an ontology), so
+                 children can reuse their ancestors' abstracts
+
+    Returns a list of (phenotype, estimate) pairs.
+    """
+    if policy not in SCHEDULE_POLICIES:
+        raise ValueError(f"Unknown schedule policy '{policy}'. Choose from {SCHEDULE_POLICIES}.")
+
+    jobs = _estimate_all(phenotypes, gene_sets, processed_genes)
+
+    if policy == "input":
+        return jobs
+
+    if policy == "parents":
+        if ontology is None:
+            raise ValueError("The 'parents' schedule policy needs an HPO ontology.")
+        from literature_reuse import phenotype_id
+
+        # a term has strictly fewer ancestors than any of its descendants, so
+        # sorting by ancestor count is a topological order; unknown terms go last
+        def depth(job):
+            hpo_id = phenotype_id(job[0], ontology)
+            return len(ontology.ancestors(hpo_id)) if hpo_id else float("inf")
+        jobs.sort(key=depth)
+        return jobs
+
+    # Stable sort keeps input order among equal estimates
+    jobs.sort(key=lambda job: job[1]["seconds"])
+    if policy == "sjf" or walltime is None:
+        return jobs
+
+    # Greedy shortest-first packing maximizes the number of completed jobs
+    packed = []
+    budget = walltime
+    for phenotype, estimate in jobs:
+        if estimate["seconds"] > budget:
+            break
+        packed.append((phenotype, estimate))
+        budget -= estimate["seconds"]
+    return packed
+
+
+def estimate_run(phenotypes, gene_sets, processed_genes=None):
+    """
+    Dry-run estimate for a list of phenotypes; no LLM or HTTP calls are made.
+    Returns totals plus a per-model breakdown of LLM calls, prompt tokens and seconds.
+    """
+    jobs = _estimate_all(phenotypes, gene_sets, processed_genes)
+
+    per_model = {}
+    http_requests = 0
+    seconds = 0.0
+    for _, estimate in jobs:
+        seconds += estimate["seconds"]
+        for pipeline in ("maker", "checker"):
+            http_requests += estimate[pipeline]["http_requests"]
+            for model, m in estimate[pipeline]["models"].items():
+                totals = per_model.setdefault(model, {"llm_calls": 0, "prompt_tokens": 0, "seconds": 0.0})
+                totals["llm_calls"] += m["llm_calls"]
+                totals["prompt_tokens"] += m["prompt_tokens"]
+                totals["seconds"] += m["seconds"]
+
+    return {
+        "phenotypes": len(jobs),
+        "http_requests": http_requests,
+        "seconds": seconds,
+        "models": per_model,
+    }
+
+
+def print_estimate(summary):
+    print("\n=== DRY-RUN ESTIMATE ===")
+    print(f"Phenotypes: {summary['phenotypes']}")
+    print(f"PubTator HTTP requests: {summary['http_requests']}")
+    print(f"Expected wall time: {summary['seconds'] / 3600:.1f} h\n")
+
+    print(f"{'model':<20}{'LLM calls':>12}{'prompt tokens':>16}{'hours':>10}")
+    for model, m in sorted(summary["models"].items()):
+        print(f"{model:<20}{m['llm_calls']:>12}{m['prompt_tokens']:>16}{m['seconds'] / 3600:>10.1f}")
+
+
+class Walltime:
+    """Tracks the remaining time of an allocation."""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.start = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def remaining(self):
+        if self.seconds is None:
+            return float("inf")
+        return self.seconds - self.elapsed()
+
+    def fits(self, estimated_seconds):
+        return estimated_seconds <= self.remaining()
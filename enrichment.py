@@ -0,0 +1,229 @@
+import os
+import csv
+import argparse
+
+import numpy as np
+from scipy.special import gammaln
+
+from genesets import GeneSetCollection, match_key
+from set_similarity import REFERENCE_GMT, intersections, pair_sizes
+
+UNIVERSES = ["union", "reference"]
+
+
+def bh_fdr(pvalues, n_tests=None):
+    """
+    Benjamini-Hochberg adjusted p-values. n_tests may exceed len(pvalues) when
+    the remaining tests are known to have p = 1 (pairs sharing no gene).
+    """
+    p = np.asarray(pvalues, dtype=np.float64)
+    m = len(p) if n_tests is None else n_tests
+    order = np.argsort(p, kind="mergesort")
+    ranked = p[order] * m / np.arange(1, len(p) + 1)
+    # step-up: each adjusted value is the minimum over all larger p-values
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    adjusted = np.empty_like(p)
+    adjusted[order] = np.minimum(ranked, 1.0)
+    return adjusted
+
+
+# relative size below which further tail terms are dropped
+TAIL_EPS = 1e-17
+
+
+def _log_comb(n, k):
+    return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)
+
+
+def hypergeom_sf(k, n_universe, n_success, n_draws):
+    """
+    P(X >= k) for X ~ Hypergeom(n_universe, n_success, n_draws), vectorized.
+
+    Each p-value is a sum of pmf terms walked away from the distribution's mode
+    with the pmf ratio recurrence: from k upwards when k is above the mode,
+    otherwise 1 - the sum from k - 1 downwards. Terms shrink geometrically on
+    that side, so only a few dozen steps are needed per pair, all pairs at once.
+    Identical (k, n_success, n_draws) triples are computed once.
+    """
+    k = np.asarray(k, dtype=np.int64)
+    b = np.asarray(n_success, dtype=np.int64)
+    a = np.asarray(n_draws, dtype=np.int64)
+    N = int(n_universe)
+
+    # compute each distinct triple once
+    key = (k * (N + 1) + a) * (N + 1) + b
+    unique_key, inverse = np.unique(key, return_inverse=True)
+    b_u = (unique_key % (N + 1)).astype(np.float64)
+    a_u = ((unique_key // (N + 1)) % (N + 1)).astype(np.float64)
+    k_u = (unique_key // (N + 1) // (N + 1)).astype(np.float64)
+
+    lo = np.maximum(0.0, a_u + b_u - N)
+    hi = np.minimum(a_u, b_u)
+    mode = np.floor((a_u + 1) * (b_u + 1) / (N + 2))
+    upper = k_u > mode
+
+    # first term: pmf(k) for the upper tail, pmf(k - 1) for the lower sum
+    x = np.where(upper, k_u, k_u - 1)
+    valid = (x >= lo) & (x <= hi)
+    log_norm = _log_comb(N, a_u)
+    xs = np.clip(x, lo, hi)
+    term = np.where(valid, np.exp(_log_comb(b_u, xs) + _log_comb(N - b_u, a_u - xs) - log_norm), 0.0)
+    total = term.copy()
+
+    active = np.flatnonzero(valid)
+    while len(active):
+        xa, aa, ba = x[active], a_u[active], b_u[active]
+        up = upper[active]
+        nxt = np.where(
+            up,
+            term[active] * (aa - xa) * (ba - xa) / ((xa + 1) * (N - aa - ba + xa + 1)),
+            term[active] * xa * (N - aa - ba + xa) / np.maximum((aa - xa + 1) * (ba - xa + 1), 1),
+        )
+        x[active] = np.where(up, xa + 1, xa - 1)
+        term[active] = nxt
+        total[active] += nxt
+        in_range = np.where(up, x[active] <= hi[active], x[active] >= lo[active])
+        active = active[in_range & (nxt > TAIL_EPS * total[active])]
+
+    sf = np.where(upper, total, 1.0 - total)
+    return np.clip(sf, 0.0, 1.0)[inverse]
+
+
+def enrichment(query, reference, universe="union"):
+    """
+    One-sided hypergeometric (Fisher's exact, greater) test of every
+    (query set, reference set) overlap over a shared gene universe.
+
+    universe="union" counts every gene of either database; "reference" counts
+    only the reference's genes and restricts the query sets to them.
+    Returns a dict of per-pair arrays (row, col, common, query_size,
+    reference_size, odds_ratio, pvalue, fdr) for pairs sharing at least one
+    gene; every other pair has p = 1. FDR is corrected over all
+    len(query) x len(reference) tests.
+    """
+    query, reference, common, n_genes = intersections(query, reference)
+
+    query_sizes = query.sizes()
+    if universe == "reference":
+        # query genes the reference never uses cannot be drawn
+        in_reference = reference.translate(query) >= 0
+        counts = np.concatenate([[0], np.cumsum(in_reference[np.asarray(query.members)])])
+        offsets = np.asarray(query.offsets)
+        query_sizes = counts[offsets[1:]] - counts[offsets[:-1]]
+        n_genes = len(reference.genes)
+
+    size_a, size_b = pair_sizes(common, query_sizes, reference.sizes())
+    k = common.data.astype(np.float64)
+
+    # P(X >= k) for X ~ Hypergeom(universe, reference size, query size)
+    pvalues = hypergeom_sf(k, n_genes, size_b, size_a)
+
+    # sample odds ratio of the 2x2 table; infinite when a margin is exhausted
+    with np.errstate(divide="ignore", invalid="ignore"):
+        odds = (k * (n_genes - size_a - size_b + k)) / ((size_a - k) * (size_b - k))
+
+    rows = np.repeat(np.arange(common.shape[0]), np.diff(common.indptr))
+    return {
+        "query": query.names,
+        "reference": reference.names,
+        "universe_size": n_genes,
+        "n_tests": len(query) * len(reference),
+        "row": rows,
+        "col": common.indices,
+        "common": k.astype(np.int64),
+        "query_size": size_a.astype(np.int64),
+        "reference_size": size_b.astype(np.int64),
+        "odds_ratio": odds,
+        "pvalue": pvalues,
+        "fdr": bh_fdr(pvalues, len(query) * len(reference)),
+    }
+
+
+def write_enrichment_csv(path, result, fdr_threshold):
+    """Significant pairs, grouped by query set and ordered by p-value."""
+    keep = np.flatnonzero(result["fdr"] <= fdr_threshold)
+    keep = keep[np.lexsort((result["pvalue"][keep], result["row"][keep]))]
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Gene Set Name", "Reference Set", "# Common", "# Genes Set",
+                         "# Genes Reference", "Odds Ratio", "P-value", "FDR"])
+        for i in keep:
+            writer.writerow([
+                result["query"][result["row"][i]], result["reference"][result["col"][i]],
+                result["common"][i], result["query_size"][i], result["reference_size"][i],
+                f"{result['odds_ratio'][i]:.4g}", f"{result['pvalue'][i]:.3e}", f"{result['fdr'][i]:.3e}",
+            ])
+    return len(keep)
+
+
+def write_summary_csv(path, result, fdr_threshold):
+    """
+    Per query set: number of enriched reference sets, the best one, and the
+    reference set for the same phenotype (paired by genesets.match_key).
+    """
+    ref_index = {}
+    for j, name in enumerate(result["reference"]):
+        ref_index.setdefault(match_key(name), j)
+    rows, cols, p, q = result["row"], result["col"], result["pvalue"], result["fdr"]
+
+    # first entry per row after sorting by (row, p-value) is that row's best hit
+    order = np.lexsort((p, rows))
+    starts = np.searchsorted(rows[order], np.arange(len(result["query"])))
+    ends = np.searchsorted(rows[order], np.arange(len(result["query"])), side="right")
+    significant = np.bincount(rows[q <= fdr_threshold], minlength=len(result["query"]))
+
+    pair_index = {(r, c): i for i, (r, c) in enumerate(zip(rows.tolist(), cols.tolist()))}
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Gene Set Name", "# Enriched References", "Best Reference",
+                         "Best P-value", "Best FDR", "Same-Name P-value", "Same-Name FDR"])
+        for i, name in enumerate(result["query"]):
+            best = ["", "", ""]
+            if ends[i] > starts[i]:
+                b = order[starts[i]]
+                best = [result["reference"][cols[b]], f"{p[b]:.3e}", f"{q[b]:.3e}"]
+            same = ["", ""]
+            j = ref_index.get(match_key(name))
+            if j is not None:
+                s = pair_index.get((i, j))
+                same = [f"{p[s]:.3e}", f"{q[s]:.3e}"] if s is not None else ["1", "1"]
+            writer.writerow([name, int(significant[i])] + best + same)
+
+
+# main
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hypergeometric enrichment of every gene set against a reference database.")
+    parser.add_argument("--query_gmt", type=str, required=False,
+                        default="out/Consensus_gene_sets.gmt",
+                        help="Reconstructed gene sets.")
+    parser.add_argument("--reference_gmt", type=str, required=False,
+                        default=REFERENCE_GMT,
+                        help="Reference database, MSigDB HPO by default.")
+    parser.add_argument("--universe", choices=UNIVERSES, default="union",
+                        help="Gene universe: genes of both databases, or of the reference only.")
+    parser.add_argument("--fdr", type=float, default=0.05, help="FDR threshold for the pairs CSV.")
+    args = parser.parse_args()
+
+    # Output directory = same directory as the query GMT (next to gene_set_similarity.csv)
+    out_dir = os.path.join(os.path.dirname(args.query_gmt), "evaluation")
+    os.makedirs(out_dir, exist_ok=True)
+
+    result = enrichment(
+        GeneSetCollection.from_gmt(args.query_gmt),
+        GeneSetCollection.from_gmt(args.reference_gmt),
+        universe=args.universe,
+    )
+    print(f"Tested {result['n_tests']} pairs over a universe of {result['universe_size']} genes "
+          f"({len(result['pvalue'])} overlapping)")
+
+    enrichment_csv = os.path.join(out_dir, "gene_set_enrichment.csv")
+    summary_csv = os.path.join(out_dir, "gene_set_enrichment_summary.csv")
+    n = write_enrichment_csv(enrichment_csv, result, args.fdr)
+    write_summary_csv(summary_csv, result, args.fdr)
+
+    print(f"Pairs with FDR <= {args.fdr}: {n}")
+    print(f"- {enrichment_csv}")
+    print(f"- {summary_csv}")
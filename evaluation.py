@@ -1,7 +1,7 @@
 import csv
+import json
 import argparse
 import os
-import pandas as pd
 
 
 def parse_gmt(file_path, remove_prefix=None):
@@ -9,18 +9,8 @@ def parse_gmt(file_path, remove_prefix=None):
     Parse a GMT file into a dictionary:
     { gene_set_name: set(genes) }
     """
-    gene_sets = {}
-    with open(file_path, 'r') as file:
-        for line in file:
-            columns = line.strip().split("\t")
-            gene_set_name = columns[0]
-            genes = columns[2:]
-
-            if remove_prefix and gene_set_name.startswith(remove_prefix):
-                gene_set_name = gene_set_name[len(remove_prefix):]
-
-            gene_sets[gene_set_name] = set(genes)
-    return gene_sets
+    from genesets import load_gene_sets, strip_prefix
+    return load_gene_sets(file_path, name_fn=strip_prefix(remove_prefix) if remove_prefix else None)
 
 
 def compare_gene_sets(original, new):
@@ -73,45 +63,118 @@ def export_to_csv(data, filename):
         writer.writerows(data)
 
 
-def compare_similarity(db1, db2, output_csv="gene_set_similarity.csv"):
+def similarity_arrays(db1, db2):
     """
-    Compute per-set and database-level similarity (Jaccard).
+    Per-set counts for the gene sets present in both databases, as NumPy arrays:
+    names, sizes, intersection and union sizes, and the sets x genes incidence
+    (CSR) of each database over one shared gene vocabulary.
     """
-    results = []
-    all_genes_db1 = set()
-    all_genes_db2 = set()
+    import numpy as np
+    from scipy import sparse
+
+    names = [name for name in db1 if name in db2]
+    vocab = {}
+    cols1, cols2, ptr1, ptr2 = [], [], [0], [0]
+    for name in names:
+        cols1.extend(vocab.setdefault(g, len(vocab)) for g in db1[name])
+        cols2.extend(vocab.setdefault(g, len(vocab)) for g in db2[name])
+        ptr1.append(len(cols1))
+        ptr2.append(len(cols2))
+
+    shape = (len(names), len(vocab))
+    incidence1 = sparse.csr_matrix((np.ones(len(cols1), dtype=np.float32), cols1, ptr1), shape=shape)
+    incidence2 = sparse.csr_matrix((np.ones(len(cols2), dtype=np.float32), cols2, ptr2), shape=shape)
+    size1 = np.diff(incidence1.indptr)
+    size2 = np.diff(incidence2.indptr)
+    intersection = np.asarray(incidence1.multiply(incidence2).sum(axis=1)).ravel().astype(np.int64)
+    return {
+        "names": names,
+        "size_original": size1,
+        "size_new": size2,
+        "intersection": intersection,
+        "union": size1 + size2 - intersection,
+        "incidence_original": incidence1,
+        "incidence_new": incidence2,
+    }
 
-    per_set_similarities = []
-    total_intersections = 0
-    total_unions = 0
 
-    for name in db1:
-        if name in db2:
-            genes1, genes2 = db1[name], db2[name]
-            all_genes_db1.update(genes1)
-            all_genes_db2.update(genes2)
+# resamples drawn per batch when bootstrapping (bounds the resamples x genes block)
+BOOTSTRAP_BATCH = 256
 
-            intersection = len(genes1 & genes2)
-            union = len(genes1 | genes2)
-            similarity = (intersection / union) * 100 if union else 0
 
-            results.append([name, len(genes1), len(genes2), intersection, union, round(similarity, 2)])
+def bootstrap_similarity_ci(arrays, n_resamples=2000, confidence=0.95, seed=0):
+    """
+    Percentile bootstrap confidence intervals, resampling gene sets with
+    replacement, for the three similarity metrics of similarity_arrays output.
+    Each resample is a row of multinomial counts over the sets, so all
+    resamples of a batch are evaluated with a few matrix products.
+    Returns {metric: (low, high)} in %, or {} when there is nothing to resample.
+    The overall (database-level) Jaccard can only shrink when sets are left
+    out of a resample, so its interval tends to sit below the point estimate.
+    """
+    import numpy as np
+
+    # sets with an empty union contribute to no metric
+    keep = np.flatnonzero(arrays["union"] > 0)
+    n = len(keep)
+    if n == 0 or n_resamples <= 0:
+        return {}
+
+    intersection = arrays["intersection"][keep].astype(np.float64)
+    union = arrays["union"][keep].astype(np.float64)
+    jaccard = intersection / union
+    # genes x sets, so counts @ incidence is a sparse-times-dense product
+    incidence1_t = arrays["incidence_original"][keep].T.tocsr()
+    incidence2_t = arrays["incidence_new"][keep].T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    samples = {"total_similarity": [], "unweighted_mean": [], "weighted_mean": []}
+    for start in range(0, n_resamples, BOOTSTRAP_BATCH):
+        size = min(BOOTSTRAP_BATCH, n_resamples - start)
+        counts = rng.multinomial(n, np.full(n, 1.0 / n), size=size).astype(np.float64)
+
+        covered1 = (incidence1_t @ counts.T).T > 0
+        covered2 = (incidence2_t @ counts.T).T > 0
+        samples["total_similarity"].append(
+            (covered1 & covered2).sum(axis=1) / np.maximum((covered1 | covered2).sum(axis=1), 1) * 100
+        )
+        samples["unweighted_mean"].append(counts @ jaccard / n * 100)
+        samples["weighted_mean"].append((counts @ intersection) / (counts @ union) * 100)
+
+    alpha = (1 - confidence) / 2
+    ci = {}
+    for metric, values in samples.items():
+        low, high = np.quantile(np.concatenate(values), [alpha, 1 - alpha])
+        ci[metric] = (float(low), float(high))
+    return ci
+
+
+def compare_similarity(db1, db2, output_csv="gene_set_similarity.csv"):
+    """
+    Compute per-set and database-level similarity (Jaccard).
+    The per-set arrays (see similarity_arrays) are returned under "per_set".
+    """
+    import numpy as np
 
-            if union > 0:
-                per_set_similarities.append(intersection / union)
-                total_intersections += intersection
-                total_unions += union
+    arrays = similarity_arrays(db1, db2)
+    intersection, union = arrays["intersection"], arrays["union"]
+    nonempty = union > 0
+
+    results = []
+    for i, name in enumerate(arrays["names"]):
+        similarity = round(float(intersection[i] / union[i]) * 100, 2) if union[i] else 0
+        results.append([name, int(arrays["size_original"][i]), int(arrays["size_new"][i]),
+                        int(intersection[i]), int(union[i]), similarity])
 
     # Mean similarities
-    unweighted_mean = (sum(per_set_similarities) / len(per_set_similarities) * 100
-                       if per_set_similarities else 0)
-    weighted_mean = ((total_intersections / total_unions) * 100
-                     if total_unions > 0 else 0)
+    unweighted_mean = (intersection[nonempty] / union[nonempty]).mean() * 100 if nonempty.any() else 0
+    weighted_mean = intersection.sum() / union.sum() * 100 if union.sum() > 0 else 0
 
     # Database-level similarity
-    total_intersection = len(all_genes_db1 & all_genes_db2)
-    total_union = len(all_genes_db1 | all_genes_db2)
-    total_similarity = (total_intersection / total_union) * 100 if total_union else 0
+    covered1 = np.diff(arrays["incidence_original"].tocsc().indptr) > 0
+    covered2 = np.diff(arrays["incidence_new"].tocsc().indptr) > 0
+    total_union = int((covered1 | covered2).sum())
+    total_similarity = (covered1 & covered2).sum() / total_union * 100 if total_union else 0
 
     # Write similarity CSV
     os.makedirs(os.path.dirname(output_csv), exist_ok=True)
@@ -122,14 +185,22 @@ def compare_similarity(db1, db2, output_csv="gene_set_similarity.csv"):
         writer.writerows(results)
 
     return {
-        "total_similarity": total_similarity,
-        "unweighted_mean": unweighted_mean,
-        "weighted_mean": weighted_mean,
-        "total_genes_original": len(all_genes_db1),
-        "total_genes_new": len(all_genes_db2)
+        "total_similarity": float(total_similarity),
+        "unweighted_mean": float(unweighted_mean),
+        "weighted_mean": float(weighted_mean),
+        "total_genes_original": int(covered1.sum()),
+        "total_genes_new": int(covered2.sum()),
+        "per_set": arrays,
     }
 
 
+def _format_ci(similarity_stats, metric):
+    ci = similarity_stats.get("ci", {}).get(metric)
+    if ci is None:
+        return ""
+    return f" ({similarity_stats['confidence'] * 100:g}% CI {ci[0]:.2f}-{ci[1]:.2f}%)"
+
+
 def write_text_report(path, comparison_stats, similarity_stats):
     """
     Write all statistics to a .txt file.
@@ -138,9 +209,15 @@ def write_text_report(path, comparison_stats, similarity_stats):
         f.write("=== SUMMARY REPORT ===\n\n")
 
         f.write("=== SIMILARITY METRICS ===\n")
-        f.write(f"Overall Database Similarity (% Jaccard): {similarity_stats['total_similarity']:.2f}%\n")
-        f.write(f"Unweighted Mean Similarity: {similarity_stats['unweighted_mean']:.2f}%\n")
-        f.write(f"Weighted Mean Similarity: {similarity_stats['weighted_mean']:.2f}%\n\n")
+        f.write(f"Overall Database Similarity (% Jaccard): {similarity_stats['total_similarity']:.2f}%"
+                f"{_format_ci(similarity_stats, 'total_similarity')}\n")
+        f.write(f"Unweighted Mean Similarity: {similarity_stats['unweighted_mean']:.2f}%"
+                f"{_format_ci(similarity_stats, 'unweighted_mean')}\n")
+        f.write(f"Weighted Mean Similarity: {similarity_stats['weighted_mean']:.2f}%"
+                f"{_format_ci(similarity_stats, 'weighted_mean')}\n")
+        if similarity_stats.get("ci"):
+            f.write(f"(bootstrap over gene sets, {similarity_stats['n_resamples']} resamples)\n")
+        f.write("\n")
 
         f.write("=== GENE COUNTS ===\n")
         f.write(f"Unique genes in ORIGINAL DB: {similarity_stats['total_genes_original']}\n")
@@ -151,44 +228,163 @@ def write_text_report(path, comparison_stats, similarity_stats):
 
 
 
-# main
+def evaluate(original_gene_set, new_gene_set, out_dir, n_resamples=2000, confidence=0.95, seed=0):
+    """
+    Compare one candidate database against the original and write
+    gene_set_comparison.csv, gene_set_similarity.csv and gene_analysis.txt
+    into out_dir. Returns (comparison_result, similarity_stats); the stats
+    carry bootstrap CIs under "ci" unless n_resamples is 0.
+    """
+    os.makedirs(out_dir, exist_ok=True)
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Compare two GMT files and generate comparison outputs.")
-    parser.add_argument("--original_gmt", type=str, required=False,
-                        default="out/phenotype_consensus_gene_sets.gmt")
-    parser.add_argument("--new_gmt", type=str, required=False,
-                        default="out/Consensus_gene_sets.gmt")
+    # Compare gene sets
+    comparison_result = compare_gene_sets(original_gene_set, new_gene_set)
+    export_to_csv(comparison_result, filename=os.path.join(out_dir, "gene_set_comparison.csv"))
 
-    args = parser.parse_args()
+    # Calculate similarity
+    similarity_stats = compare_similarity(
+        original_gene_set, new_gene_set, output_csv=os.path.join(out_dir, "gene_set_similarity.csv")
+    )
 
-    original_gmt_file = args.original_gmt
-    new_gmt_file = args.new_gmt
+    # Bootstrap CIs over gene sets
+    similarity_stats["ci"] = bootstrap_similarity_ci(
+        similarity_stats["per_set"], n_resamples=n_resamples, confidence=confidence, seed=seed
+    )
+    similarity_stats["n_resamples"] = n_resamples
+    similarity_stats["confidence"] = confidence
 
-    # Output directory = same directory as new GMT
-    out_dir = os.path.join(os.path.dirname(new_gmt_file), "evaluation")
-    os.makedirs(out_dir, exist_ok=True)
+    # Write final text analysis
+    write_text_report(os.path.join(out_dir, "gene_analysis.txt"), comparison_result, similarity_stats)
 
-    # Output paths
-    comparison_csv = os.path.join(out_dir, "gene_set_comparison.csv")
-    similarity_csv = os.path.join(out_dir, "gene_set_similarity.csv")
-    text_report = os.path.join(out_dir, "gene_analysis.txt")
+    return comparison_result, similarity_stats
 
-    # Load GMTs
-    original_gene_set = parse_gmt(original_gmt_file)
-    new_gene_set = parse_gmt(new_gmt_file)
 
-    # Compare gene sets
-    comparison_result = compare_gene_sets(original_gene_set, new_gene_set)
-    export_to_csv(comparison_result, filename=comparison_csv)
+# MULTI-RUN EVALUATION
+# Long-format table: one row per run, gene set and metric. Run-level metrics
+# have an empty gene set.
+MATRIX_FILE = "evaluation_matrix.csv"
+MATRIX_HEADER = ["Run", "Gene Set Name", "Metric", "Value"]
 
-    # Calculate similarity
-    similarity_stats = compare_similarity(original_gene_set, new_gene_set, output_csv=similarity_csv)
 
-    # Write final text analysis
-    write_text_report(text_report, comparison_result, similarity_stats)
+def load_manifest(path):
+    """
+    Manifest JSON: {"reference": <original GMT>, "candidates": {<run name>: <GMT>, ...}}.
+    Relative paths are resolved against the manifest's directory.
+    """
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return p if os.path.isabs(p) else os.path.join(base, p)
+
+    return resolve(manifest["reference"]), {name: resolve(p) for name, p in manifest["candidates"].items()}
+
+
+def _long_rows(run, comparison_result, similarity_stats):
+    rows = []
+    for name, _, _, _, n_common, n_new, n_lost, n_original in comparison_result:
+        union = n_original + n_new
+        rows.extend([
+            [run, name, "# Common", n_common],
+            [run, name, "# New", n_new],
+            [run, name, "# Lost", n_lost],
+            [run, name, "# Original", n_original],
+            [run, name, "% Similarity", round(n_common / union * 100, 2) if union else 0],
+        ])
+    for metric, value in similarity_stats.items():
+        if metric in ("per_set", "ci", "n_resamples", "confidence"):
+            continue
+        rows.append([run, "", metric, value])
+    for metric, (low, high) in similarity_stats.get("ci", {}).items():
+        rows.append([run, "", f"{metric}_ci_low", low])
+        rows.append([run, "", f"{metric}_ci_high", high])
+    rows.append([run, "", "gene_sets_compared", len(comparison_result)])
+    return rows
+
+
+def _evaluate_run(run, new_gmt, original_gmt, out_dir, bootstrap):
+    # each worker loads the reference through the memory-mapped GMT cache
+    comparison_result, similarity_stats = evaluate(
+        parse_gmt(original_gmt), parse_gmt(new_gmt), os.path.join(out_dir, run), **bootstrap
+    )
+    return _long_rows(run, comparison_result, similarity_stats)
+
+
+def evaluate_manifest(manifest_path, out_dir, workers=None, **bootstrap):
+    """
+    Evaluate every candidate GMT of a manifest against its reference in
+    parallel. Each run keeps its per-pair CSVs under out_dir/<run>/, and all
+    runs are combined into out_dir/evaluation_matrix.csv. Extra keyword
+    arguments (n_resamples, confidence, seed) are passed to evaluate.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
 
-    print(f"\nSaved outputs to: {out_dir}")
-    print(f"- {comparison_csv}")
-    print(f"- {similarity_csv}")
-    print(f"- {text_report}")
+    original_gmt, candidates = load_manifest(manifest_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # parse the reference once up front so workers find its cache ready
+    parse_gmt(original_gmt)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_evaluate_run, run, gmt, original_gmt, out_dir, bootstrap): run
+            for run, gmt in candidates.items()
+        }
+        for future in as_completed(futures):
+            run = futures[future]
+            try:
+                results[run] = future.result()
+                print(f"Evaluated {run}")
+            except Exception as e:
+                print(f"Evaluation of {run} failed: {e}")
+
+    matrix_csv = os.path.join(out_dir, MATRIX_FILE)
+    with open(matrix_csv, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(MATRIX_HEADER)
+        for run in candidates:
+            writer.writerows(results.get(run, []))
+    return matrix_csv
+
+
+# main
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two GMT files and generate comparison outputs.")
+    parser.add_argument("--original_gmt", type=str, required=False,
+                        default="out/phenotype_consensus_gene_sets.gmt")
+    parser.add_argument("--new_gmt", type=str, required=False,
+                        default="out/Consensus_gene_sets.gmt")
+    parser.add_argument("--manifest", type=str, required=False, default=None,
+                        help="JSON manifest of candidate GMTs to evaluate against one reference in a single run.")
+    parser.add_argument("--out_dir", type=str, required=False, default="out/evaluation_matrix",
+                        help="Output directory for --manifest runs.")
+    parser.add_argument("--workers", type=int, required=False, default=None,
+                        help="Worker processes for --manifest runs (default: all CPUs).")
+    parser.add_argument("--bootstrap", type=int, required=False, default=2000,
+                        help="Bootstrap resamples of the gene sets for the similarity CIs (0 disables).")
+    parser.add_argument("--confidence", type=float, required=False, default=0.95,
+                        help="Confidence level of the bootstrap intervals.")
+    parser.add_argument("--seed", type=int, required=False, default=0,
+                        help="Random seed of the bootstrap.")
+
+    args = parser.parse_args()
+    bootstrap = {"n_resamples": args.bootstrap, "confidence": args.confidence, "seed": args.seed}
+
+    if args.manifest:
+        matrix_csv = evaluate_manifest(args.manifest, args.out_dir, workers=args.workers, **bootstrap)
+        print(f"\nSaved outputs to: {args.out_dir}")
+        print(f"- {matrix_csv}")
+        print("- <run>/gene_set_comparison.csv, gene_set_similarity.csv, gene_analysis.txt")
+    else:
+        # Output directory = same directory as new GMT
+        out_dir = os.path.join(os.path.dirname(args.new_gmt), "evaluation")
+
+        evaluate(parse_gmt(args.original_gmt), parse_gmt(args.new_gmt), out_dir, **bootstrap)
+
+        print(f"\nSaved outputs to: {out_dir}")
+        print(f"- {os.path.join(out_dir, 'gene_set_comparison.csv')}")
+        print(f"- {os.path.join(out_dir, 'gene_set_similarity.csv')}")
+        print(f"- {os.path.join(out_dir, 'gene_analysis.txt')}")
@@ -1,166 +1,195 @@
 import os
-import re
 import json
+import hashlib
 import argparse
 
-
-def clean_repetitions(text):
-    text = re.sub(r"\s+", " ", text.strip())
-    chunks = re.split(r"}\s*{", text)
-
-    seen = set()
-    cleaned = []
-
-    for ch in chunks:
-        norm = ch.strip().lower()
-        if norm not in seen:
-            seen.add(norm)
-            cleaned.append(ch.strip())
-
-    joined = "},\n{".join(cleaned)
-    return "{" + joined + "}" if not joined.startswith("{") else joined
-
-
-def repair_json_structure(raw_text):
-    cleaned = re.sub(r"[\x00-\x1f]+", "", raw_text).strip()
-
-    if not cleaned.startswith("["):
-        cleaned = "[" + cleaned
-    if not cleaned.endswith("]"):
-        cleaned = cleaned.rstrip(",") + "]"
-
-    if cleaned.count("{") > cleaned.count("}"):
-        cleaned += "}" * (cleaned.count("{") - cleaned.count("}"))
-    if cleaned.count("[") > cleaned.count("]"):
-        cleaned += "]" * (cleaned.count("[") - cleaned.count("]"))
-
-    return cleaned
-
-
-def format_raw_files(input_dir):
-    for fname in os.listdir(input_dir):
-        if not fname.endswith("_raw.txt"):
-            continue
-
-        path = os.path.join(input_dir, fname)
-        print(f"Formatting raw file: {fname}")
-
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+import llm_json
+
+# Per-tree record of the raw files already repaired:
+#   {relative path: {"size", "mtime_ns", "sha256", "output_mtime_ns", "entries"}}
+# A raw file is repaired again only if it is new, its size changed, or its
+# mtime changed and its content hash no longer matches, or if its .json was
+# removed or rewritten since (e.g. by a new pipeline run).
+MANIFEST_FILE = ".repair_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def gene_pmid_key(obj):
+    """Objects naming the same gene for the same PMID are repeats."""
+    return json.dumps([obj.get("Gene"), obj.get("PMID")])
+
+
+def repair_text(raw):
+    """
+    Recover the gene objects of one raw LLM output in a single pass
+    (see llm_json), as a list.
+    """
+    data = llm_json.loads(raw, default=[], key=gene_pmid_key)
+    if not isinstance(data, list):
+        data = [data]
+    return data
+
+
+def output_path(raw_path):
+    return raw_path[:-len("_raw.txt")] + ".json"
+
+
+def find_raw_files(root):
+    """Every *_raw.txt under root, recursively, in a stable order."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        paths.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith("_raw.txt"))
+    return paths
+
+
+# MANIFEST
+def load_manifest(root):
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return manifest.get("files", {}) if manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def save_manifest(root, files):
+    path = os.path.join(root, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_up_to_date(entry, path):
+    """
+    Whether a raw file and its output still match its manifest entry (hashing
+    only when the mtime moved; a matching hash refreshes the stored mtime).
+    """
+    out = output_path(path)
+    if entry is None or not os.path.exists(out) or entry.get("output_mtime_ns") != os.stat(out).st_mtime_ns:
+        return False
+    st = os.stat(path)
+    if entry.get("size") != st.st_size:
+        return False
+    if entry.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    with open(path, "rb") as f:
+        if entry.get("sha256") != _sha256(f.read()):
+            return False
+    entry["mtime_ns"] = st.st_mtime_ns
+    return True
+
+
+# REPAIR
+def repair_file(path):
+    """
+    Repair one raw file in memory and write <name>.json next to it.
+    Returns (path, manifest entry or None if nothing was recovered, error).
+    """
+    try:
+        st = os.stat(path)
+        with open(path, "rb") as f:
             raw = f.read()
-
-        # Step 1: remove repeated chunks
-        cleaned_text = clean_repetitions(raw)
-
-        # Step 2: repair JSON structure
-        cleaned_text = repair_json_structure(cleaned_text)
-
-        # Try to parse
+        data = repair_text(raw.decode("utf-8", errors="ignore"))
+        if not data:
+            return path, None, None
+
+        out = output_path(path)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        entry = {
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256(raw),
+            "output_mtime_ns": os.stat(out).st_mtime_ns, "entries": len(data),
+        }
+        return path, entry, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def repair_tree(root, workers=None, force=False):
+    """
+    Repair every new or changed *_raw.txt under root in a process pool.
+    Returns the raw files whose repair is current (this run's and unchanged ones).
+    """
+    manifest = load_manifest(root)
+    raw_files = find_raw_files(root)
+    todo = [p for p in raw_files if force or not is_up_to_date(manifest.get(os.path.relpath(p, root)), p)]
+    print(f"{len(raw_files)} raw files, {len(raw_files) - len(todo)} unchanged, {len(todo)} to repair")
+
+    if workers == 1 or len(todo) <= 1:
+        results = [repair_file(p) for p in todo]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(todo) // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(repair_file, todo, chunksize=chunksize))
+
+    pending = set(todo)
+    repaired = [p for p in raw_files if p not in pending]
+    for path, entry, error in results:
+        rel = os.path.relpath(path, root)
+        if error:
+            print(f"⚠ Could not repair {rel}: {error}")
+        elif entry is None:
+            print(f"⚠ No JSON objects recovered from {rel}. Keeping the raw file.")
+            manifest.pop(rel, None)
+        else:
+            print(f"✔ Repaired {entry['entries']} entries → {os.path.relpath(output_path(path), root)}")
+            manifest[rel] = entry
+            repaired.append(path)
+
+    # forget raw files that no longer exist
+    present = {os.path.relpath(p, root) for p in raw_files}
+    manifest = {rel: entry for rel, entry in manifest.items() if rel in present}
+    save_manifest(root, manifest)
+    return repaired
+
+
+def delete_raw_files(paths):
+    deleted = 0
+    for path in paths:
         try:
-            data = json.loads(cleaned_text)
-
-            if isinstance(data, dict):
-                data = [data]
-            elif not isinstance(data, list):
-                data = [data]
-
-            out_path = os.path.join(input_dir, fname.replace("_raw.txt", "_fixed.json"))
-            with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-
-            print(f"✔ Saved valid JSON: {out_path}")
-
+            os.remove(path)
+            print(f"🗑️ Deleted: {path}")
+            deleted += 1
         except Exception as e:
-            # Save fallback cleaned text
-            out_txt = os.path.join(input_dir, fname.replace("_raw.txt", "_cleaned.txt"))
-            with open(out_txt, "w", encoding="utf-8") as f:
-                f.write(cleaned_text)
+            print(f"Could not delete {path}: {e}")
 
-            print(f"⚠ Could not fully repair {fname}. Saved cleaned text to {out_txt}")
+    print(f"\n✔ Done. Deleted {deleted} raw files.")
 
 
-def extract_json_objects(text):
-    pattern = re.compile(r"\{[^{}]+\}")
-    matches = pattern.findall(text)
+def main(input_dir, workers=None, force=False, delete_raw=False):
+    print("\nRepair RAW LLM JSON ===")
+    repaired = repair_tree(input_dir, workers=workers, force=force)
 
-    objs = []
-    for m in matches:
-        try:
-            objs.append(json.loads(m))
-        except Exception:
-            safe = m.replace("'", '"')
-            safe = re.sub(r",\s*}", "}", safe)
-            try:
-                objs.append(json.loads(safe))
-            except:
-                continue
+    if delete_raw:
+        print("\nDelete repaired RAW files ===")
+        delete_raw_files(repaired)
 
-    return objs
-
-
-def repair_flat_json_files(input_dir):
-    for fname in os.listdir(input_dir):
-        if not fname.endswith("_cleaned.txt"):
-            continue
-
-        path = os.path.join(input_dir, fname)
-        print(f"Repairing flat JSON: {fname}")
-
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read()
-
-        objs = extract_json_objects(text)
-
-        seen = set()
-        deduped = []
-        for obj in objs:
-            key = (obj.get("Gene"), obj.get("PMID"))
-            if key not in seen:
-                seen.add(key)
-                deduped.append(obj)
-
-        out_json = path.replace("_cleaned.txt", ".json")
-        with open(out_json, "w", encoding="utf-8") as f:
-            json.dump(deduped, f, indent=2, ensure_ascii=False)
-
-        print(f"✔ Repaired {len(deduped)} entries → {out_json}")
-
-
-def delete_temp_files(input_dir):
-    deleted = 0
-    for fname in os.listdir(input_dir):
-        if fname.endswith("_raw.txt") or fname.endswith("_cleaned.txt"):
-            try:
-                os.remove(os.path.join(input_dir, fname))
-                print(f"🗑️ Deleted: {fname}")
-                deleted += 1
-            except Exception as e:
-                print(f"Could not delete {fname}: {e}")
-
-    print(f"\n✔ Done. Deleted {deleted} temp files.")
-
-
-
-
-def main(input_dir):
-    print("\nFormat RAW LLM JSON ===")
-    format_raw_files(input_dir)
-
-    print("\nRepair Flat JSON ===")
-    repair_flat_json_files(input_dir)
-
-    print("\nDelete RAW + CLEANED Files ===")
-    delete_temp_files(input_dir)
-
-    print("\nAll LLM outputs repaired and cleaned!")
+    print("\nAll LLM outputs repaired!")
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Fix raw LLM outputs in a directory.")
+    parser = argparse.ArgumentParser(description="Fix raw LLM outputs in a directory tree.")
     parser.add_argument(
         "--dir", type=str,
         required=True,
-        help="Directory containing *_raw.txt and *_cleaned.txt files"
+        help="Directory searched recursively for *_raw.txt files (e.g. out/phenotype_generations)"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs).")
+    parser.add_argument("--force", action="store_true", help="Repair every raw file, even if unchanged.")
+    parser.add_argument(
+        "--delete_raw", action="store_true",
+        help="Delete raw files once repaired (they are otherwise kept, and skipped on later runs while unchanged)."
     )
 
     args = parser.parse_args()
-    main(args.dir)
+    main(args.dir, workers=args.workers, force=args.force, delete_raw=args.delete_raw)
@@ -1,5 +1,6 @@
 import re
 from difflib import SequenceMatcher
+from collections import Counter
 import math
 
 def normalize_text(t: str) -> str:
@@ -50,4 +51,111 @@ def hybrid_similarity(extract: str, abstract_text: str) -> float:
 
     # weighted hybrid
     score = (0.4 * jac) + (0.4 * seq) + (0.2 * key_overlap)
-    return score
\ No newline at end of file
+    return score
+
+class AbstractIndex:
+    """
+    Per-phenotype index of abstracts for PMID attribution.
+
+    Precomputes each abstract's normalized text, token and keyword sets,
+    character counts and a SequenceMatcher primed with the abstract, plus an
+    inverted token index. best_match() returns exactly what scoring every
+    abstract with hybrid_similarity would, but only runs SequenceMatcher on
+    candidates whose upper-bound score can still beat the current best.
+    """
+
+    def __init__(self, abstracts: list):
+        self.pmids = []
+        self.texts = []
+        self.tokens = []
+        self.keywords = []
+        self.char_counts = []
+        self.matchers = []
+        self.postings = {}
+
+        for i, doc in enumerate(abstracts):
+            text = normalize_text(doc.get("title", "") + " " + doc.get("abstract", ""))
+            tokens = set(text.split())
+
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(text)
+
+            self.pmids.append(str(doc.get("pmid", "")).strip())
+            self.texts.append(text)
+            self.tokens.append(tokens)
+            self.keywords.append({w for w in tokens if len(w) > 5})
+            self.char_counts.append(Counter(text))
+            self.matchers.append(matcher)
+            for w in tokens:
+                self.postings.setdefault(w, []).append(i)
+
+    def __len__(self):
+        return len(self.pmids)
+
+    def best_match(self, extract: str, threshold: float = 0.0):
+        """
+        Return (pmid, score) of the highest-scoring abstract (earliest on ties),
+        or (None, score) if no abstract can reach the threshold.
+        """
+        extract_n = normalize_text(extract)
+        A = set(extract_n.split())
+        keyA = {w for w in A if len(w) > 5}
+        la = len(extract_n)
+        n = len(self.pmids)
+
+        # token and keyword overlaps for every abstract via the inverted index
+        inter = [0] * n
+        key_inter = [0] * n
+        for w in A:
+            is_key = len(w) > 5
+            for i in self.postings.get(w, ()):
+                inter[i] += 1
+                if is_key:
+                    key_inter[i] += 1
+
+        partial = []
+        bounds = []
+        for i in range(n):
+            B = self.tokens[i]
+            if A and B:
+                union = len(A) + len(B) - inter[i]
+                jac = inter[i] / union if union > 0 else 0.0
+            else:
+                jac = 0.0
+            if keyA and self.keywords[i]:
+                key_overlap = key_inter[i] / len(keyA)
+            else:
+                key_overlap = 0
+            # SequenceMatcher.ratio() <= real_quick_ratio()
+            lb = len(self.texts[i])
+            real_quick = 2.0 * min(la, lb) / (la + lb) if la + lb else 1.0
+            partial.append((jac, key_overlap))
+            bounds.append((0.4 * jac) + (0.4 * real_quick) + (0.2 * key_overlap))
+
+        extract_counts = None
+        best_i, best_score = None, -1.0
+        for i in sorted(range(n), key=lambda j: (-bounds[j], j)):
+            if bounds[i] < best_score or bounds[i] < threshold:
+                break
+            jac, key_overlap = partial[i]
+            lb = len(self.texts[i])
+
+            # tighter bound: SequenceMatcher.ratio() <= quick_ratio()
+            if extract_counts is None:
+                extract_counts = Counter(extract_n)
+            common = sum((extract_counts & self.char_counts[i]).values())
+            quick = 2.0 * common / (la + lb) if la + lb else 1.0
+            bound = (0.4 * jac) + (0.4 * quick) + (0.2 * key_overlap)
+            if bound < best_score or bound < threshold:
+                continue
+
+            matcher = self.matchers[i]
+            matcher.set_seq1(extract_n)
+            seq = matcher.ratio()
+            score = (0.4 * jac) + (0.4 * seq) + (0.2 * key_overlap)
+            if score > best_score or (score == best_score and i < best_i):
+                best_i, best_score = i, score
+
+        if best_i is None or best_score < threshold:
+            return None, best_score
+        return self.pmids[best_i], best_score
@@ -1,22 +1,54 @@
 import os
+import re
 import json
+import zlib
+import hashlib
+from contextlib import contextmanager
+from html import escape
 from typing import Dict, List, Any
 from datetime import datetime
-from difflib import SequenceMatcher
 import argparse
-from gene_construtor_utils import normalize_text, hybrid_similarity
+from gene_construtor_utils import normalize_text, AbstractIndex
 
-from utils import id_mapping   
+from utils import id_mapping, prefetch_ids
+from checker_store import store_exists, load_checks
 
 # location of the abstracts 
 ABSTRACTS_DIR = "abstracts/gene_annotated_abstracts"
 
-processed_file = "processed_gene_sets_llama.txt"
-if os.path.exists(processed_file):
-    with open(processed_file, "r") as f:
-        processed = {line.strip() for line in f if line.strip()}
-else:
-    processed = set()
+# minimum hybrid similarity for attributing an extract to an abstract
+PMID_MATCH_THRESHOLD = 0.40
+
+# per-phenotype fingerprints and cached results for --incremental rebuilds;
+# bump the version whenever merge, correction or GMT line format changes
+BUILD_STATE_VERSION = 1
+
+PROCESSED_FILE = "processed_gene_sets_llama.txt"
+_processed = None
+
+
+def get_processed() -> set:
+    """Phenotypes the checker has finished, read from PROCESSED_FILE on first use."""
+    global _processed
+    if _processed is None:
+        _processed = set()
+        if os.path.exists(PROCESSED_FILE):
+            with open(PROCESSED_FILE, "r") as f:
+                _processed = {line.strip() for line in f if line.strip()}
+    return _processed
+
+@contextmanager
+def _atomic_open(path: str, mode: str = "w"):
+    """Write to a temporary file next to path and move it into place on success."""
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, mode) as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
 
 # normalize & de-duplicate PMIDs
 def _normalize_pmids(pmids_field: Any) -> List[str]:
@@ -62,7 +94,11 @@ def _load_phenotype_abstracts(phenotype: str) -> List[dict]:
         return []
 
 
-def _guess_pmids_for_extract(extract: str, abstracts: list) -> list:
+def _guess_pmids_for_extract(extract: str, abstracts) -> list:
+    """
+    Attribute an extract to the best-matching abstract by hybrid similarity.
+    `abstracts` may be a list of abstract dicts or a prebuilt AbstractIndex.
+    """
     if not extract or not abstracts:
         return []
 
@@ -70,22 +106,11 @@ def _guess_pmids_for_extract(extract: str, abstracts: list) -> list:
     if not extract_norm:
         return []
 
-    best_scores = []
-    for doc in abstracts:
-        pmid = str(doc.get("pmid", "")).strip()
-        text = (doc.get("title", "") + " " + doc.get("abstract", ""))
-
-        score = hybrid_similarity(extract, text)
-        best_scores.append((pmid, score))
-
-    # Sort by best match
-    best_scores.sort(key=lambda x: x[1], reverse=True)
-
-    # Highest score
-    top_pmid, top_score = best_scores[0]
+    index = abstracts if isinstance(abstracts, AbstractIndex) else AbstractIndex(abstracts)
 
     # Threshold: paraphrased quotes usually score 0.45 - 0.75
-    if top_score >= 0.40:
+    top_pmid, _ = index.best_match(extract, threshold=PMID_MATCH_THRESHOLD)
+    if top_pmid is not None:
         return [top_pmid]
 
     return []
@@ -106,10 +131,13 @@ def _correct_extracted_pmids_for_phenotype(
     if not abstracts:
         return entries
 
+    # index the phenotype's abstracts once for all its entries
+    index = AbstractIndex(abstracts)
+
     changed = False
     for e in entries:
         extract = e.get("Source Reference") or e.get("Supporting Extract") or ""
-        new_pmids = _guess_pmids_for_extract(extract, abstracts)
+        new_pmids = _guess_pmids_for_extract(extract, index)
         if new_pmids:
             old_pmids = _normalize_pmids(e.get("PMID") or e.get("PMIDS"))
             new_pmids = _unique_list(new_pmids + old_pmids)  # keep any old if useful
@@ -122,7 +150,7 @@ def _correct_extracted_pmids_for_phenotype(
     if changed:
         out_path = os.path.join(extracted_dir, f"{phenotype}.json")
         try:
-            with open(out_path, "w") as f:
+            with _atomic_open(out_path) as f:
                 json.dump(entries, f, indent=2)
             print(f"Corrected PMIDs for {phenotype} and updated {out_path}")
         except Exception as e:
@@ -137,6 +165,7 @@ def load_extracted_genes(extracted_dir: str) -> Dict[str, List[dict]]:
         print(f"extracted_dir '{extracted_dir}' not found, skipping extracted genes.")
         return pheno_to_extracted
 
+    processed = get_processed()
     for fname in os.listdir(extracted_dir):
         if not fname.endswith(".json"):
             continue
@@ -145,22 +174,50 @@ def load_extracted_genes(extracted_dir: str) -> Dict[str, List[dict]]:
             continue
         fpath = os.path.join(extracted_dir, fname)
         try:
-            with open(fpath, "r") as f:
-                data = json.load(f)
-            if isinstance(data, dict):
-                data = [data]
-
-            # Tag and correct PMIDs using abstracts
-            for d in data:
-                d.setdefault("Source", "Extracted")
-            data = _correct_extracted_pmids_for_phenotype(pheno_name, data, extracted_dir)
-
-            pheno_to_extracted[pheno_name] = data
+            pheno_to_extracted[pheno_name] = _load_extracted_file(pheno_name, extracted_dir)
         except Exception as e:
             print(f"Could not read extracted file {fpath}: {e}")
     return pheno_to_extracted
 
+
+def _load_extracted_file(pheno_name: str, extracted_dir: str) -> List[dict]:
+    """Load one phenotype's extracted genes, tagging them and correcting their PMIDs."""
+    with open(os.path.join(extracted_dir, f"{pheno_name}.json"), "r") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = [data]
+
+    # Tag and correct PMIDs using abstracts
+    for d in data:
+        d.setdefault("Source", "Extracted")
+    return _correct_extracted_pmids_for_phenotype(pheno_name, data, extracted_dir)
+
+
+def _list_extracted_phenotypes(extracted_dir: str) -> List[str]:
+    """Processed phenotypes that have an extracted JSON, without reading the files."""
+    if not os.path.exists(extracted_dir):
+        print(f"extracted_dir '{extracted_dir}' not found, skipping extracted genes.")
+        return []
+    processed = get_processed()
+    names = (os.path.splitext(f)[0] for f in os.listdir(extracted_dir) if f.endswith(".json"))
+    return sorted(n for n in names if n in processed)
+
 # LOAD VERIFIED GENES
+def load_verified_genes_from_store(model_name: str) -> Dict[str, List[dict]]:
+    """Bulk-load validated checker results from the per-model results store."""
+    pheno_to_verified: Dict[str, List[dict]] = {}
+    for pheno_name, genes in load_checks(model_name).items():
+        entries: List[dict] = []
+        for data in genes.values():
+            # only keep validated ones
+            if isinstance(data, dict) and str(data.get("Validation", "")).lower() == "yes":
+                data.setdefault("Source", "Verified")
+                entries.append(data)
+        if entries:
+            pheno_to_verified[pheno_name] = entries
+    return pheno_to_verified
+
+
 def load_verified_genes(verified_dir: str) -> Dict[str, List[dict]]:
     pheno_to_verified: Dict[str, List[dict]] = {}
     if not os.path.exists(verified_dir):
@@ -265,96 +322,127 @@ def merge_extracted_and_verified(
     return merged
 
 # BUILD GMTs from merged data
+def _gmt_lines_for_phenotype(phenotype: str, entries: List[dict]):
+    """
+    Map one phenotype's genes to Entrez and return
+    (symbols line or None, entrez line or None, unmapped symbols).
+    """
+    # collect unique gene symbols
+    symbols = sorted({e["Gene"] for e in entries if e.get("Gene")})
+    if not symbols:
+        return None, None, []
+
+    # map to entrez
+    mapped_ids, valid_syms, invalid_syms = id_mapping(symbols, mode="entrezgene")
+
+    # build symbol based on successful entrez mappings
+    sym_to_entrez = {sym: str(eid) for sym, eid in zip(valid_syms, mapped_ids)}
+
+    if not sym_to_entrez:
+        return None, None, list(invalid_syms)
+
+    # Only keep successfully mapped symbols in both GMTs
+    mapped_symbols = sorted(sym_to_entrez.keys())
+    entrez_ids = [sym_to_entrez[s] for s in mapped_symbols]
+
+    sym_line = (
+        phenotype
+        + "\t"
+        + "combined extracted+verified (symbols)"
+        + "\t"
+        + "\t".join(mapped_symbols)
+        + "\n"
+    )
+    ent_line = (
+        phenotype
+        + "\t"
+        + "combined extracted+verified (entrez)"
+        + "\t"
+        + "\t".join(entrez_ids)
+        + "\n"
+    )
+    return sym_line, ent_line, list(invalid_syms)
+
+
+def _write_gmt_lines(lines: List[str], out_path: str):
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with _atomic_open(out_path) as f:
+        f.writelines(lines)
+
+
 def build_gmts_from_merged(
     pheno_to_entries: Dict[str, List[dict]],
     out_symbols: str,
     out_entrez: str,
 ):
-    os.makedirs(os.path.dirname(out_symbols), exist_ok=True)
-    os.makedirs(os.path.dirname(out_entrez), exist_ok=True)
-
     unmapped_per_pheno: Dict[str, List[str]] = {}
+    sym_lines, ent_lines = [], []
 
-    with open(out_symbols, "w") as f_sym, open(out_entrez, "w") as f_ent:
-        for phenotype, entries in pheno_to_entries.items():
-            # collect unique gene symbols
-            symbols = sorted({e["Gene"] for e in entries if e.get("Gene")})
-            if not symbols:
-                continue
-
-            # map to entrez
-            mapped_ids, valid_syms, invalid_syms = id_mapping(symbols, mode="entrezgene")
+    # one remote lookup for every symbol not resolvable locally
+    prefetch_ids([e["Gene"] for entries in pheno_to_entries.values() for e in entries if e.get("Gene")])
 
-            if invalid_syms:
-                unmapped_per_pheno.setdefault(phenotype, []).extend(invalid_syms)
+    for phenotype, entries in pheno_to_entries.items():
+        sym_line, ent_line, invalid_syms = _gmt_lines_for_phenotype(phenotype, entries)
+        if invalid_syms:
+            unmapped_per_pheno.setdefault(phenotype, []).extend(invalid_syms)
+        if sym_line:
+            sym_lines.append(sym_line)
+            ent_lines.append(ent_line)
+
+    _write_gmt_lines(sym_lines, out_symbols)
+    _write_gmt_lines(ent_lines, out_entrez)
+    return unmapped_per_pheno
 
-            # build symbol based on successful entrez mappings
-            sym_to_entrez = {sym: str(eid) for sym, eid in zip(valid_syms, mapped_ids)}
 
-            if not sym_to_entrez:
-                continue
-
-            # Only keep successfully mapped symbols in both GMTs
-            mapped_symbols = sorted(sym_to_entrez.keys())
-            entrez_ids = [sym_to_entrez[s] for s in mapped_symbols]
-
-            # symbols GMT line
-            f_sym.write(
-                phenotype
-                + "\t"
-                + "combined extracted+verified (symbols)"
-                + "\t"
-                + "\t".join(mapped_symbols)
-                + "\n"
-            )
+# INCREMENTAL BUILD STATE
+def _file_digest(path: str) -> str:
+    if not os.path.exists(path):
+        return ""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _phenotype_fingerprint(phenotype: str, extracted_dir: str, verified_entries: List[dict]) -> str:
+    """Hash of everything a phenotype's merged entries and GMT lines are computed from."""
+    payload = json.dumps(
+        {
+            "version": BUILD_STATE_VERSION,
+            "threshold": PMID_MATCH_THRESHOLD,
+            "extracted": _file_digest(os.path.join(extracted_dir, f"{phenotype}.json")),
+            "abstracts": _file_digest(os.path.join(ABSTRACTS_DIR, phenotype)),
+            "verified": verified_entries,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_build_state(path: str) -> Dict[str, dict]:
+    """Per-phenotype {fingerprint, merged, symbols_line, entrez_line, unmapped} from the last build."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring unreadable build state {path}: {e}")
+        return {}
+    if state.get("version") != BUILD_STATE_VERSION:
+        return {}
+    return state.get("phenotypes", {})
 
-            # entrez GMT line
-            f_ent.write(
-                phenotype
-                + "\t"
-                + "combined extracted+verified (entrez)"
-                + "\t"
-                + "\t".join(entrez_ids)
-                + "\n"
-            )
 
-    return unmapped_per_pheno
+def save_build_state(phenotypes: Dict[str, dict], path: str):
+    with _atomic_open(path) as f:
+        json.dump({"version": BUILD_STATE_VERSION, "phenotypes": phenotypes}, f)
 
 
 # HTML SUMMARY
-def save_html_summary(
-    pheno_to_entries: Dict[str, List[dict]],
-    html_out: str,
-    title: str = "Phenotype -> Genes (Extracted + Verified)",
-):
-    os.makedirs(os.path.dirname(html_out), exist_ok=True)
-
-    rows = []
-    for phenotype, entries in pheno_to_entries.items():
-        for e in entries:
-            gene = e.get("Gene", "")
-            source = e.get("Source", "")
-            journal = e.get("Journal", "")
-            ref = e.get("Source Reference", "")
-            pmids = e.get("PMIDS", [])
-
-            pmid_links = ", ".join(
-                f'<a href="https://pubmed.ncbi.nlm.nih.gov/{p}/" target="_blank">{p}</a>'
-                for p in pmids
-            )
-
-            rows.append(
-                f"<tr>"
-                f"<td>{phenotype}</td>"
-                f"<td>{gene}</td>"
-                f"<td>{source}</td>"
-                f"<td>{journal}</td>"
-                f"<td>{pmid_links}</td>"
-                f"<td>{ref}</td>"
-                f"</tr>"
-            )
-
-    html = f"""<!DOCTYPE html>
+_HTML_HEAD = """<!DOCTYPE html>
 <html>
 <head>
   <meta charset="utf-8">
@@ -366,7 +454,7 @@ def save_html_summary(
       font-family: Arial, sans-serif;
       margin: 20px;
     }}
-    /* Show full text, no ellipsis                 *** CHANGED *** */
+    /* Show full text, no ellipsis */
     table.dataTable td {{
       white-space: normal;
       word-wrap: break-word;
@@ -376,28 +464,25 @@ def save_html_summary(
 </head>
 <body>
   <h1>{title}</h1>
-  <p>Generated: {datetime.utcnow().isoformat()} UTC</p>
-  <table id="phenoGenes" class="display" style="width:100%">
+  <p>Generated: {generated} UTC</p>
+  {intro}
+  <table id="{table_id}" class="display" style="width:100%">
     <thead>
       <tr>
-        <th>Phenotype</th>
-        <th>Gene</th>
-        <th>Source</th>
-        <th>Journal</th>
-        <th>PMIDs</th>
-        <th>Supporting / Source Extract</th>
+{columns}
       </tr>
     </thead>
     <tbody>
-      {''.join(rows)}
-    </tbody>
+"""
+
+_HTML_TAIL = """    </tbody>
   </table>
 
   <script src="https://code.jquery.com/jquery-3.7.1.min.js"></script>
   <script src="https://cdn.datatables.net/1.13.6/js/jquery.dataTables.min.js"></script>
   <script>
     $(document).ready(function() {{
-        $('#phenoGenes').DataTable({{
+        $('#{table_id}').DataTable({{
             pageLength: 25
         }});
     }});
@@ -405,9 +490,97 @@ def save_html_summary(
 </body>
 </html>
 """
-    with open(html_out, "w") as f:
-        f.write(html)
-    print(f"HTML summary written to {html_out}")
+
+
+def _html_page_name(phenotype: str) -> str:
+    """Filesystem-safe, collision-free page name for a phenotype."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", phenotype).strip("_")[:80]
+    return f"{slug}_{zlib.crc32(phenotype.encode('utf-8')):08x}.html"
+
+
+def _write_html_head(f, title: str, table_id: str, columns: List[str], intro: str = ""):
+    f.write(_HTML_HEAD.format(
+        title=escape(title),
+        generated=datetime.utcnow().isoformat(),
+        intro=intro,
+        table_id=table_id,
+        columns="\n".join(f"        <th>{escape(c)}</th>" for c in columns),
+    ))
+
+
+def save_html_summary(
+    pheno_to_entries: Dict[str, List[dict]],
+    html_out: str,
+    title: str = "Phenotype -> Genes (Extracted + Verified)",
+):
+    """
+    Stream the evidence report to disk: html_out is an index page with
+    per-phenotype gene counts, linking to one page per phenotype in
+    <html_out without extension>_pages/. Rows are escaped and written as they
+    are produced, so the full table is never held in memory. Pages left over
+    from earlier builds for phenotypes no longer in the report are removed.
+    """
+    os.makedirs(os.path.dirname(html_out), exist_ok=True)
+    pages_dir = os.path.splitext(html_out)[0] + "_pages"
+    os.makedirs(pages_dir, exist_ok=True)
+    pages_rel = os.path.basename(pages_dir)
+    written = set()
+
+    with _atomic_open(html_out) as index:
+        _write_html_head(
+            index, title, "phenotypes",
+            ["Phenotype", "Genes", "Extracted", "Verified", "Both"],
+            intro="<p>Select a phenotype to see its genes and supporting evidence.</p>",
+        )
+
+        for phenotype, entries in pheno_to_entries.items():
+            page_name = _html_page_name(phenotype)
+            written.add(page_name)
+            counts = {"Extracted": 0, "Verified": 0, "Both": 0}
+
+            with _atomic_open(os.path.join(pages_dir, page_name)) as page:
+                _write_html_head(
+                    page, f"{phenotype}: genes (Extracted + Verified)", "phenoGenes",
+                    ["Gene", "Source", "Journal", "PMIDs", "Supporting / Source Extract"],
+                    intro=f'<p><a href="../{escape(os.path.basename(html_out))}">Back to all phenotypes</a></p>',
+                )
+                for e in entries:
+                    source = e.get("Source", "")
+                    if source in counts:
+                        counts[source] += 1
+
+                    pmid_links = ", ".join(
+                        f'<a href="https://pubmed.ncbi.nlm.nih.gov/{escape(str(p))}/" target="_blank">{escape(str(p))}</a>'
+                        for p in e.get("PMIDS", [])
+                    )
+                    page.write(
+                        f"<tr>"
+                        f"<td>{escape(str(e.get('Gene', '')))}</td>"
+                        f"<td>{escape(str(source))}</td>"
+                        f"<td>{escape(str(e.get('Journal', '') or ''))}</td>"
+                        f"<td>{pmid_links}</td>"
+                        f"<td>{escape(str(e.get('Source Reference', '') or ''))}</td>"
+                        f"</tr>\n"
+                    )
+                page.write(_HTML_TAIL.format(table_id="phenoGenes"))
+
+            index.write(
+                f"<tr>"
+                f'<td><a href="{pages_rel}/{page_name}">{escape(phenotype)}</a></td>'
+                f"<td>{len(entries)}</td>"
+                f"<td>{counts['Extracted']}</td>"
+                f"<td>{counts['Verified']}</td>"
+                f"<td>{counts['Both']}</td>"
+                f"</tr>\n"
+            )
+
+        index.write(_HTML_TAIL.format(table_id="phenotypes"))
+
+    for name in os.listdir(pages_dir):
+        if name.endswith(".html") and name not in written:
+            os.remove(os.path.join(pages_dir, name))
+
+    print(f"HTML summary written to {html_out} (per-phenotype pages in {pages_dir})")
 
 
 
@@ -415,7 +588,7 @@ def save_html_summary(
 
 def save_unmapped(unmapped: Dict[str, List[str]], out_path: str):
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w") as f:
+    with _atomic_open(out_path) as f:
         json.dump(unmapped, f, indent=2)
     print(f"Unmapped genes written to {out_path}")
 
@@ -424,7 +597,7 @@ def save_unmapped(unmapped: Dict[str, List[str]], out_path: str):
 #MAIN
 
 
-def main(model_name: str):
+def main(model_name: str, incremental: bool = False):
 
     # Directories derived directly from the model name
     extracted_dir = f"out/phenotype_generations/{model_name}"
@@ -432,25 +605,60 @@ def main(model_name: str):
     out_dir       = f"out/genesets/{model_name}"
 
     os.makedirs(out_dir, exist_ok=True)
+    state_path = os.path.join(out_dir, f"build_state_{model_name}.json")
+    previous = load_build_state(state_path) if incremental else {}
 
     # Load data
-    extracted = load_extracted_genes(extracted_dir)
-    verified  = load_verified_genes(verified_dir)
+    if store_exists(model_name):
+        verified = load_verified_genes_from_store(model_name)
+    else:
+        # legacy one-file-per-gene layout
+        verified = load_verified_genes(verified_dir)
 
     # Filter to phenotypes present in both
-    common = set(extracted.keys()) & set(verified.keys())
-    extracted = {k: v for k, v in extracted.items() if k in common}
-    verified  = {k: v for k, v in verified.items() if k in common}
-
+    common = [p for p in _list_extracted_phenotypes(extracted_dir) if p in verified]
     print(f"Phenotypes kept (in extracted & verified only): {len(common)}")
 
-    # Merge
-    merged = merge_extracted_and_verified(extracted, verified)
+    # Only phenotypes whose inputs changed are reloaded, corrected and merged
+    state: Dict[str, dict] = {}
+    changed: Dict[str, List[dict]] = {}
+    for pheno in common:
+        fingerprint = _phenotype_fingerprint(pheno, extracted_dir, verified[pheno])
+        cached = previous.get(pheno)
+        if cached is not None and cached.get("fingerprint") == fingerprint:
+            state[pheno] = cached
+            continue
+        try:
+            extracted = _load_extracted_file(pheno, extracted_dir)
+        except Exception as e:
+            print(f"Could not read extracted file for {pheno}: {e}")
+            continue
+        changed[pheno] = merge_extracted_and_verified({pheno: extracted}, {pheno: verified[pheno]})[pheno]
+
+    if incremental:
+        print(f"Reusing {len(state)} unchanged phenotypes, rebuilding {len(changed)}")
+
+    # Merge and map the changed phenotypes
+    prefetch_ids([e["Gene"] for entries in changed.values() for e in entries if e.get("Gene")])
+    for pheno, entries in changed.items():
+        sym_line, ent_line, invalid_syms = _gmt_lines_for_phenotype(pheno, entries)
+        state[pheno] = {
+            # the PMID correction may have rewritten the extracted file
+            "fingerprint": _phenotype_fingerprint(pheno, extracted_dir, verified[pheno]),
+            "merged": entries,
+            "symbols_line": sym_line,
+            "entrez_line": ent_line,
+            "unmapped": invalid_syms,
+        }
+
+    ordered = [state[p] for p in common if p in state]
+    merged = {p: state[p]["merged"] for p in common if p in state}
+    unmapped = {p: state[p]["unmapped"] for p in common if p in state and state[p]["unmapped"]}
 
     symbols_gmt = os.path.join(out_dir, f"genesets_symbols_{model_name}.gmt")
     entrez_gmt  = os.path.join(out_dir, f"genesets_entrez_{model_name}.gmt")
-
-    unmapped = build_gmts_from_merged(merged, symbols_gmt, entrez_gmt)
+    _write_gmt_lines([s["symbols_line"] for s in ordered if s["symbols_line"]], symbols_gmt)
+    _write_gmt_lines([s["entrez_line"] for s in ordered if s["entrez_line"]], entrez_gmt)
 
     # HTML summary
     html_out = os.path.join(out_dir, f"phenotype_gene_summary_{model_name}.html")
@@ -460,11 +668,16 @@ def main(model_name: str):
     unmapped_out = os.path.join(out_dir, f"unmapped_genes_{model_name}.json")
     save_unmapped(unmapped, unmapped_out)
 
+    save_build_state(state, state_path)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", type=str, help="Name of the LLM model (e.g., llama3.1:8b)")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only re-merge, re-correct and re-map phenotypes whose inputs changed since the last build."
+    )
     args = parser.parse_args()
 
-    main(args.model)
-    main()
+    main(args.model, incremental=args.incremental)
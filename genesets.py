@@ -0,0 +1,277 @@
+import os
+import re
+import json
+import hashlib
+
+import numpy as np
+
+# Parsed GMTs are cached in a directory next to the source file:
+#   <file>.gmt.gscache/{members.npy, offsets.npy, meta.json}
+# members/offsets are memory-mapped on load. meta.json records the source's
+# size, mtime and sha256; the cache is rebuilt if the size changed, or if the
+# mtime changed and the content hash no longer matches.
+CACHE_SUFFIX = ".gscache"
+CACHE_VERSION = 1
+
+
+# NAME NORMALIZATION
+def normalize_name(name):
+    """'HP_Short-Stature' -> 'hp shortstature' (lowercase, alphanumerics and spaces only)."""
+    name = name.lower()
+    name = name.replace("_", " ")
+    name = re.sub(r"\s+", " ", name)
+    name = re.sub(r"[^a-z0-9\s]", "", name)
+    return name.strip()
+
+
+def clean_name(name):
+    """'HP_11_PAIRS_OF_RIBS' -> '11 pairs of ribs', the phenotype['name'] used by the pipelines."""
+    return (
+        name.replace("HP_", "")
+            .replace("MP_", "")
+            .replace("_", " ")
+            .strip()
+            .capitalize()
+    )
+
+
+def match_key(name):
+    """'HP_SHORT_STATURE' and 'Short stature' -> 'short stature', for pairing sets across GMTs."""
+    return normalize_name(clean_name(name))
+
+
+def strip_prefix(prefix):
+    """Name function removing a leading prefix, e.g. strip_prefix("HP_")."""
+    def fn(name):
+        return name[len(prefix):] if prefix and name.startswith(prefix) else name
+    return fn
+
+
+class GeneSetCollection:
+    """
+    A GMT held as interned gene IDs: the members of set i are
+    genes[members[offsets[i]:offsets[i + 1]]], in file order without duplicates.
+    """
+
+    def __init__(self, names, descriptions, genes, members, offsets):
+        self.names = list(names)
+        self.descriptions = list(descriptions)
+        self.genes = list(genes)
+        self.members = members
+        self.offsets = offsets
+        self._set_index = {name: i for i, name in enumerate(self.names)}
+        self._gene_index = None
+        self._gene_array = None
+
+    # CONSTRUCTION
+    @classmethod
+    def from_sets(cls, sets, descriptions=None):
+        """Build from (name, genes) pairs or a {name: genes} dict."""
+        items = sets.items() if isinstance(sets, dict) else sets
+        names, descs = [], []
+        gene_index = {}
+        members = []
+        offsets = [0]
+        for name, genes in items:
+            names.append(name)
+            descs.append((descriptions or {}).get(name, ""))
+            seen = set()
+            for g in genes:
+                if g in seen:
+                    continue
+                seen.add(g)
+                gid = gene_index.get(g)
+                if gid is None:
+                    gid = gene_index[g] = len(gene_index)
+                members.append(gid)
+            offsets.append(len(members))
+        collection = cls(
+            names, descs, list(gene_index),
+            np.asarray(members, dtype=np.int32), np.asarray(offsets, dtype=np.int64),
+        )
+        collection._gene_index = gene_index
+        return collection
+
+    @classmethod
+    def parse_gmt(cls, path):
+        """Parse a GMT file without touching the cache. Blank lines are skipped."""
+        sets, descriptions = [], {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\r\n").split("\t")
+                if not parts[0].strip():
+                    continue
+                name = parts[0].strip()
+                descriptions[name] = parts[1] if len(parts) > 1 else ""
+                sets.append((name, [g.strip() for g in parts[2:] if g.strip()]))
+        return cls.from_sets(sets, descriptions)
+
+    @classmethod
+    def from_gmt(cls, path, use_cache=True):
+        """Load a GMT, through its binary cache when it is still valid."""
+        if not use_cache:
+            return cls.parse_gmt(path)
+
+        cache_dir = path + CACHE_SUFFIX
+        source = _source_stat(path)
+        meta = _read_meta(cache_dir)
+        if meta is not None and _cache_valid(meta, source, path):
+            return cls(
+                meta["names"], meta["descriptions"], meta["genes"],
+                np.load(os.path.join(cache_dir, "members.npy"), mmap_mode="r"),
+                np.load(os.path.join(cache_dir, "offsets.npy"), mmap_mode="r"),
+            )
+
+        collection = cls.parse_gmt(path)
+        try:
+            collection._write_cache(cache_dir, source, path)
+        except OSError as e:
+            print(f"Could not write gene set cache {cache_dir}: {e}")
+        return collection
+
+    def _write_cache(self, cache_dir, source, path):
+        os.makedirs(cache_dir, exist_ok=True)
+        meta_path = os.path.join(cache_dir, "meta.json")
+        # drop the old metadata first so a half-written cache is never trusted
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for fname, array in (("members.npy", self.members), ("offsets.npy", self.offsets)):
+            tmp = os.path.join(cache_dir, fname + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp, os.path.join(cache_dir, fname))
+        meta = {
+            "version": CACHE_VERSION,
+            "size": source["size"],
+            "mtime_ns": source["mtime_ns"],
+            "sha256": _file_sha256(path),
+            "names": self.names,
+            "descriptions": self.descriptions,
+            "genes": self.genes,
+        }
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    # ACCESS
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._set_index
+
+    @property
+    def gene_index(self):
+        """{gene: interned id}"""
+        if self._gene_index is None:
+            self._gene_index = {g: i for i, g in enumerate(self.genes)}
+        return self._gene_index
+
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def ids(self, name):
+        """Interned gene IDs of a set (int32 view)."""
+        i = self._set_index[name]
+        return self.members[self.offsets[i]:self.offsets[i + 1]]
+
+    def get(self, name):
+        """Genes of a set as a list, in file order."""
+        return self.decode(self.ids(name))
+
+    def decode(self, ids):
+        if self._gene_array is None:
+            self._gene_array = np.asarray(self.genes, dtype=object)
+        return self._gene_array[np.asarray(ids, dtype=np.int64)].tolist()
+
+    def contains(self, name, gene):
+        gid = self.gene_index.get(gene)
+        return gid is not None and bool((self.ids(name) == gid).any())
+
+    # SET ALGEBRA (between two sets of this collection)
+    def intersection(self, a, b):
+        return self.decode(np.intersect1d(self.ids(a), self.ids(b)))
+
+    def union(self, a, b):
+        return self.decode(np.union1d(self.ids(a), self.ids(b)))
+
+    def difference(self, a, b):
+        return self.decode(np.setdiff1d(self.ids(a), self.ids(b)))
+
+    def translate(self, other):
+        """Array mapping other's gene IDs to this collection's IDs (-1 where absent)."""
+        index = self.gene_index
+        return np.fromiter((index.get(g, -1) for g in other.genes), dtype=np.int32, count=len(other.genes))
+
+    # CONVERSION
+    def renamed(self, name_fn):
+        """Same sets under new names (later duplicates win on lookup, like dict assignment)."""
+        collection = GeneSetCollection(
+            [name_fn(n) for n in self.names], self.descriptions, self.genes, self.members, self.offsets
+        )
+        collection._gene_index = self._gene_index
+        return collection
+
+    def to_dict(self, as_sets=True, skip_empty=False):
+        """{name: set(genes)} (or lists when as_sets is False), the layout the scripts used before."""
+        out = {}
+        sizes = self.sizes()
+        for i, name in enumerate(self.names):
+            if skip_empty and sizes[i] == 0:
+                continue
+            genes = self.decode(self.members[self.offsets[i]:self.offsets[i + 1]])
+            out[name] = set(genes) if as_sets else genes
+        return out
+
+    def to_csr(self, vocab_size=None, translate=None):
+        """Binary sets x genes CSR matrix; translate remaps IDs into another vocabulary."""
+        from scipy import sparse
+        members = np.asarray(self.members) if translate is None else translate[np.asarray(self.members)]
+        n_cols = vocab_size if vocab_size is not None else len(self.genes)
+        data = np.ones(len(members), dtype=np.float32)
+        return sparse.csr_matrix((data, members, np.asarray(self.offsets)), shape=(len(self.names), n_cols))
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_meta(cache_dir):
+    path = os.path.join(cache_dir, "meta.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _cache_valid(meta, source, path):
+    if meta.get("version") != CACHE_VERSION or meta.get("size") != source["size"]:
+        return False
+    if meta.get("mtime_ns") == source["mtime_ns"]:
+        return True
+    # touched but possibly unchanged (e.g. a fresh checkout): compare content
+    return meta.get("sha256") == _file_sha256(path)
+
+
+def load_gene_sets(path, name_fn=None, as_sets=True, skip_empty=False):
+    """Load a GMT as {name: genes} through the shared cache, optionally renaming sets."""
+    collection = GeneSetCollection.from_gmt(path)
+    if name_fn is not None:
+        collection = collection.renamed(name_fn)
+    return collection.to_dict(as_sets=as_sets, skip_empty=skip_empty)
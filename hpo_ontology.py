@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+
+# Offline HPO backend. A downloaded release (hp.obo or the obographs hp.json,
+# from https://hpo.jax.org/data/ontology) is parsed once into a cache next to it:
+#   <file>.hpocache.json: {"version", "size", "mtime_ns", "sha256",
+#                          "terms": {id: [name, definition, synonyms, parents]},
+#                          "alt_ids": {alt id: id}, "names": {name key: id}}
+# The cache is rebuilt if the release's size changed, or if its mtime changed
+# and its content hash no longer matches.
+HPO_OBO_URL = "https://purl.obolibrary.org/obo/hp.obo"
+CACHE_SUFFIX = ".hpocache.json"
+CACHE_VERSION = 1
+
+HP_ID = re.compile(r"^HP[:_](\d{7})$", re.IGNORECASE)
+
+
+def name_key(name):
+    """'HP_2_3_TOE_SYNDACTYLY', '2-3 Toe Syndactyly' -> '2 3 toe syndactyly'."""
+    name = re.sub(r"^(HP|MP)_", "", name.strip())
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+# PARSERS
+# Both return (terms, alt_ids, synonym scopes) with
+# terms = {id: {"name", "definition", "synonyms": [(text, scope)], "parents", "obsolete"}}
+
+_OBO_QUOTED = re.compile(r'^"((?:[^"\\]|\\.)*)"\s*(\S*)')
+
+
+def _obo_unquote(text):
+    return re.sub(r"\\(.)", r"\1", text)
+
+
+def parse_obo(path):
+    terms, alt_ids = {}, {}
+    term = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("["):
+                term = {"synonyms": [], "parents": [], "obsolete": False} if line == "[Term]" else None
+                continue
+            if term is None or ": " not in line:
+                continue
+            tag, value = line.split(": ", 1)
+            if tag == "id":
+                term["id"] = value.strip()
+                terms[term["id"]] = term
+            elif tag == "name":
+                term["name"] = value.strip()
+            elif tag == "def":
+                m = _OBO_QUOTED.match(value)
+                term["definition"] = _obo_unquote(m.group(1)) if m else value
+            elif tag == "synonym":
+                m = _OBO_QUOTED.match(value)
+                if m:
+                    term["synonyms"].append((_obo_unquote(m.group(1)), m.group(2) or "RELATED"))
+            elif tag == "is_a":
+                term["parents"].append(value.split("!")[0].strip())
+            elif tag == "alt_id":
+                alt_ids[value.strip()] = term.get("id")
+            elif tag == "is_obsolete":
+                term["obsolete"] = value.strip() == "true"
+    return terms, alt_ids
+
+
+_JSON_SCOPES = {
+    "hasExactSynonym": "EXACT", "hasBroadSynonym": "BROAD",
+    "hasNarrowSynonym": "NARROW", "hasRelatedSynonym": "RELATED",
+}
+
+
+def _curie(iri):
+    """'http://purl.obolibrary.org/obo/HP_0000001' -> 'HP:0000001'"""
+    tail = iri.rsplit("/", 1)[-1]
+    return tail.replace("_", ":", 1) if HP_ID.match(tail) else None
+
+
+def parse_obographs_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        graph = json.load(f)["graphs"][0]
+
+    terms, alt_ids = {}, {}
+    for node in graph.get("nodes", []):
+        hpo_id = _curie(node.get("id", ""))
+        if hpo_id is None or node.get("type", "CLASS") != "CLASS":
+            continue
+        meta = node.get("meta", {})
+        terms[hpo_id] = {
+            "id": hpo_id,
+            "name": node.get("lbl"),
+            "definition": meta.get("definition", {}).get("val"),
+            "synonyms": [(s["val"], _JSON_SCOPES.get(s.get("pred"), "RELATED")) for s in meta.get("synonyms", [])],
+            "parents": [],
+            "obsolete": bool(meta.get("deprecated")),
+        }
+        for prop in meta.get("basicPropertyValues", []):
+            if prop.get("pred", "").endswith("hasAlternativeId"):
+                alt_ids[prop["val"]] = hpo_id
+
+    for edge in graph.get("edges", []):
+        if edge.get("pred") != "is_a":
+            continue
+        child, parent = _curie(edge.get("sub", "")), _curie(edge.get("obj", ""))
+        if child in terms and parent:
+            terms[child]["parents"].append(parent)
+    return terms, alt_ids
+
+
+# CACHE
+def _source_stat(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_index(terms, alt_ids):
+    """Compact cache layout; names win over exact synonyms, which win over other synonyms."""
+    names = {}
+    live = {i: t for i, t in terms.items() if not t["obsolete"] and t.get("name")}
+    for rank in ("name", "EXACT", "other"):
+        for hpo_id, t in live.items():
+            if rank == "name":
+                keys = [t["name"]]
+            else:
+                keys = [s for s, scope in t["synonyms"] if (scope == "EXACT") == (rank == "EXACT")]
+            for key in keys:
+                names.setdefault(name_key(key), hpo_id)
+    return {
+        "terms": {
+            i: [t["name"], t.get("definition"), [s for s, _ in t["synonyms"]], t["parents"]]
+            for i, t in live.items()
+        },
+        "alt_ids": {alt: i for alt, i in alt_ids.items() if i in live},
+        "names": names,
+    }
+
+
+class HPOOntology:
+    """HPO terms indexed by ID, alternative ID and normalized name/synonym."""
+
+    def __init__(self, index):
+        self.terms = index["terms"]
+        self.alt_ids = index["alt_ids"]
+        self.names = index["names"]
+        self._children = None
+
+    @classmethod
+    def parse(cls, path):
+        """Parse a release (.obo or obographs .json) without touching the cache."""
+        parser = parse_obographs_json if path.endswith(".json") else parse_obo
+        return cls(build_index(*parser(path)))
+
+    @classmethod
+    def load(cls, path, use_cache=True):
+        """Load a release, through its cache when it is still valid."""
+        if not use_cache:
+            return cls.parse(path)
+
+        cache_path = path + CACHE_SUFFIX
+        source = _source_stat(path)
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    cache = json.load(f)
+                if cache.get("version") == CACHE_VERSION and cache.get("size") == source["size"] and (
+                    cache.get("mtime_ns") == source["mtime_ns"] or cache.get("sha256") == _file_sha256(path)
+                ):
+                    return cls(cache)
+            except (OSError, json.JSONDecodeError):
+                pass
+
+        ontology = cls.parse(path)
+        cache = {"version": CACHE_VERSION, **source, "sha256": _file_sha256(path),
+                 "terms": ontology.terms, "alt_ids": ontology.alt_ids, "names": ontology.names}
+        try:
+            tmp = cache_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"Could not write HPO cache {cache_path}: {e}")
+        return ontology
+
+    def __len__(self):
+        return len(self.terms)
+
+    def canonical_id(self, hpo_id):
+        m = HP_ID.match(hpo_id.strip())
+        if not m:
+            return None
+        hpo_id = f"HP:{m.group(1)}"
+        return hpo_id if hpo_id in self.terms else self.alt_ids.get(hpo_id)
+
+    def get(self, hpo_id):
+        """{id, name, description, synonyms} for an HP ID (or alternative ID), as the JAX API lookup returns."""
+        hpo_id = self.canonical_id(hpo_id)
+        if hpo_id is None:
+            return None
+        name, definition, synonyms, _ = self.terms[hpo_id]
+        return {"id": hpo_id, "name": name, "description": definition, "synonyms": list(synonyms)}
+
+    def resolve(self, query):
+        """Term for an HP ID, or a name in any spelling (format_query output, MSigDB HP_ name, synonym)."""
+        if HP_ID.match(query.strip()):
+            return self.get(query)
+        hpo_id = self.names.get(name_key(query))
+        return self.get(hpo_id) if hpo_id else None
+
+    def parents(self, hpo_id):
+        hpo_id = self.canonical_id(hpo_id)
+        return list(self.terms[hpo_id][3]) if hpo_id else []
+
+    def ancestors(self, hpo_id):
+        """All is_a ancestors of a term (excluding itself)."""
+        seen = set()
+        stack = self.parents(hpo_id)
+        while stack:
+            parent = stack.pop()
+            if parent in seen or parent not in self.terms:
+                continue
+            seen.add(parent)
+            stack.extend(self.terms[parent][3])
+        return seen
+
+    def children(self, hpo_id):
+        if self._children is None:
+            self._children = {}
+            for child, (_, _, _, parents) in self.terms.items():
+                for parent in parents:
+                    self._children.setdefault(parent, []).append(child)
+        hpo_id = self.canonical_id(hpo_id)
+        return list(self._children.get(hpo_id, [])) if hpo_id else []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Index a local HPO release (hp.obo / hp.json, e.g. {HPO_OBO_URL}).")
+    parser.add_argument("--ontology", type=str, required=True, help="Path to hp.obo or hp.json.")
+    parser.add_argument("--lookup", type=str, nargs="*", default=[], help="Names or HP IDs to resolve.")
+    args = parser.parse_args()
+
+    ontology = HPOOntology.load(args.ontology)
+    print(f"Loaded {len(ontology)} HPO terms from {args.ontology}")
+    for query in args.lookup:
+        print(json.dumps(ontology.resolve(query), ensure_ascii=False))
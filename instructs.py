@@ -1,11 +1,3 @@
-### LLM
-from langchain_ollama import ChatOllama
-
-local_llm = "llama3.1:8b"
-llm = ChatOllama(model=local_llm, temperature=0)
-llm_json_mode = ChatOllama(model=local_llm, temperature=0, format="json")
-
-
 grade_abstracts_instructions = """You are a scientific grader assessing the relevance of retrieved scientific abstracts to a biological or disease-related question.
 
 If the abstract contains keywords or semantic meaning related to the question (such as the phenotype or functionally associated genes), grade it as relevant.
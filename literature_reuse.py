@@ -0,0 +1,124 @@
+import os
+import json
+import argparse
+
+# Hierarchy-aware reuse of downloaded abstracts between HPO phenotypes.
+#
+# A child phenotype ("Aplasia of the ulna") mostly retrieves PMIDs its
+# ancestors ("Abnormality of the ulna") already downloaded. With an ontology
+# set, retrieval seeds a phenotype's abstracts from the cached files of its
+# is_a ancestors and only exports the PMIDs none of them has. The PubTator
+# search itself is query-specific and still runs per phenotype.
+# Each retrieval appends {"phenotype", "pmids", "reused", "fetched", "skipped"}
+# to REUSE_LOG; every reused abstract is one export request saved.
+
+REUSE_LOG = "out/literature_reuse.jsonl"
+ABSTRACTS_DIR = "abstracts/gene_annotated_abstracts"
+
+_ontology = None
+# {path: (mtime_ns, {pmid: abstract})} for ancestor files read in this process
+_file_cache = {}
+
+
+def set_ontology(ontology):
+    """Enable reuse with an HPOOntology (None disables it)."""
+    global _ontology
+    _ontology = ontology
+
+
+def get_ontology():
+    return _ontology
+
+
+def phenotype_id(phenotype, ontology=None):
+    """HP ID of a phenotype dict (its "id", else resolved from its name)."""
+    ontology = ontology or _ontology
+    if ontology is None:
+        return None
+    hpo_id = phenotype.get("id")
+    if hpo_id and ontology.canonical_id(hpo_id):
+        return ontology.canonical_id(hpo_id)
+    term = ontology.resolve(phenotype.get("name", ""))
+    return term["id"] if term else None
+
+
+def _load_abstracts(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _file_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if isinstance(data, dict):
+        data = [data]
+    by_pmid = {str(d.get("pmid")): d for d in data}
+    _file_cache[path] = (mtime, by_pmid)
+    return by_pmid
+
+
+def ancestor_abstracts(phenotype, abstracts_dir=ABSTRACTS_DIR):
+    """
+    {pmid: abstract} from the cached abstract files of the phenotype's
+    ancestors (files are named after the HPO term names). Empty without an ontology.
+    """
+    ontology = _ontology
+    hpo_id = phenotype_id(phenotype)
+    if hpo_id is None:
+        return {}
+    pool = {}
+    for ancestor in ontology.ancestors(hpo_id):
+        term = ontology.get(ancestor)
+        path = os.path.join(abstracts_dir, f"{term['name'].strip()}.json") if term else None
+        if path and os.path.exists(path):
+            pool.update(_load_abstracts(path))
+    return pool
+
+
+def record_reuse(name, pmids, reused, fetched, skipped, log_file=REUSE_LOG):
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    with open(log_file, "a") as f:
+        f.write(json.dumps({
+            "phenotype": name, "pmids": pmids, "reused": reused, "fetched": fetched, "skipped": skipped
+        }) + "\n")
+
+
+def summarize_reuse(log_file=REUSE_LOG):
+    """Totals over the latest record per phenotype."""
+    latest = {}
+    if os.path.exists(log_file):
+        with open(log_file, "r") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                latest[rec["phenotype"]] = rec
+
+    totals = {"phenotypes": len(latest), "pmids": 0, "reused": 0, "fetched": 0, "skipped": 0,
+              "phenotypes_with_reuse": 0}
+    for rec in latest.values():
+        for key in ("pmids", "reused", "fetched", "skipped"):
+            totals[key] += rec[key]
+        totals["phenotypes_with_reuse"] += rec["reused"] > 0
+    return totals
+
+
+def print_reuse_report(log_file=REUSE_LOG):
+    t = summarize_reuse(log_file)
+    exports = t["reused"] + t["fetched"]
+    print("\n=== LITERATURE REUSE ===")
+    print(f"Phenotypes retrieved: {t['phenotypes']} ({t['phenotypes_with_reuse']} reused ancestor abstracts)")
+    print(f"Candidate PMIDs: {t['pmids']} ({t['skipped']} skipped as known gene-less)")
+    print(f"Abstract exports: {t['fetched']} requested, {t['reused']} reused from ancestors")
+    if exports:
+        print(f"Export requests saved: {t['reused']} ({t['reused'] / exports * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report abstract downloads saved by ancestor reuse.")
+    parser.add_argument("--log_file", type=str, default=REUSE_LOG)
+    args = parser.parse_args()
+    print_reuse_report(args.log_file)
@@ -0,0 +1,259 @@
+import re
+import json
+
+# Single-pass, error-tolerant JSON recovery for LLM output.
+#
+# The text is tokenized once, left to right, and values are built on a stack
+# as their tokens arrive, so the work is linear in the length of the output:
+#   - <think>...</think> blocks are skipped; a stray </think> discards everything
+#     before it (the reasoning started before the output we were given)
+#   - code fences (```json) and prose outside any object/array are ignored
+#   - missing or trailing commas, single-quoted strings, bare keys, raw control
+#     characters in strings and Python literals (True/False/None) are accepted
+#   - on truncation, open containers are closed: an unfinished object inside an
+#     array is dropped (the array keeps its complete objects), any other
+#     unfinished object keeps the fields it has
+#   - repeated objects in an array, or repeated top-level values, are dropped
+#     as soon as they are complete
+# Text can be fed in chunks (StreamingJSONParser) or parsed at once (loads).
+
+TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<think><think>)
+  | (?P<endthink></think>)
+  | (?P<fence>```[A-Za-z]*)
+  | (?P<punct>[{}\[\]:,])
+  | (?P<quote>["'])
+  | (?P<number>-?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_\-]*)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+STRING_BODY = {
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*'),
+    "'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*"),
+}
+
+LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+# Characters kept back at a chunk boundary so <think>, </think> and ``` are not split
+LOOKAHEAD = 8
+
+
+def canonical_key(value):
+    """Default dedup key: the value's JSON with sorted keys."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def _decode_string(body, quote):
+    if quote == "'":
+        body = re.sub(r'(?<!\\)((?:\\\\)*)"', r'\1\\"', body.replace("\\'", "'"))
+    try:
+        return json.loads('"' + body + '"', strict=False)
+    except json.JSONDecodeError:
+        return body
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+class _Frame:
+    __slots__ = ("container", "key", "expect_key", "seen")
+
+    def __init__(self, container):
+        self.container = container
+        self.key = None
+        self.expect_key = True
+        self.seen = set() if isinstance(container, list) else None
+
+
+class StreamingJSONParser:
+    """
+    Incremental tolerant parser: feed() chunks as they arrive, then close()
+    for the recovered value. key(obj) decides which objects count as repeats
+    (canonical JSON by default).
+    """
+
+    def __init__(self, key=canonical_key):
+        self.key = key
+        self.roots = []
+        self._root_seen = set()
+        self._stack = []
+        self._buf = ""
+        self._in_think = False
+        self._string = None  # (quote, [parts]) while inside a string
+
+    # TOKENIZER
+    def feed(self, chunk):
+        self._buf += chunk
+        self._consume(final=False)
+
+    def close(self, default=None):
+        """Finish parsing (closing anything left open) and return the recovered value."""
+        self._consume(final=True)
+        self._string = None
+        while self._stack:
+            frame = self._stack.pop()
+            parent = self._stack[-1] if self._stack else None
+            # unfinished objects inside arrays are dropped, everything else is kept
+            if isinstance(frame.container, dict) and parent is not None and isinstance(parent.container, list):
+                continue
+            self._value(frame.container, closing=True)
+        return self.result(default)
+
+    def result(self, default=None):
+        """The value recovered so far: the single top-level value, or all of them merged into one list."""
+        if not self.roots:
+            return default
+        if len(self.roots) == 1:
+            return self.roots[0]
+        merged, seen = [], set()
+        for root in self.roots:
+            for item in (root if isinstance(root, list) else [root]):
+                if isinstance(item, dict):
+                    k = self.key(item)
+                    if k in seen:
+                        continue
+                    seen.add(k)
+                merged.append(item)
+        return merged
+
+    def _consume(self, final):
+        buf, pos, n = self._buf, 0, len(self._buf)
+        while pos < n:
+            if self._in_think:
+                end = buf.find("</think>", pos)
+                if end < 0:
+                    pos = n if final else max(pos, n - LOOKAHEAD)
+                    break
+                pos = end + len("</think>")
+                self._in_think = False
+                continue
+
+            if self._string is not None:
+                quote, parts = self._string
+                m = STRING_BODY[quote].match(buf, pos)
+                body_end = m.end()
+                if body_end < n and buf[body_end] == quote:
+                    parts.append(buf[pos:body_end])
+                    self._string = None
+                    self._value(_decode_string("".join(parts), quote), is_string=True)
+                    pos = body_end + 1
+                    continue
+                # string continues in the next chunk; keep a dangling backslash for it
+                if body_end < n and not final:
+                    parts.append(buf[pos:body_end])
+                    pos = body_end
+                    break
+                parts.append(buf[pos:body_end])
+                pos = body_end if not final else n
+                break
+
+            if not final and n - pos < LOOKAHEAD and buf[pos] in "<`":
+                break
+            m = TOKEN.match(buf, pos)
+            kind, text = m.lastgroup, m.group()
+            # a number or word this close to the end may continue in the next chunk
+            if not final and n - m.end() < LOOKAHEAD and (kind in ("number", "word") or text == "-"):
+                break
+            pos = m.end()
+
+            if kind == "think":
+                self._in_think = True
+            elif kind == "endthink":
+                # reasoning without its opening tag: drop what was parsed from it
+                self.roots, self._root_seen, self._stack = [], set(), []
+            elif kind == "punct":
+                self._punct(text)
+            elif kind == "quote":
+                if self._stack:
+                    self._string = (text, [])
+            elif kind == "number":
+                if self._stack:
+                    self._value(_number(text))
+            elif kind == "word":
+                if self._stack:
+                    if text in LITERALS and not self._expecting_key():
+                        self._value(LITERALS[text])
+                    elif self._expecting_key():
+                        self._value(text, is_string=True)
+        self._buf = buf[pos:]
+
+    # BUILDER
+    def _expecting_key(self):
+        frame = self._stack[-1]
+        return isinstance(frame.container, dict) and frame.expect_key
+
+    def _punct(self, ch):
+        if ch == "{" or ch == "[":
+            self._stack.append(_Frame({} if ch == "{" else []))
+        elif ch == "}" or ch == "]":
+            wanted = dict if ch == "}" else list
+            # close up to the matching container; ignore closers that match nothing
+            if not any(isinstance(f.container, wanted) for f in self._stack):
+                return
+            while self._stack:
+                frame = self._stack.pop()
+                if isinstance(frame.container, wanted):
+                    self._value(frame.container, closing=True)
+                    return
+                parent = self._stack[-1] if self._stack else None
+                if not (isinstance(frame.container, dict) and parent is not None
+                        and isinstance(parent.container, list)):
+                    self._value(frame.container, closing=True)
+        elif ch == "," and self._stack:
+            frame = self._stack[-1]
+            if isinstance(frame.container, dict):
+                frame.key, frame.expect_key = None, True
+        elif ch == ":" and self._stack:
+            frame = self._stack[-1]
+            if isinstance(frame.container, dict) and frame.key is not None:
+                frame.expect_key = False
+
+    def _value(self, value, is_string=False, closing=False):
+        if not self._stack:
+            if closing:
+                self._attach(value)
+            return
+        frame = self._stack[-1]
+        container = frame.container
+        if isinstance(container, list):
+            if isinstance(value, dict):
+                k = self.key(value)
+                if k in frame.seen:
+                    return
+                frame.seen.add(k)
+            container.append(value)
+        elif frame.expect_key:
+            # a string where a key is expected is the key; anything else is junk
+            if is_string and frame.key is None:
+                frame.key = value if isinstance(value, str) else str(value)
+            elif is_string and frame.key is not None:
+                # "key" "value" with the colon missing
+                container[frame.key] = value
+                frame.key, frame.expect_key = None, True
+        elif frame.key is not None:
+            container[frame.key] = value
+            frame.key, frame.expect_key = None, True
+
+    def _attach(self, value):
+        if isinstance(value, dict):
+            k = self.key(value)
+            if k in self._root_seen:
+                return
+            self._root_seen.add(k)
+        self.roots.append(value)
+
+
+def loads(text, default=None, key=canonical_key):
+    """Recover the JSON value from LLM output text (see module notes); default if none is found."""
+    parser = StreamingJSONParser(key=key)
+    parser.feed(text)
+    return parser.close(default)
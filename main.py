@@ -1,10 +1,19 @@
 import os
 import json
+import time
 import argparse
 
-from utils import phenotype_json_reader, read_gmt, read_phenotype_to_gene_sets
+from utils import MAKER_MODELS, CHECKER_MODELS, phenotype_json_reader, read_gmt, read_phenotype_to_gene_sets
 from rag_pipeline_gene_set_maker import create_control_flow as create_maker_flow
+from rag_pipeline_gene_set_maker import append_abstract as append_maker_abstract
 from rag_pipeline_gene_checker import create_control_flow as create_checker_flow
+from rag_pipeline_gene_checker import append_abstract as append_checker_abstract
+from cost_model import (
+    SCHEDULE_POLICIES,
+    Walltime, schedule_phenotypes, record_observed, estimate_run, print_estimate
+)
+from provenance import find_stale
+from retry_queue import load_queue, record_failure, record_success, is_deferred, due_entries
 
 PROCESSED_FILE = "out/processed_phenotypes.txt"
 
@@ -63,10 +72,12 @@ def mark_set_complete(gene_set):
         f.write(f"{gene_set}\n")
 
 
-def run_checker_for_phenotype(phenotype, genes):
+def run_checker_for_phenotype(phenotype, genes, stale_genes=()):
     """
     Run the checker pipeline for a single phenotype name and its list of genes.
     Uses intersection logic: we only call this if the phenotype exists in the GMT.
+    Genes in stale_genes are rechecked even if already processed.
+    Returns True only if every gene was checked successfully.
     """
     phenotype_name = phenotype["name"]
     print(f"Running checker pipeline for phenotype: {phenotype_name}")
@@ -74,19 +85,26 @@ def run_checker_for_phenotype(phenotype, genes):
     processed_genes = load_processed_genes()
     completed_sets = load_completed_sets()
 
-    if phenotype_name in completed_sets:
+    if phenotype_name in completed_sets and not stale_genes:
         print(f"Gene set for {phenotype_name} already completed. Skipping checker.")
-        return
+        return True
 
     processed_genes.setdefault(phenotype_name, [])
 
     graph = create_checker_flow()
+    queue = load_queue()
+    complete = True
 
     for gene in genes:
-        if gene in processed_genes[phenotype_name]:
+        if gene in processed_genes[phenotype_name] and gene not in stale_genes:
             print(f"  Skipping {gene} (already processed for {phenotype_name})")
             continue
 
+        if is_deferred("checker", phenotype_name, gene=gene, queue=queue):
+            print(f"  Deferring {gene} (waiting for retry backoff)")
+            complete = False
+            continue
+
         phenotype_state = {
             "name": phenotype_name,
             "gene": gene,
@@ -101,12 +119,37 @@ def run_checker_for_phenotype(phenotype, genes):
             for _ in graph.stream({"phenotype": phenotype_state}, stream_mode="values"):
                 pass
             mark_gene_processed(phenotype_name, gene, processed_genes)
+            record_success("checker", phenotype_name, gene=gene, queue=queue)
             print(f"  Completed {gene} for {phenotype_name}")
         except Exception as e:
             print(f"  Error processing {gene} in {phenotype_name}: {e}")
+            record_failure("checker", phenotype_name, e, gene=gene)
+            complete = False
+
+    if not complete:
+        print(f"Checker incomplete for gene set: {phenotype_name}. Failed genes are queued for retry.")
+        return False
 
     mark_set_complete(phenotype_name)
     print(f"Completed checker for gene set: {phenotype_name}")
+    return True
+
+
+def retry_failed_pmids():
+    """Re-fetch abstracts whose download failed once their backoff has elapsed."""
+    due = due_entries("pmid")
+    if due:
+        print(f"Retrying {len(due)} failed PMID downloads")
+    for rec in due:
+        try:
+            if rec.get("gene"):
+                append_checker_abstract(rec["phenotype"], rec["gene"], rec["pmid"])
+            else:
+                append_maker_abstract(rec["phenotype"], rec["pmid"])
+            record_success("pmid", rec["phenotype"], gene=rec.get("gene"), pmid=rec["pmid"])
+        except Exception as e:
+            print(f"  Retry failed for PMID {rec['pmid']} ({rec['phenotype']}): {e}")
+            record_failure("pmid", rec["phenotype"], e, gene=rec.get("gene"), pmid=rec["pmid"])
 
 
 def main():
@@ -117,7 +160,44 @@ def main():
         default="out/in_db_and_p2g_details.json",
         help="Path to the input JSON file with phenotype details."
     )
+    parser.add_argument(
+        "--schedule",
+        type=str,
+        choices=SCHEDULE_POLICIES,
+        default="input",
+        help="Phenotype ordering: input-file order, shortest-job-first, fit-within-walltime, "
+             "or HPO parents before children (needs --ontology)."
+    )
+    parser.add_argument(
+        "--ontology",
+        type=str,
+        default=None,
+        help="Local hp.obo / hp.json. Retrieval then reuses abstracts already downloaded for HPO ancestors."
+    )
+    parser.add_argument(
+        "--walltime",
+        type=float,
+        default=None,
+        help="Allocation walltime in hours. Phenotypes estimated not to finish in time are skipped."
+    )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Dry run: predict requests, LLM calls, prompt tokens and wall time per model, then exit."
+    )
     args = parser.parse_args()
+    if args.schedule == "fit" and not args.walltime:
+        parser.error("--schedule fit needs --walltime")
+    walltime = Walltime(args.walltime * 3600 if args.walltime else None)
+
+    ontology = None
+    if args.ontology:
+        from hpo_ontology import HPOOntology
+        from literature_reuse import set_ontology
+        ontology = HPOOntology.load(args.ontology)
+        set_ontology(ontology)
+    elif args.schedule == "parents":
+        parser.error("--schedule parents needs --ontology")
 
     # Load phenotypes
     phenotypes = phenotype_json_reader(args.input_file)
@@ -130,40 +210,97 @@ def main():
         raise FileNotFoundError(f"GMT file not found at {GMT_PATH}")
     gene_sets = read_phenotype_to_gene_sets(GMT_PATH)
 
+    # Fill holes left by failed downloads first, so affected outputs show up as stale
+    if not args.estimate:
+        retry_failed_pmids()
+
+    # Processed phenotypes whose inputs (PMIDs, prompts, model, options) changed
+    stale = find_stale(
+        [p for p in phenotypes if p["name"] in processed], gene_sets, MAKER_MODELS, CHECKER_MODELS
+    )["stale"]
+    stale_phenotypes = {name for _, _, name, _ in stale}
+    stale_genes = {}
+    for kind, _, name, gene in stale:
+        if kind == "checks":
+            stale_genes.setdefault(name, set()).add(gene)
+
     # Intersection logic:
     #   Checker only runs for phenotypes whose name appears in gene_sets.
-    to_process = [p for p in phenotypes if p["name"] not in processed]
+    to_process = [p for p in phenotypes if p["name"] not in processed or p["name"] in stale_phenotypes]
 
     print(f"Total phenotypes in file: {len(phenotypes)}")
     print(f"Already fully processed (maker + checker): {len(processed)}")
+    print(f"Processed but stale (inputs changed): {len(stale_phenotypes)}")
     print(f"Remaining to process: {len(to_process)}")
 
     if not to_process:
         print("All phenotypes already processed. Nothing to do.")
         return
 
-    for phenotype in to_process:
+    if args.estimate:
+        print_estimate(estimate_run(to_process, gene_sets, load_processed_genes()))
+        return
+
+    # Order (and for "fit", pack) phenotypes using the cost model
+    jobs = schedule_phenotypes(
+        to_process,
+        gene_sets,
+        policy=args.schedule,
+        walltime=walltime.seconds,
+        processed_genes=load_processed_genes(),
+        ontology=ontology
+    )
+    print(f"Scheduled {len(jobs)} phenotypes using '{args.schedule}' policy")
+
+    queue = load_queue()
+
+    for phenotype, estimate in jobs:
         name = phenotype["name"]
-        print(f"\nProcessing phenotype: {name}")
+
+        if is_deferred("maker", name, queue=queue):
+            print(f"\nDeferring {name}: maker failed earlier and is waiting for retry backoff")
+            continue
+
+        if not walltime.fits(estimate["seconds"]):
+            print(f"\nSkipping {name}: estimated {estimate['seconds']:.0f}s exceeds "
+                  f"remaining walltime {walltime.remaining():.0f}s")
+            continue
+
+        print(f"\nProcessing phenotype: {name} (estimated {estimate['seconds']:.0f}s)")
 
         # Maker pipeline
         try:
             maker_graph = create_maker_flow()
             inputs = {"phenotype": phenotype}
 
+            start = time.monotonic()
             for _ in maker_graph.stream(inputs, stream_mode="values"):
                 pass
+            record_observed("maker", estimate["maker"]["seconds"], time.monotonic() - start)
+
+            # a model whose generation failed queued the phenotype for a retry
+            queue = load_queue()
+            if is_deferred("maker", name, queue=queue):
+                print(f"Generation failed for {name}. Queued for retry.")
+                continue
+            record_success("maker", name, queue=queue)
 
             print(f"Maker pipeline completed for {name}")
         except Exception as e:
             print(f"Error in maker pipeline for {name}: {e}")
+            record_failure("maker", name, e)
             # Do not mark as processed; continue to next phenotype
             continue
 
         # Checker pipeline only if this phenotype appears in GMT
         if name in gene_sets:
             genes = gene_sets[name]
-            run_checker_for_phenotype(phenotype, genes)
+            start = time.monotonic()
+            complete = run_checker_for_phenotype(phenotype, genes, stale_genes.get(name, set()))
+            record_observed("checker", estimate["checker"]["seconds"], time.monotonic() - start)
+            if not complete:
+                # Leave unmarked so the remaining genes are retried on a later run
+                continue
         else:
             print(f"No matching gene set in gene set database for phenotype '{name}'. Skipping checker for this phenotype.")
 
@@ -173,6 +310,10 @@ def main():
 
     print(f"\nAll phenotypes processed. Progress saved in {PROCESSED_FILE}")
 
+    if ontology is not None:
+        from literature_reuse import print_reuse_report
+        print_reuse_report()
+
 
 if __name__ == "__main__":
     main()
@@ -1,23 +1,50 @@
 import json
 import os
 import time
-import requests
 
 
 API_SEARCH_URL = "https://ontology.jax.org/api/hp/search?q="
 API_TERM_URL = "https://ontology.jax.org/api/hp/terms/"
 
-session = requests.Session()
+# Connections kept open by the shared session (upper bound for bulk concurrency)
+POOL_SIZE = 32
+DEFAULT_CONCURRENCY = 8
+
+_session = None
+
+
+def get_session():
+    """Shared, pooled HTTP session, created on first use."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
 
 # format hpo db name into a readable name
 def format_query(term: str):
     return term.replace("HP_", "").replace("_", " ").strip().title()
 
+# first search hit for a phenotype name; raises on API errors, None if no match
+def search_hpo_id(formatted_query: str):
+    search_resp = get_session().get(f"{API_SEARCH_URL}{formatted_query}&page=0&limit=1", timeout=20)
+    search_resp.raise_for_status()
+    search_data = search_resp.json()
+    if "terms" in search_data and search_data["terms"]:
+        return search_data["terms"][0].get("id")
+    return None
+
+
 # fetch HPO term details
 def fetch_hpo_term(hpo_id):
     encoded = hpo_id.replace(":", "%3A")
     try:
-        resp = session.get(f"{API_TERM_URL}{encoded}", timeout=20)
+        resp = get_session().get(f"{API_TERM_URL}{encoded}", timeout=20)
         resp.raise_for_status()
         data = resp.json()
         return {
@@ -31,7 +58,7 @@ def fetch_hpo_term(hpo_id):
         return None
 
 
-def extract_phenotype_details(phenotype_name: str, output_file: str):
+def extract_phenotype_details(phenotype_name: str, output_file: str, ontology=None):
     # Load existing results
     if os.path.exists(output_file):
         with open(output_file, "r", encoding="utf-8") as f:
@@ -47,16 +74,23 @@ def extract_phenotype_details(phenotype_name: str, output_file: str):
     if formatted_query.lower() in existing_by_name:
         return existing_by_name[formatted_query.lower()]
 
+    # Local ontology: no requests, no politeness delay
+    if ontology is not None:
+        full_details = ontology.resolve(formatted_query)
+        if full_details:
+            results.append(full_details)
+            print(f"Found: {full_details['name']} ({full_details['id']})")
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+        else:
+            print(f"No match for {phenotype_name}")
+        return full_details
+
     # Search API
     try:
-        search_resp = session.get(f"{API_SEARCH_URL}{formatted_query}&page=0&limit=1", timeout=20)
-        search_resp.raise_for_status()
-        search_data = search_resp.json()
-
-        if "terms" in search_data and search_data["terms"]:
-            term_info = search_data["terms"][0]
-            term_id = term_info.get("id")
+        term_id = search_hpo_id(formatted_query)
 
+        if term_id:
             # Fetch full term details
             full_details = fetch_hpo_term(term_id)
             if full_details:
@@ -76,7 +110,199 @@ def extract_phenotype_details(phenotype_name: str, output_file: str):
     time.sleep(0.25)
 
 
-# Example usage:
-phenotype_list = ["Aplasia of the ulna", "Patchy changes of bone mineral density"]
-for phenotype in phenotype_list:
-    extract_phenotype_details(phenotype, "out/phenotype_details.json")
\ No newline at end of file
+# BULK EXTRACTION
+# Results are appended to a JSONL checkpoint (<output>.jsonl), one record per
+# phenotype query: {"query", "status": "found" | "no_match", "term"}. Queries
+# that hit an API error are not recorded, so they are retried on the next run.
+# The checkpoint is read once into an in-memory index, and the JSON list
+# format of output_file is exported from it at the end.
+
+def checkpoint_path(output_file):
+    return os.path.splitext(output_file)[0] + ".jsonl"
+
+
+class ExtractionCheckpoint:
+    """Append-only JSONL checkpoint with an in-memory index by query, term name and term ID."""
+
+    def __init__(self, path, output_file=None):
+        self.path = path
+        self.by_query = {}
+        self.by_name = {}
+        self.by_id = {}
+
+        legacy = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._index(json.loads(line))
+                    except json.JSONDecodeError:
+                        # a line cut short by an interrupted run
+                        continue
+        elif output_file and os.path.exists(output_file):
+            # results of the old per-phenotype extractor count as done
+            with open(output_file, "r", encoding="utf-8") as f:
+                legacy = [{"query": t.get("name", ""), "status": "found", "term": t} for t in json.load(f)]
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        for record in legacy:
+            self.append(record)
+
+    def _index(self, record):
+        self.by_query[record["query"].lower()] = record
+        term = record.get("term")
+        if term:
+            if term.get("name"):
+                self.by_name[term["name"].lower()] = term
+            if term.get("id"):
+                self.by_id[term["id"]] = term
+
+    def is_done(self, formatted_query):
+        key = formatted_query.lower()
+        return key in self.by_query or key in self.by_name
+
+    def append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._index(record)
+
+    def terms(self):
+        """Found terms, one per HPO ID, in first-seen order."""
+        return list(self.by_id.values())
+
+    def close(self):
+        self._file.close()
+
+
+def export_results(checkpoint, output_file):
+    """Write the found terms in the in_db_and_p2g_details.json list format (atomically)."""
+    terms = checkpoint.terms()
+    tmp = output_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(terms, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, output_file)
+    return len(terms)
+
+
+def _lookup(formatted_query, ontology=None):
+    """
+    Term for one phenotype: from a local HPOOntology when given, otherwise
+    search + term fetch on the API (blocking; runs in a worker thread).
+    """
+    if ontology is not None:
+        term = ontology.resolve(formatted_query)
+        return {"query": formatted_query, "status": "found" if term else "no_match", "term": term}
+
+    term_id = search_hpo_id(formatted_query)
+    if not term_id:
+        return {"query": formatted_query, "status": "no_match", "term": None}
+    term = fetch_hpo_term(term_id)
+    if term is None:
+        raise RuntimeError(f"term lookup failed for {term_id}")
+    return {"query": formatted_query, "status": "found", "term": term}
+
+
+def _pending_queries(checkpoint, phenotype_names):
+    queries = []
+    seen = set()
+    for name in phenotype_names:
+        q = format_query(name)
+        if not checkpoint.is_done(q) and q.lower() not in seen:
+            seen.add(q.lower())
+            queries.append(q)
+    print(f"{len(queries)} phenotypes to extract, {len(phenotype_names) - len(queries)} already done")
+    return queries
+
+
+def _record(checkpoint, record, counts, total):
+    checkpoint.append(record)
+    counts[record["status"]] += 1
+    done = sum(counts.values())
+    if record["term"]:
+        print(f"[{done}/{total}] Found: {record['term']['name']} ({record['term']['id']})")
+    else:
+        print(f"[{done}/{total}] No match for {record['query']}")
+
+
+async def extract_bulk_async(phenotype_names, output_file, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Extract HPO details for many phenotype names with at most `concurrency`
+    requests in flight, skipping names already in the checkpoint.
+    Returns (found, no_match, errors) for this run.
+    """
+    checkpoint = ExtractionCheckpoint(checkpoint_path(output_file), output_file)
+    queries = _pending_queries(checkpoint, phenotype_names)
+
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    concurrency = max(1, min(concurrency, POOL_SIZE))
+    semaphore = asyncio.Semaphore(concurrency)
+    # own threads: the default executor may be smaller than the concurrency
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    loop = asyncio.get_running_loop()
+    counts = {"found": 0, "no_match": 0, "error": 0}
+
+    async def run(q):
+        async with semaphore:
+            try:
+                record = await loop.run_in_executor(executor, _lookup, q)
+            except Exception as e:
+                print(f"API error for {q}: {e}")
+                counts["error"] += 1
+                return
+        # appends happen on the event loop thread only, so records never interleave
+        _record(checkpoint, record, counts, len(queries))
+
+    try:
+        await asyncio.gather(*(run(q) for q in queries))
+    finally:
+        executor.shutdown(wait=False)
+        checkpoint.close()
+
+    n = export_results(checkpoint, output_file)
+    print(f"Saved {n} entries to {output_file}")
+    return counts["found"], counts["no_match"], counts["error"]
+
+
+def extract_bulk_offline(phenotype_names, output_file, ontology):
+    """Same as extract_bulk_async, resolving names against a local HPOOntology instead of the API."""
+    checkpoint = ExtractionCheckpoint(checkpoint_path(output_file), output_file)
+    queries = _pending_queries(checkpoint, phenotype_names)
+    counts = {"found": 0, "no_match": 0, "error": 0}
+    try:
+        for q in queries:
+            _record(checkpoint, _lookup(q, ontology), counts, len(queries))
+    finally:
+        checkpoint.close()
+
+    n = export_results(checkpoint, output_file)
+    print(f"Saved {n} entries to {output_file}")
+    return counts["found"], counts["no_match"], counts["error"]
+
+
+def extract_bulk(phenotype_names, output_file, concurrency=DEFAULT_CONCURRENCY, ontology=None):
+    """Bulk extraction through the API, or offline when an HPOOntology is given."""
+    if ontology is not None:
+        return extract_bulk_offline(phenotype_names, output_file, ontology)
+    import asyncio
+    return asyncio.run(extract_bulk_async(phenotype_names, output_file, concurrency))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract HPO details for example phenotypes.")
+    parser.add_argument("--ontology", type=str, default=None,
+                        help="Local hp.obo / hp.json to use instead of the HPO API.")
+    args = parser.parse_args()
+
+    ontology = None
+    if args.ontology:
+        from hpo_ontology import HPOOntology
+        ontology = HPOOntology.load(args.ontology)
+
+    # Example usage:
+    phenotype_list = ["Aplasia of the ulna", "Patchy changes of bone mineral density"]
+    for phenotype in phenotype_list:
+        extract_phenotype_details(phenotype, "out/phenotype_details.json", ontology=ontology)
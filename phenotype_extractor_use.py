@@ -1,36 +1,40 @@
-import json
-import time
-import os
-import requests
+import argparse
 from utils import compare_to_phenotypes_msigdb
-from phenotype_extractor import extract_phenotype_details
+from phenotype_extractor import extract_bulk, checkpoint_path, DEFAULT_CONCURRENCY
 
 
 PHENOTYPE_FILE = "out/phenotype_to_gene_sets.txt"
 HPO_DB_FILE = "geneset data/c5.hpo.v2025.1.Hs.entrez.gmt"
 OUTPUT_FILE = "out/in_db_and_p2g_details.json"
 
-#Identify phenotypes in HPO DB and in p2g
 
-in_db_and_p2g, _, _, _ = compare_to_phenotypes_msigdb(PHENOTYPE_FILE, HPO_DB_FILE)
-print(f" Identified {len(in_db_and_p2g)} phenotypes in both p2g and HPO DB")
-# Load previous results (checkpointing)
-if os.path.exists(OUTPUT_FILE):
-    with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-        results = json.load(f)
-else:
-    results = []
-
-already_done = {entry["id"] for entry in results if "id" in entry}
-print(f" Already extracted {len(already_done)} phenotypes")
-
-
-# query HPO API for each phenotype
-
-final_output = results  # continue appending
-
-for idx, raw_term in enumerate(in_db_and_p2g, start=1):
-    print(f"[{idx}/{len(in_db_and_p2g)}] Extracting details for: {raw_term}")
-    extract_phenotype_details(raw_term, OUTPUT_FILE)
-
-print(f"Saved {len(final_output)} entries to {OUTPUT_FILE}")
+def main(concurrency=DEFAULT_CONCURRENCY, ontology_file=None):
+    #Identify phenotypes in HPO DB and in p2g
+
+    in_db_and_p2g, _, _, _ = compare_to_phenotypes_msigdb(PHENOTYPE_FILE, HPO_DB_FILE)
+    print(f" Identified {len(in_db_and_p2g)} phenotypes in both p2g and HPO DB")
+
+    # local HPO release instead of the API, when given
+    ontology = None
+    if ontology_file:
+        from hpo_ontology import HPOOntology
+        ontology = HPOOntology.load(ontology_file)
+        print(f" Using {len(ontology)} HPO terms from {ontology_file}")
+
+    # query HPO API for all phenotypes concurrently; progress is checkpointed
+    # to the .jsonl next to OUTPUT_FILE, so an interrupted run resumes
+    print(f" Checkpoint: {checkpoint_path(OUTPUT_FILE)}")
+    found, no_match, errors = extract_bulk(
+        sorted(in_db_and_p2g), OUTPUT_FILE, concurrency=concurrency, ontology=ontology
+    )
+    print(f" This run: {found} found, {no_match} without a match, {errors} errors (retried next run)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract HPO term details for the phenotypes in both p2g and the HPO DB.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="HPO API requests in flight at once.")
+    parser.add_argument("--ontology", type=str, default=None,
+                        help="Local hp.obo / hp.json to resolve phenotypes offline instead of the HPO API.")
+    args = parser.parse_args()
+    main(args.concurrency, args.ontology)
@@ -0,0 +1,310 @@
+import os
+import csv
+import json
+import hashlib
+import argparse
+
+# Bump when the figure code changes so existing plots are re-rendered
+RENDERER_VERSION = 1
+
+# Per-plot-directory record of the input hash each figure was rendered from
+HASHES_FILE = ".plot_hashes.json"
+
+FORMATS = ["png", "pdf", "svg"]
+
+# Figure types: which table and column they plot and how they look
+FIGURES = {
+    "similarity": {
+        "title": "Distribution of % Similarity Across Gene Sets",
+        "xlabel": "% Similarity",
+        "output": "similarity_distribution",
+        "bins": 20,
+        "bw_method": None,
+        "grid_points": 500,
+        "hist_color": "#aec7e8",
+        "kde_color": "#1f77b4",
+        "mean_suffix": "%",
+        "xtick_step": 10,
+        "grid": False,
+    },
+    "lost": {
+        "title": "Distribution of % Loss Across Gene Sets",
+        "xlabel": "% Loss",
+        "output": "percent_loss_distribution",
+        "bins": 25,
+        "bw_method": 0.3,
+        "grid_points": 600,
+        "hist_color": "#fdbf6f",
+        "kde_color": "#e66101",
+        "mean_suffix": "%",
+        "xtick_step": None,
+        "grid": True,
+    },
+    "new": {
+        "title": "Distribution of New Genes Added to Gene Sets",
+        "xlabel": "New Genes Added",
+        "output": "new_genes_distribution",
+        "bins": 25,
+        "bw_method": 0.3,
+        "grid_points": 600,
+        "hist_color": "#b2df8a",
+        "kde_color": "#33a02c",
+        "mean_suffix": "",
+        "xtick_step": None,
+        "grid": True,
+    },
+}
+
+
+def make_run(similarity_csv=None, comparison_csv=None, name=None):
+    """
+    One set of evaluation tables to plot. Plots go to plots/ next to the CSVs,
+    as the per-figure scripts always did.
+    """
+    base = os.path.dirname(similarity_csv or comparison_csv)
+    return {
+        "name": name or base,
+        "similarity_csv": similarity_csv,
+        "comparison_csv": comparison_csv,
+        "plot_dir": os.path.join(base, "plots"),
+    }
+
+
+def run_from_dir(eval_dir, name=None):
+    """A run for an evaluation directory holding the standard CSVs."""
+    sim = os.path.join(eval_dir, "gene_set_similarity.csv")
+    comp = os.path.join(eval_dir, "gene_set_comparison.csv")
+    run = make_run(sim if os.path.exists(sim) else None, comp if os.path.exists(comp) else None, name)
+    run["plot_dir"] = os.path.join(eval_dir, "plots")
+    return run
+
+
+# DATA
+def _read_columns(path, columns):
+    import numpy as np
+    values = {c: [] for c in columns}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            for c in columns:
+                try:
+                    values[c].append(float(row[c]))
+                except (KeyError, TypeError, ValueError):
+                    values[c].append(float("nan"))
+    return {c: np.asarray(v, dtype=float) for c, v in values.items()}
+
+
+def load_values(run):
+    """Load each table of a run once and return {figure: 1-D array of values}."""
+    import numpy as np
+    values = {}
+    if run.get("similarity_csv"):
+        sim = _read_columns(run["similarity_csv"], ["% Similarity"])["% Similarity"]
+        values["similarity"] = sim[~np.isnan(sim)]
+    if run.get("comparison_csv"):
+        comp = _read_columns(run["comparison_csv"], ["# Lost", "# Original", "# New"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            loss = comp["# Lost"] / comp["# Original"] * 100
+        values["lost"] = loss[np.isfinite(loss)]
+        values["new"] = comp["# New"][~np.isnan(comp["# New"])]
+    return values
+
+
+def kde_on_grid(samples, grid, bw_method=None):
+    """
+    Gaussian KDE of 1-D samples evaluated on grid, matching
+    scipy.stats.gaussian_kde (Scott's rule when bw_method is None,
+    otherwise a scalar bandwidth factor).
+    """
+    import numpy as np
+    samples = np.asarray(samples, dtype=float)
+    n = len(samples)
+    if n < 2 or np.var(samples) == 0:
+        return np.full(len(grid), np.nan)
+    factor = n ** (-1 / 5) if bw_method is None else float(bw_method)
+    sigma = np.sqrt(np.var(samples, ddof=1)) * factor
+
+    density = np.zeros(len(grid))
+    # chunk the samples so the (grid x samples) block stays small
+    for start in range(0, n, 4096):
+        z = (grid[:, None] - samples[None, start:start + 4096]) / sigma
+        density += np.exp(-0.5 * z * z).sum(axis=1)
+    return density / (n * sigma * np.sqrt(2 * np.pi))
+
+
+def input_hash(kind, values, grid=None):
+    """
+    Hash of a figure's inputs: renderer version, figure spec, the values and
+    the bounds and length of the shared KDE grid (which depends on all runs).
+    """
+    bounds = [float(grid[0]), float(grid[-1]), len(grid)] if grid is not None and len(grid) else None
+    spec = json.dumps({"version": RENDERER_VERSION, "figure": FIGURES[kind], "grid": bounds}, sort_keys=True)
+    h = hashlib.sha256(spec.encode("utf-8"))
+    h.update(values.tobytes())
+    return h.hexdigest()
+
+
+def _load_hashes(plot_dir):
+    path = os.path.join(plot_dir, HASHES_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_hashes(plot_dir, hashes):
+    path = os.path.join(plot_dir, HASHES_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _outputs_exist(plot_dir, kind):
+    base = os.path.join(plot_dir, FIGURES[kind]["output"])
+    return all(os.path.exists(f"{base}.{ext}") for ext in FORMATS)
+
+
+# RENDERING
+def render_figure(task):
+    """Draw one figure from precomputed values and KDE curve; runs in a worker process."""
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.rcParams.update({
+        "text.usetex": False,
+        "font.family": "sans-serif",
+        "font.size": 14
+    })
+
+    kind, values, x_vals, y_vals, plot_dir = task["kind"], task["values"], task["x"], task["y"], task["plot_dir"]
+    spec = FIGURES[kind]
+    mean_val = values.mean()
+    os.makedirs(plot_dir, exist_ok=True)
+
+    plt.figure(figsize=(10, 6))
+    plt.hist(
+        values,
+        bins=spec["bins"],
+        density=True,
+        alpha=0.6,
+        color=spec["hist_color"],
+        edgecolor="black",
+        label="Histogram"
+    )
+    if not np.isnan(y_vals).all():
+        plt.plot(x_vals, y_vals, linewidth=2.5, color=spec["kde_color"], label="Density Curve")
+    plt.axvline(
+        mean_val,
+        color="red",
+        linestyle="--",
+        linewidth=2,
+        label=f"Mean = {mean_val:.2f}{spec['mean_suffix']}"
+    )
+
+    plt.title(spec["title"], fontsize=18, fontweight="bold")
+    plt.xlabel(spec["xlabel"], fontsize=16, fontweight="bold")
+    plt.ylabel("Density", fontsize=16, fontweight="bold")
+    if spec["xtick_step"]:
+        plt.xticks(np.arange(int(values.min()), int(values.max()) + 1, spec["xtick_step"]))
+    plt.legend(fontsize=14, frameon=True)
+    if spec["grid"]:
+        plt.grid(alpha=0.15)
+    plt.tight_layout()
+
+    base_name = os.path.join(plot_dir, spec["output"])
+    for ext in FORMATS:
+        plt.savefig(f"{base_name}.{ext}", **({"dpi": 400} if ext == "png" else {}))
+    plt.close()
+    return [f"{base_name}.{ext}" for ext in FORMATS]
+
+
+def render_runs(runs, kinds=None, workers=None, force=False):
+    """
+    Render every requested figure type for every run. Tables are read once
+    per run; each figure type's KDEs are evaluated on one grid shared by all
+    runs; figures whose input hash is unchanged (and whose files exist) are
+    skipped. Rendering is spread over a process pool when workers != 1.
+    """
+    import numpy as np
+
+    kinds = kinds or list(FIGURES)
+    loaded = [(run, load_values(run)) for run in runs]
+
+    # shared grid per figure type spanning all runs; each run keeps its own range
+    grids = {}
+    for kind in kinds:
+        arrays = [v[kind] for _, v in loaded if len(v.get(kind, ())) > 0]
+        if arrays:
+            lo = min(a.min() for a in arrays)
+            hi = max(a.max() for a in arrays)
+            grids[kind] = np.linspace(lo, hi, FIGURES[kind]["grid_points"] * max(1, len(arrays)))
+
+    tasks, hashes, skipped = [], {}, 0
+    for run, values in loaded:
+        plot_hashes = hashes.setdefault(run["plot_dir"], _load_hashes(run["plot_dir"]))
+        for kind in kinds:
+            data = values.get(kind)
+            if data is None or len(data) == 0:
+                continue
+            digest = input_hash(kind, data, grids[kind])
+            if not force and plot_hashes.get(kind) == digest and _outputs_exist(run["plot_dir"], kind):
+                skipped += 1
+                continue
+
+            grid = grids[kind]
+            x = grid[(grid >= data.min()) & (grid <= data.max())]
+            if len(x) < 2:
+                x = np.linspace(data.min(), data.max(), FIGURES[kind]["grid_points"])
+            y = kde_on_grid(data, x, FIGURES[kind]["bw_method"])
+            tasks.append(({"kind": kind, "values": data, "x": x, "y": y, "plot_dir": run["plot_dir"]}, digest))
+
+    if workers == 1 or len(tasks) <= 1:
+        results = [render_figure(t) for t, _ in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(render_figure, [t for t, _ in tasks]))
+
+    for (task, digest), files in zip(tasks, results):
+        hashes[task["plot_dir"]][task["kind"]] = digest
+        print(f"Saved {task['kind']} plots: " + ", ".join(files))
+    for plot_dir, plot_hashes in hashes.items():
+        if plot_hashes:
+            os.makedirs(plot_dir, exist_ok=True)
+            _save_hashes(plot_dir, plot_hashes)
+
+    print(f"Rendered {len(tasks)} figures, skipped {skipped} unchanged")
+    return len(tasks), skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render similarity, lost-gene and new-gene figures for many evaluation runs.")
+    parser.add_argument(
+        "--eval_dirs", type=str, nargs="+", default=None,
+        help="Evaluation directories holding gene_set_similarity.csv / gene_set_comparison.csv."
+    )
+    parser.add_argument(
+        "--matrix_dir", type=str, default=None,
+        help="Output directory of evaluation.py --manifest; every run subdirectory is plotted."
+    )
+    parser.add_argument("--figures", type=str, nargs="+", choices=list(FIGURES), default=None,
+                        help="Figure types to render (default: all).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs).")
+    parser.add_argument("--force", action="store_true", help="Re-render even if the inputs are unchanged.")
+    args = parser.parse_args()
+
+    eval_dirs = list(args.eval_dirs or [])
+    if args.matrix_dir:
+        eval_dirs += sorted(
+            os.path.join(args.matrix_dir, d) for d in os.listdir(args.matrix_dir)
+            if os.path.isdir(os.path.join(args.matrix_dir, d))
+        )
+    if not eval_dirs:
+        eval_dirs = ["out/evaluation"]
+
+    render_runs([run_from_dir(d) for d in eval_dirs], kinds=args.figures, workers=args.workers, force=args.force)
@@ -0,0 +1,207 @@
+import os
+import json
+import hashlib
+import argparse
+
+from utils import LLM_OPTIONS, MAKER_MODELS, CHECKER_MODELS, phenotype_json_reader, read_phenotype_to_gene_sets
+from checker_store import load_checks
+
+GENERATIONS_DIR = "out/phenotype_generations"
+CHECKS_DIR = "out/check_store"
+LEGACY_CHECKS_DIR = "out/phenotype_checks"
+MAKER_ABSTRACTS_DIR = "abstracts/gene_annotated_abstracts"
+CHECKER_ABSTRACTS_DIR = "abstracts/gene_related_abstracts"
+
+# Append-only manifest inside each model's output directory; the last stamp per item wins
+HASHES_FILE = "input_hashes.jsonl"
+
+KINDS = {"generations": GENERATIONS_DIR, "checks": CHECKS_DIR}
+
+# {(kind, model): hashes} read once per process and kept current by stamp()
+_hashes = {}
+
+
+def input_digest(pmids, prompt_text, model, options):
+    """Hash of everything an output depends on: PMID set, prompt text, model and options."""
+    payload = json.dumps(
+        {
+            "pmids": sorted({str(p) for p in pmids}),
+            "prompt": prompt_text,
+            "model": model,
+            "options": options,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def maker_digest(documents, model):
+    from instructs import rag_prompt, grade_abstracts_instructions
+    pmids = [d.get("pmid") for d in documents]
+    return input_digest(pmids, grade_abstracts_instructions + rag_prompt, model, LLM_OPTIONS)
+
+
+def checker_digest(documents, model):
+    from instructs import rag_prompt2, grade_abstracts_instructions2
+    pmids = [d.get("pmid") for d in documents]
+    return input_digest(pmids, grade_abstracts_instructions2 + rag_prompt2, model, LLM_OPTIONS)
+
+
+def _manifest_path(kind, model):
+    return os.path.join(KINDS[kind], model, HASHES_FILE)
+
+
+def load_hashes(kind, model):
+    """Load stamps as {(phenotype, gene): digest}; gene is None for generations."""
+    path = _manifest_path(kind, model)
+    hashes = {}
+    if not os.path.exists(path):
+        return hashes
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            hashes[(rec["phenotype"], rec.get("gene"))] = rec["digest"]
+    return hashes
+
+
+def get_hashes(kind, model):
+    """load_hashes, read once per process; stamp() keeps it up to date."""
+    key = (kind, model)
+    if key not in _hashes:
+        _hashes[key] = load_hashes(kind, model)
+    return _hashes[key]
+
+
+def stamp(kind, model, phenotype, digest, gene=None):
+    """Record the input hash an output was computed from (only once the output is written)."""
+    path = _manifest_path(kind, model)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"phenotype": phenotype, "gene": gene, "digest": digest}) + "\n")
+    if (kind, model) in _hashes:
+        _hashes[(kind, model)][(phenotype, gene)] = digest
+
+
+def output_exists(kind, model, phenotype, gene=None, checks=None):
+    """
+    Whether the output itself is there: the generation JSON, or the check
+    record in the store (checks: preloaded load_checks(model)) or legacy layout.
+    """
+    if kind == "generations":
+        return os.path.exists(os.path.join(GENERATIONS_DIR, model, f"{phenotype}.json"))
+    if checks is None:
+        checks = load_checks(model, phenotypes=[phenotype])
+    return gene in checks.get(phenotype, {}) or os.path.exists(
+        os.path.join(LEGACY_CHECKS_DIR, model, phenotype, f"{gene}.json")
+    )
+
+
+def is_current(kind, model, phenotype, digest, gene=None, hashes=None):
+    """
+    True if the output exists and was stamped with exactly this input hash.
+    hashes defaults to get_hashes(kind, model).
+    """
+    hashes = get_hashes(kind, model) if hashes is None else hashes
+    return hashes.get((phenotype, gene)) == digest and output_exists(kind, model, phenotype, gene)
+
+
+def _load_documents(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        data = json.load(f)
+    return [data] if isinstance(data, dict) else data
+
+
+def find_stale(phenotypes, gene_sets, maker_models, checker_models):
+    """
+    Compare stamped hashes against the current inputs.
+
+    Returns a dict with:
+      - stale:     items whose stamp differs from the current input hash, or
+                   whose output is missing although it was stamped
+      - unstamped: existing outputs with no stamp yet (e.g. produced before stamping existed)
+    Generations are (model, phenotype, None), checks are (model, phenotype, gene).
+    Items whose abstracts were never retrieved are not reported.
+    """
+    stale, unstamped = [], []
+
+    for model in maker_models:
+        hashes = load_hashes("generations", model)
+        for p in phenotypes:
+            name = p["name"]
+            docs = _load_documents(os.path.join(MAKER_ABSTRACTS_DIR, f"{name}.json"))
+            if docs is None:
+                continue
+            stamped = hashes.get((name, None))
+            exists = output_exists("generations", model, name)
+            if stamped is None:
+                if exists:
+                    unstamped.append(("generations", model, name, None))
+            elif not exists or stamped != maker_digest(docs, model):
+                stale.append(("generations", model, name, None))
+
+    for model in checker_models:
+        hashes = load_hashes("checks", model)
+        checks = load_checks(model)
+        for p in phenotypes:
+            name = p["name"]
+            for gene in gene_sets.get(name, []):
+                docs = _load_documents(os.path.join(CHECKER_ABSTRACTS_DIR, f"{name}_{gene}.json"))
+                if docs is None:
+                    continue
+                stamped = hashes.get((name, gene))
+                exists = output_exists("checks", model, name, gene, checks=checks)
+                if stamped is None:
+                    if exists:
+                        unstamped.append(("checks", model, name, gene))
+                elif not exists or stamped != checker_digest(docs, model):
+                    stale.append(("checks", model, name, gene))
+
+    return {"stale": stale, "unstamped": unstamped}
+
+
+def adopt_unstamped(unstamped):
+    """Stamp existing outputs with their current input hashes, trusting them as up to date."""
+    for kind, model, name, gene in unstamped:
+        if kind == "generations":
+            docs = _load_documents(os.path.join(MAKER_ABSTRACTS_DIR, f"{name}.json"))
+            stamp(kind, model, name, maker_digest(docs, model))
+        else:
+            docs = _load_documents(os.path.join(CHECKER_ABSTRACTS_DIR, f"{name}_{gene}.json"))
+            stamp(kind, model, name, checker_digest(docs, model), gene=gene)
+
+
+def print_report(report):
+    print("=== STALE OUTPUTS ===")
+    for kind, model, name, gene in report["stale"]:
+        print(f"{kind}\t{model}\t{name}" + (f"\t{gene}" if gene else ""))
+    print(f"\nStale: {len(report['stale'])}")
+    print(f"Unstamped (no recorded input hash): {len(report['unstamped'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report outputs whose inputs changed since they were computed.")
+    parser.add_argument("--input_file", type=str, default="out/in_db_and_p2g_details.json")
+    parser.add_argument("--gene_sets", type=str, default="out/phenotype_to_gene_sets.txt")
+    parser.add_argument(
+        "--adopt", action="store_true",
+        help="Stamp unstamped outputs with their current input hashes."
+    )
+    args = parser.parse_args()
+
+    phenotypes = phenotype_json_reader(args.input_file)
+    gene_sets = read_phenotype_to_gene_sets(args.gene_sets) if os.path.exists(args.gene_sets) else {}
+
+    report = find_stale(phenotypes, gene_sets, MAKER_MODELS, CHECKER_MODELS)
+    print_report(report)
+
+    if args.adopt:
+        adopt_unstamped(report["unstamped"])
+        print(f"Stamped {len(report['unstamped'])} existing outputs.")
@@ -1,5 +1,7 @@
-import requests
+import os
 import time 
+from tracing import record_http_request
+from retry_queue import PUBTATOR_BREAKER
 
 LOG_FILE = "abstract_data.txt"
 
@@ -13,7 +15,20 @@ def log_abstract_data(query, total_pages, page_limit, total_abstracts):
 
 
 class Pubtator:
-    BASE_URL = "https://www.ncbi.nlm.nih.gov/research/pubtator3-api"
+    # PUBTATOR_BASE_URL points the pipelines at a mirror or a stand-in (benchmarks/pubtator_sim.py)
+    BASE_URL = os.environ.get("PUBTATOR_BASE_URL", "https://www.ncbi.nlm.nih.gov/research/pubtator3-api").rstrip("/")
+
+    @staticmethod
+    def _get(url, params=None):
+        """GET a PubTator endpoint through the circuit breaker, counting the request for tracing."""
+        import requests
+
+        def fetch():
+            record_http_request()
+            r = requests.get(url, params=params)
+            r.raise_for_status()
+            return r
+        return PUBTATOR_BREAKER.call(fetch)
 
     @staticmethod
     def find_entity_ID(entity_details: str, bioconcept: str = None, limit: int = 100):
@@ -30,8 +45,7 @@ class Pubtator:
             "concept": bioconcept,
             "limit": limit
         }
-        r = requests.get(url, params={k: v for k, v in params.items() if v is not None})
-        r.raise_for_status()
+        r = Pubtator._get(url, params={k: v for k, v in params.items() if v is not None})
         return r.json()
 
     @staticmethod
@@ -49,8 +63,7 @@ class Pubtator:
             "type": relation_type,
             "e2": entity_type
         }
-        r = requests.get(url, params={k: v for k, v in params.items() if v is not None})
-        r.raise_for_status()
+        r = Pubtator._get(url, params={k: v for k, v in params.items() if v is not None})
         return r.json()
 
     @staticmethod
@@ -78,8 +91,7 @@ class Pubtator:
                 "text": relation if relation else query,
                 "page": page
             }
-            r = requests.get(url, params=params)
-            r.raise_for_status()
+            r = Pubtator._get(url, params=params)
             data = r.json()
 
             # Set total pages from first API response
@@ -123,8 +135,7 @@ class Pubtator:
         :return: dict with title, journal, abstract, and gene annotations
         """
         url = f"{Pubtator.BASE_URL}/publications/export/biocjson?pmids={pmid}"
-        r = requests.get(url)
-        r.raise_for_status()
+        r = Pubtator._get(url)
         data = r.json()
 
         # Base result container
@@ -1,10 +1,12 @@
 import time
-from langgraph.graph import END
-from langgraph.graph import StateGraph
 from pubtator import Pubtator
-from utils import GraphState, get_llm, get_llm_json_mode, clean_model_output, save_to_json_list
-from langchain_core.messages import HumanMessage, SystemMessage
+from utils import GraphState, get_llm, get_llm_json_mode, save_to_json_list
+from tracing import trace_node
+from provenance import checker_digest, stamp
+from retry_queue import record_failure
+from checker_store import append_check
 from instructs import rag_prompt2, grade_abstracts_instructions2
+import llm_json
 import json
 import os
 
@@ -43,6 +45,7 @@ def retrieve_pubtator_abstracts(state: GraphState):
                 abstracts.append(abs_data)
         except Exception as e:
             print(f"Error fetching PMID {pmid}: {e}")
+            record_failure("pmid", query, e, gene=gene, pmid=pmid)
 
     # Save raw abstracts once
     save_to_json_list(abstracts, cache_file)
@@ -51,6 +54,25 @@ def retrieve_pubtator_abstracts(state: GraphState):
     return {"documents": abstracts}
 
 
+def append_abstract(name, gene, pmid):
+    """
+    Fetch a PMID that failed during retrieval and add it to the cached
+    abstracts for this phenotype + gene. Changing the PMID set makes the check stale.
+    """
+    cache_file = os.path.join("abstracts/gene_related_abstracts", f"{name}_{gene}.json")
+    abs_data = Pubtator.export_abstract(pmid, check_for_genes=False)
+    if not abs_data:
+        return
+    abstracts = []
+    if os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
+            abstracts = json.load(f)
+    if any(str(d.get("pmid")) == str(pmid) for d in abstracts):
+        return
+    abstracts.append(abs_data)
+    save_to_json_list(abstracts, cache_file)
+
+
 def grade_abstracts(state, llm_name):
     """
     Grade abstracts for phenotype+gene relevance using ONLY abstracts passed in state["documents"].
@@ -69,6 +91,8 @@ def grade_abstracts(state, llm_name):
         f"and the phenotype '{phenotype['name']}' ({phenotype.get('definition', 'N/A')})?"
     )
 
+    from langchain_core.messages import HumanMessage, SystemMessage
+
     llm = get_llm_json_mode(llm_name)
     filtered = []
 
@@ -103,10 +127,17 @@ def generate(state, llm_name):
     gene = phenotype["gene"]
     safe_name = phenotype["name"]
 
+    # Hash of the inputs this check depends on
+    digest = checker_digest(state.get("documents", []), llm_name)
+
     documents = state.get(f"documents_{llm_name}", [])
     if not documents:
+        # nothing passed grading: record the gene as not validated
         print(f"No filtered abstracts for {safe_name} / {gene}")
-        return {f"generation_{llm_name}": []}
+        generation = {"Gene": gene, "Validation": "no", "Supporting Extract": "", "PMIDS": []}
+        append_check(llm_name, safe_name, gene, generation)
+        stamp("checks", llm_name, safe_name, digest, gene=gene)
+        return {f"generation_{llm_name}": generation}
 
     pmids = [d.get("pmid") for d in documents]
     formatted_docs = [
@@ -117,39 +148,42 @@ def generate(state, llm_name):
 
     question = f"Is gene '{gene}' supported as being associated with phenotype '{phenotype['name']}'?"
 
+    from langchain_core.messages import HumanMessage, SystemMessage
+
     llm = get_llm_json_mode(llm_name)
     result = llm.invoke([
         SystemMessage(content="You are a precise biomedical reasoning model. Respond only in JSON."),
         HumanMessage(content=rag_prompt2.format(context=context, question=question))
     ])
 
-    try:
-        generation = json.loads(result.content)
-    except Exception:
-        generation = json.loads(clean_model_output(result.content))
+    generation = llm_json.loads(result.content)
+    if not isinstance(generation, dict):
+        raise ValueError(f"No JSON object in the {llm_name} answer for {gene} / {safe_name}")
 
     generation["PMIDS"] = pmids
 
-    outfile = f"out/phenotype_checks/{llm_name}/{safe_name}/{gene}.json"
-    os.makedirs(os.path.dirname(outfile), exist_ok=True)
-    with open(outfile, "w") as f:
-        json.dump(generation, f, indent=2)
-    print(f"Saved generation for {gene} and {safe_name} to {outfile}")
+    # One record in the per-model results store instead of one file per gene
+    append_check(llm_name, safe_name, gene, generation)
+    stamp("checks", llm_name, safe_name, digest, gene=gene)
+    print(f"Saved generation for {gene} and {safe_name} to the {llm_name} check store")
 
     return {f"generation_{llm_name}": generation}
 
 
 def create_control_flow():
+    from langgraph.graph import END, StateGraph
     workflow = StateGraph(GraphState)
 
     # Step 1: Retrieve abstracts
-    workflow.add_node("retrieve", retrieve_pubtator_abstracts)
+    workflow.add_node("retrieve", trace_node("retrieve_gene", retrieve_pubtator_abstracts))
 
     # Step 2: Grade abstracts for phenotype + gene relevance using llama
-    workflow.add_node("grade_llama", lambda s: grade_abstracts(s, "llama3.1:8b"))
+    workflow.add_node("grade_llama", trace_node("grade_llama",
+        lambda s: grade_abstracts(s, "llama3.1:8b"), model="llama3.1:8b"))
 
     # Step 3: Generate inference (validate gene–phenotype association)
-    workflow.add_node("gen_llama", lambda s: generate(s, "llama3.1:8b"))
+    workflow.add_node("gen_llama", trace_node("gen_llama",
+        lambda s: generate(s, "llama3.1:8b"), model="llama3.1:8b"))
 
     # Define workflow structure
     workflow.set_entry_point("retrieve")
@@ -1,20 +1,29 @@
 import time
-from langgraph.graph import END
-from langgraph.graph import StateGraph
 from pubtator import Pubtator
-from utils import GraphState, get_llm, get_llm_json_mode, clean_model_output, check_is_gene_annotated
-from langchain_core.messages import HumanMessage, SystemMessage
+from utils import GraphState, get_llm, get_llm_json_mode, check_is_gene_annotated
+from tracing import trace_node
+from provenance import maker_digest, is_current, stamp
+from retry_queue import record_failure, is_transient
 from instructs import rag_prompt,grade_abstracts_instructions
+from literature_reuse import ancestor_abstracts, record_reuse, get_ontology
+import llm_json
 import json 
 import os
-import asyncio
 
 CHECKED_PMIDS_FILE = "checked_pmids.json"
 PMIDS_FILE = "abstracts/pmids.txt"
 
-with open(PMIDS_FILE, "r") as f:
-    # get PMIDs that are gene-annotated
-    ga_pmids = list({int(line.strip()) for line in f if line.strip()} )
+_ga_pmids = None
+
+
+def get_ga_pmids():
+    """Gene-annotated PMIDs, read from PMIDS_FILE on first use."""
+    global _ga_pmids
+    if _ga_pmids is None:
+        with open(PMIDS_FILE, "r") as f:
+            _ga_pmids = {int(line.strip()) for line in f if line.strip()}
+    return _ga_pmids
+
 
 def retrieve_pubtator_abstracts(state: GraphState):
     phenotype = state["phenotype"]
@@ -37,7 +46,11 @@ def retrieve_pubtator_abstracts(state: GraphState):
         checked_pmids = {}
 
     pmids = Pubtator.search_pubtator_ID(query=name, limit=25)
-    pmids = check_is_gene_annotated(pmids, ga_pmids)
+    pmids = check_is_gene_annotated(pmids, get_ga_pmids())
+
+    # abstracts already downloaded for HPO ancestors (empty without an ontology)
+    reusable = ancestor_abstracts(phenotype)
+    reused = skipped = 0
 
     abstracts = []
     MAX_REQUESTS_PER_SECOND = 3
@@ -45,6 +58,12 @@ def retrieve_pubtator_abstracts(state: GraphState):
 
     for pmid in pmids:
         if str(pmid) in checked_pmids and not checked_pmids[str(pmid)]["has_genes"]:
+            skipped += 1
+            continue
+
+        if str(pmid) in reusable:
+            abstracts.append(reusable[str(pmid)])
+            reused += 1
             continue
 
         try:
@@ -56,7 +75,10 @@ def retrieve_pubtator_abstracts(state: GraphState):
                 abstracts.append(abs_data)
 
             time.sleep(DELAY)
-        except Exception:
+        except Exception as e:
+            # keep going, but queue the PMID so it is fetched on a later run
+            print(f"Error fetching PMID {pmid}: {e}")
+            record_failure("pmid", name, e, pmid=pmid)
             time.sleep(DELAY)
             continue
 
@@ -69,10 +91,45 @@ def retrieve_pubtator_abstracts(state: GraphState):
     with open(outfile, "w") as f:
         json.dump(abstracts, f, indent=2)
 
-    print(f"Saved {len(abstracts)} abstracts to {outfile}")
+    fetched = len(pmids) - skipped - reused
+    # the reuse log is only meaningful when ancestors can be looked up
+    if get_ontology() is not None:
+        record_reuse(name, len(pmids), reused, fetched, skipped)
+    print(f"Saved {len(abstracts)} abstracts to {outfile} ({reused} reused from ancestors, {fetched} fetched)")
     return {"documents": abstracts}
 
 
+def append_abstract(name, pmid):
+    """
+    Fetch a PMID that failed during retrieval and add it to the phenotype's
+    cached abstracts. Changing the PMID set makes the generations stale.
+    """
+    outfile = f"abstracts/gene_annotated_abstracts/{name}.json"
+    abs_data = Pubtator.export_abstract(pmid)
+
+    if os.path.exists(CHECKED_PMIDS_FILE):
+        with open(CHECKED_PMIDS_FILE, "r") as f:
+            checked_pmids = json.load(f)
+    else:
+        checked_pmids = {}
+    checked_pmids[str(pmid)] = {"has_genes": abs_data is not None}
+    with open(CHECKED_PMIDS_FILE, "w") as f:
+        json.dump(checked_pmids, f, indent=2)
+
+    if abs_data is None:
+        return
+    abstracts = []
+    if os.path.exists(outfile):
+        with open(outfile, "r") as f:
+            abstracts = json.load(f)
+    if any(str(d.get("pmid")) == str(pmid) for d in abstracts):
+        return
+    abstracts.append(abs_data)
+    os.makedirs(os.path.dirname(outfile), exist_ok=True)
+    with open(outfile, "w") as f:
+        json.dump(abstracts, f, indent=2)
+
+
 
 def grade_abstracts(state, llm_name):
     print("---CHECK ABSTRACT RELEVANCE---")
@@ -83,12 +140,18 @@ def grade_abstracts(state, llm_name):
     if not documents:
         return {f"documents_{llm_name}": []}
 
+    if is_current("generations", llm_name, phenotype["name"], maker_digest(documents, llm_name)):
+        print(f"Inputs unchanged for {phenotype['name']} / {llm_name}. Skipping grading.")
+        return {f"documents_{llm_name}": []}
+
     question = (
         f"Is this abstract relevant to the phenotype '{phenotype['name']}', "
         f"defined as '{phenotype.get('definition', 'N/A')}', or its synonyms: "
         f"{', '.join(phenotype.get('synonyms', [])) if phenotype.get('synonyms') else 'None'}?"
     )
 
+    from langchain_core.messages import HumanMessage, SystemMessage
+
     llm = get_llm_json_mode(llm_name)
     filtered = []
 
@@ -113,28 +176,6 @@ def grade_abstracts(state, llm_name):
 
     return {f"documents_{llm_name}": filtered}
 
-def safe_json_loads(raw_output):
-    """
-    Safely parse LLM output into JSON, attempting to repair common truncation issues.
-    """
-    import json
-    try:
-        return json.loads(raw_output)
-    except json.JSONDecodeError as e:
-        print(f"JSON decode failed: {e}")
-        partial = raw_output[:e.pos]
-        # Try to balance braces/brackets
-        if partial.count("{") > partial.count("}"):
-            partial += "}"
-        if partial.count("[") > partial.count("]"):
-            partial += "]"
-        try:
-            return json.loads(partial)
-        except Exception:
-            print("Could not recover JSON, returning empty list.")
-            return []
-
-
 def generate(state, llm_name):
     """
     Generate gene extraction results using only the in-memory filtered abstracts.
@@ -147,10 +188,27 @@ def generate(state, llm_name):
     phenotype = state["phenotype"]
     safe_name = phenotype["name"]
 
+    # Hash of the inputs this generation depends on
+    digest = maker_digest(state.get("documents", []), llm_name)
+    if is_current("generations", llm_name, safe_name, digest):
+        print(f"Inputs unchanged for {safe_name} / {llm_name}. Skipping generation.")
+        return {f"generation_{llm_name}": []}
+
+    # Prepare output paths
+    out_dir = f"out/phenotype_generations/{llm_name}"
+    os.makedirs(out_dir, exist_ok=True)
+
+    json_outfile = f"{out_dir}/{safe_name}.json"
+    raw_outfile = f"{out_dir}/{safe_name}_raw.txt"
+
     # Load filtered abstracts from the graph state
     documents = state.get(f"documents_{llm_name}", [])
     if not documents:
+        # nothing passed grading: an empty generation is the result
         print(f"No filtered abstracts for {llm_name}")
+        with open(json_outfile, "w") as f:
+            json.dump([], f)
+        stamp("generations", llm_name, safe_name, digest)
         return {f"generation_{llm_name}": []}
 
     # Build question and context
@@ -164,6 +222,8 @@ def generate(state, llm_name):
         for d in documents
     ])
 
+    from langchain_core.messages import HumanMessage, SystemMessage
+
     llm = get_llm(llm_name)
 
     messages = [
@@ -171,44 +231,38 @@ def generate(state, llm_name):
         HumanMessage(content=rag_prompt.format(context=context_text, question=question))
     ]
 
-    # Prepare output paths
-    out_dir = f"out/phenotype_generations/{llm_name}"
-    os.makedirs(out_dir, exist_ok=True)
-
-    json_outfile = f"{out_dir}/{safe_name}.json"
-    raw_outfile = f"{out_dir}/{safe_name}_raw.txt"
-
     # Call LLM and parse JSON
     try:
         result = llm.invoke(messages)
         raw_output = result.content.strip()
 
-        # Try parsing normally
-        generation = safe_json_loads(raw_output)
+        # Tolerant parse: skips <think> blocks and fences, keeps the complete
+        # objects of a truncated list and drops repeated ones
+        generation = llm_json.loads(raw_output, default=[])
 
-        # If JSON parsing failed
+        # If no JSON could be recovered
         if not generation:
             print("Invalid or empty JSON. Saving raw model output...")
             with open(raw_outfile, "w") as f:
                 f.write(raw_output)
 
-            # Attempt cleanup of brackets
-            generation = safe_json_loads(clean_model_output(raw_output))
-
-            if not generation:
-                print("Could not parse JSON after cleanup.")
-
     except Exception as e:
-        # Log exception and continue with empty generation
+        # Service outages fail the unit so it goes to the retry queue
+        if is_transient(e):
+            raise
+        # Log the exception and queue the generation for a retry; nothing is
+        # written or stamped, so the phenotype is not taken as done
         print(f"LLM invocation error: {e}")
         with open(raw_outfile, "w") as f:
             f.write(str(e))
-        generation = []
+        record_failure("maker", safe_name, e)
+        return {f"generation_{llm_name}": []}
 
     # Save parsed JSON (even if it's empty)
     try:
         with open(json_outfile, "w") as f:
             json.dump(generation, f, indent=2)
+        stamp("generations", llm_name, safe_name, digest)
         print(f"Saved generation JSON to {json_outfile}")
     except Exception as e:
         print(f" Failed writing JSON file for {safe_name}: {e}")
@@ -221,30 +275,31 @@ def generate(state, llm_name):
 
 
 def create_control_flow():
+    from langgraph.graph import END, StateGraph
 
     workflow = StateGraph(GraphState)
 
     # Add nodes (all synchronous functions)
-    workflow.add_node("retrieve", retrieve_pubtator_abstracts)
+    workflow.add_node("retrieve", trace_node("retrieve", retrieve_pubtator_abstracts))
 
-    workflow.add_node("grade_qwen",
-        lambda state: grade_abstracts(state, llm_name="qwen3:32b")
+    workflow.add_node("grade_qwen", trace_node("grade_qwen",
+        lambda state: grade_abstracts(state, llm_name="qwen3:32b"), model="qwen3:32b")
     )
-    workflow.add_node("grade_deepseek",
-        lambda state: grade_abstracts(state, llm_name="deepseek-r1:8b")
+    workflow.add_node("grade_deepseek", trace_node("grade_deepseek",
+        lambda state: grade_abstracts(state, llm_name="deepseek-r1:8b"), model="deepseek-r1:8b")
     )
-    workflow.add_node("grade_llama3",
-        lambda state: grade_abstracts(state, llm_name="llama3.1:8b")
+    workflow.add_node("grade_llama3", trace_node("grade_llama3",
+        lambda state: grade_abstracts(state, llm_name="llama3.1:8b"), model="llama3.1:8b")
     )
 
-    workflow.add_node("generate_qwen",
-        lambda state: generate(state, llm_name="qwen3:32b")
+    workflow.add_node("generate_qwen", trace_node("generate_qwen",
+        lambda state: generate(state, llm_name="qwen3:32b"), model="qwen3:32b")
     )
-    workflow.add_node("generate_deepseek",
-        lambda state: generate(state, llm_name="deepseek-r1:8b")
+    workflow.add_node("generate_deepseek", trace_node("generate_deepseek",
+        lambda state: generate(state, llm_name="deepseek-r1:8b"), model="deepseek-r1:8b")
     )
-    workflow.add_node("generate_llama3",
-        lambda state: generate(state, llm_name="llama3.1:8b")
+    workflow.add_node("generate_llama3", trace_node("generate_llama3",
+        lambda state: generate(state, llm_name="llama3.1:8b"), model="llama3.1:8b")
     )
 
     # Entry point
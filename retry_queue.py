@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+
+# Append-only dead-letter queue; the last record per unit wins
+DEAD_LETTER_FILE = "out/dead_letter.jsonl"
+
+# Exponential backoff between retries of the same unit
+BASE_DELAY = 60
+MAX_DELAY = 6 * 3600
+MAX_ATTEMPTS = 8
+
+# Exception class names that indicate the remote service, not the input, is at fault
+TRANSIENT_ERRORS = {
+    "ConnectionError",
+    "ConnectError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "Timeout",
+    "TimeoutError",
+    "RemoteProtocolError",
+    "ChunkedEncodingError",
+}
+
+_queue_lock = threading.Lock()
+
+
+def is_transient(error):
+    """True for connection failures, timeouts, HTTP 429 and 5xx responses."""
+    if any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def _unit_key(kind, phenotype, gene=None, pmid=None):
+    return f"{kind}|{phenotype}|{gene or ''}|{pmid or ''}"
+
+
+# Latest record per unit, read from DEAD_LETTER_FILE up to _offset; later
+# appends (by this or another process) are read incrementally from there
+_latest = {}
+_offset = 0
+
+
+def _sync():
+    """Bring _latest up to date with the file, reading only what was appended since."""
+    global _latest, _offset
+    size = os.path.getsize(DEAD_LETTER_FILE) if os.path.exists(DEAD_LETTER_FILE) else 0
+    if size < _offset:
+        # the file was replaced or truncated: start over
+        _latest, _offset = {}, 0
+    if size == _offset:
+        return
+    with open(DEAD_LETTER_FILE, "rb") as f:
+        f.seek(_offset)
+        data = f.read(size - _offset)
+    # leave a partial last line for the next read
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].decode("utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        _latest[rec["key"]] = rec
+    _offset += end
+
+
+def _append(record):
+    with _queue_lock:
+        _sync()
+        os.makedirs(os.path.dirname(DEAD_LETTER_FILE), exist_ok=True)
+        with open(DEAD_LETTER_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        _sync()
+
+
+def _load_latest():
+    with _queue_lock:
+        _sync()
+        return _latest
+
+
+def load_queue():
+    """Unresolved failed units as {key: record}."""
+    return {k: r for k, r in _load_latest().items() if not r.get("resolved")}
+
+
+def record_failure(kind, phenotype, error, gene=None, pmid=None):
+    """
+    Record a failed unit (kind is "maker", "checker" or "pmid") with its error class.
+    The next retry is scheduled with exponential backoff.
+    """
+    key = _unit_key(kind, phenotype, gene, pmid)
+    previous = _load_latest().get(key, {})
+    attempts = 0 if previous.get("resolved") else previous.get("attempts", 0)
+    attempts += 1
+
+    delay = min(BASE_DELAY * 2 ** (attempts - 1), MAX_DELAY)
+    record = {
+        "key": key,
+        "kind": kind,
+        "phenotype": phenotype,
+        "gene": gene,
+        "pmid": pmid,
+        "error_class": type(error).__name__,
+        "error": str(error)[:500],
+        "transient": is_transient(error),
+        "attempts": attempts,
+        "failed_at": time.time(),
+        "next_retry_at": time.time() + delay,
+        "exhausted": attempts >= MAX_ATTEMPTS,
+    }
+    _append(record)
+    return record
+
+
+def record_success(kind, phenotype, gene=None, pmid=None, queue=None):
+    """Mark a previously failed unit as resolved (no-op if it never failed)."""
+    key = _unit_key(kind, phenotype, gene, pmid)
+    queue = load_queue() if queue is None else queue
+    if key in queue:
+        _append({"key": key, "kind": kind, "phenotype": phenotype, "gene": gene,
+                 "pmid": pmid, "resolved": True, "resolved_at": time.time()})
+        queue.pop(key, None)
+
+
+def is_deferred(kind, phenotype, gene=None, pmid=None, queue=None, now=None):
+    """True if the unit failed before and is still waiting for its backoff (or gave up)."""
+    queue = load_queue() if queue is None else queue
+    rec = queue.get(_unit_key(kind, phenotype, gene, pmid))
+    if rec is None:
+        return False
+    now = time.time() if now is None else now
+    return rec.get("exhausted") or rec["next_retry_at"] > now
+
+
+def requeue_exhausted(kind=None):
+    """Give units that used up their retries a fresh set of attempts, due now."""
+    requeued = 0
+    for rec in list(load_queue().values()):
+        if rec.get("exhausted") and (kind is None or rec["kind"] == kind):
+            _append({**rec, "attempts": 0, "exhausted": False, "next_retry_at": time.time(), "requeued_at": time.time()})
+            requeued += 1
+    return requeued
+
+
+def due_entries(kind=None, now=None):
+    """Failed units whose backoff has elapsed and that have retries left."""
+    now = time.time() if now is None else now
+    return [
+        r for r in load_queue().values()
+        if (kind is None or r["kind"] == kind) and not r.get("exhausted") and r["next_retry_at"] <= now
+    ]
+
+
+class CircuitBreaker:
+    """
+    Stops hammering a service that is down. After failure_threshold consecutive
+    transient failures the circuit opens and callers sleep until the cooldown has
+    passed; then a single trial call is let through. Repeated trips double the
+    cooldown up to max_cooldown.
+    """
+
+    def __init__(self, name, failure_threshold=5, cooldown=30, max_cooldown=900):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        wait = self.open_until - time.monotonic()
+        if wait > 0:
+            print(f"Circuit for {self.name} is open. Pausing {wait:.0f}s before retrying.")
+            time.sleep(wait)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.cooldown
+                print(f"{self.name} appears to be down after {self.failures} failures. "
+                      f"Opening circuit for {self.cooldown}s.")
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                # half-open: the next call after the cooldown is a single trial
+                self.failures = self.failure_threshold - 1
+
+    def call(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_transient(e):
+                self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+OLLAMA_BREAKER = CircuitBreaker("Ollama")
+PUBTATOR_BREAKER = CircuitBreaker("PubTator")
+
+
+class BreakerLLM:
+    """Routes a chat model's invoke() calls through a circuit breaker."""
+
+    def __init__(self, llm, breaker=OLLAMA_BREAKER):
+        self.llm = llm
+        self.breaker = breaker
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def invoke(self, *args, **kwargs):
+        return self.breaker.call(self.llm.invoke, *args, **kwargs)
+
+
+def print_queue():
+    queue = load_queue()
+    now = time.time()
+    print(f"Unresolved failed units: {len(queue)}\n")
+
+    print("=== BY KIND AND ERROR CLASS ===")
+    for (kind, error_class), n in sorted(Counter((r["kind"], r["error_class"]) for r in queue.values()).items()):
+        print(f"{kind:<10}{error_class:<30}{n:>8}")
+
+    exhausted = [r for r in queue.values() if r.get("exhausted")]
+    due = [r for r in queue.values() if not r.get("exhausted") and r["next_retry_at"] <= now]
+    print(f"\nDue for retry: {len(due)}")
+    print(f"Gave up after {MAX_ATTEMPTS} attempts: {len(exhausted)}")
+    for r in exhausted:
+        print(f"  {r['kind']}\t{r['phenotype']}\t{r.get('gene') or ''}\t{r.get('pmid') or ''}\t{r['error_class']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the dead-letter queue of failed pipeline units.")
+    parser.add_argument(
+        "--retry_exhausted", action="store_true",
+        help="Requeue units that gave up after MAX_ATTEMPTS (e.g. after an outage), due immediately."
+    )
+    parser.add_argument("--kind", choices=["maker", "checker", "pmid"], default=None,
+                        help="Only requeue units of this kind.")
+    args = parser.parse_args()
+    if args.retry_exhausted:
+        print(f"Requeued {requeue_exhausted(args.kind)} exhausted units.\n")
+    print_queue()
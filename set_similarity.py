@@ -0,0 +1,180 @@
+import os
+import csv
+import argparse
+
+import numpy as np
+from scipy import sparse
+
+from genesets import GeneSetCollection, match_key
+
+REFERENCE_GMT = "geneset data/c5.hpo.v2025.1.Hs.entrez.gmt"
+METRICS = ["jaccard", "overlap"]
+
+# query rows multiplied against the reference per sparse product
+CHUNK_ROWS = 2048
+
+
+def to_collection(gene_sets):
+    if isinstance(gene_sets, GeneSetCollection):
+        return gene_sets
+    return GeneSetCollection.from_sets(gene_sets)
+
+
+def intersections(query, reference):
+    """
+    Intersection sizes for every pair of sets of two gene set databases
+    (GeneSetCollection or {name: set(genes)}), over their shared gene universe.
+
+    Returns (query, reference, common, n_genes): the two collections, a CSR
+    matrix of query x reference intersection sizes (pairs sharing no gene are
+    not stored) and the size of the union of both databases' genes.
+    """
+    query = to_collection(query)
+    reference = to_collection(reference)
+
+    # reference genes the query never uses get columns after the query's own
+    translate = query.translate(reference)
+    missing = translate < 0
+    translate[missing] = len(query.genes) + np.arange(missing.sum(), dtype=np.int32)
+    n_genes = len(query.genes) + int(missing.sum())
+
+    q = query.to_csr(n_genes)
+    r_t = reference.to_csr(n_genes, translate).T.tocsc()
+
+    blocks = [(q[start:start + CHUNK_ROWS] @ r_t).tocsr() for start in range(0, q.shape[0], CHUNK_ROWS)]
+    if blocks:
+        common = sparse.vstack(blocks, format="csr")
+    else:
+        common = sparse.csr_matrix((0, len(reference)), dtype=np.float32)
+    common.sort_indices()
+    return query, reference, common, n_genes
+
+
+def pair_sizes(common, query_sizes, reference_sizes):
+    """Sizes of both sets for every stored pair of an intersection matrix."""
+    rows = np.repeat(np.arange(common.shape[0]), np.diff(common.indptr))
+    return query_sizes[rows].astype(np.float64), reference_sizes[common.indices].astype(np.float64)
+
+
+def all_pairs(query, reference):
+    """
+    All-pairs Jaccard and overlap between two gene set databases.
+
+    Returns (query_names, reference_names, jaccard, overlap, common) as sparse
+    matrices of query x reference sharing one sparsity structure; pairs
+    sharing no gene are not stored.
+    Overlap is the overlap coefficient |A & B| / min(|A|, |B|).
+    """
+    query, reference, common, _ = intersections(query, reference)
+    size_a, size_b = pair_sizes(common, query.sizes(), reference.sizes())
+    inter = common.data
+
+    structure = (common.indices, common.indptr)
+    jaccard = sparse.csr_matrix(((inter / (size_a + size_b - inter)).astype(np.float32), *structure), shape=common.shape)
+    overlap = sparse.csr_matrix(((inter / np.minimum(size_a, size_b)).astype(np.float32), *structure), shape=common.shape)
+    return query.names, reference.names, jaccard, overlap, common
+
+
+def top_k(matrix, k):
+    """Per row, the column indices and scores of the k largest entries (best first)."""
+    out = []
+    for i in range(matrix.shape[0]):
+        lo, hi = matrix.indptr[i], matrix.indptr[i + 1]
+        scores = matrix.data[lo:hi]
+        cols = matrix.indices[lo:hi]
+        if len(scores) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            scores, cols = scores[part], cols[part]
+        order = np.lexsort((cols, -scores))
+        out.append((cols[order], scores[order]))
+    return out
+
+
+def self_rank(matrix, row_names, col_names):
+    """
+    Rank (1 = best) of the column for the same phenotype in each row, or None
+    if absent. Names are paired by match_key, so 'HP_SHORT_STATURE' in an
+    MSigDB GMT matches 'Short stature' in a pipeline GMT.
+    """
+    col_index = {}
+    for j, name in enumerate(col_names):
+        col_index.setdefault(match_key(name), j)
+    ranks = []
+    for i, name in enumerate(row_names):
+        j = col_index.get(match_key(name))
+        if j is None:
+            ranks.append(None)
+            continue
+        lo, hi = matrix.indptr[i], matrix.indptr[i + 1]
+        cols = matrix.indices[lo:hi]
+        scores = matrix.data[lo:hi]
+        own = scores[cols == j]
+        own = own[0] if len(own) else 0.0
+        ranks.append(int((scores > own).sum()) + 1)
+    return ranks
+
+
+def save_matrix(path, matrix, row_names, col_names):
+    """Store a sparse score matrix with its row and column names (.npz)."""
+    np.savez_compressed(
+        path,
+        data=matrix.data, indices=matrix.indices, indptr=matrix.indptr, shape=matrix.shape,
+        rows=np.asarray(row_names, dtype=object), cols=np.asarray(col_names, dtype=object),
+    )
+
+
+def write_nearest_csv(path, q_names, r_names, jaccard, overlap, common, k, metric):
+    # the three matrices come from the same product, so they share one sparsity structure
+    ranked = jaccard if metric == "jaccard" else overlap
+    ranks = self_rank(ranked, q_names, r_names)
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Gene Set Name", "Self Rank", "Rank", "Nearest Set",
+                         "# Common", "Jaccard", "Overlap"])
+        for i, (cols, _) in enumerate(top_k(ranked, k)):
+            lo, hi = ranked.indptr[i], ranked.indptr[i + 1]
+            position = dict(zip(ranked.indices[lo:hi], range(lo, hi)))
+            for rank, j in enumerate(cols, start=1):
+                pos = position[j]
+                writer.writerow([
+                    q_names[i], ranks[i] if ranks[i] is not None else "", rank, r_names[j],
+                    int(common.data[pos]), round(float(jaccard.data[pos]), 4), round(float(overlap.data[pos]), 4),
+                ])
+
+
+# main
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="All-pairs Jaccard / overlap between two GMT databases.")
+    parser.add_argument("--query_gmt", type=str, required=False,
+                        default="out/Consensus_gene_sets.gmt",
+                        help="Reconstructed gene sets (rows).")
+    parser.add_argument("--reference_gmt", type=str, required=False,
+                        default=REFERENCE_GMT,
+                        help="Database to search (columns), MSigDB HPO by default.")
+    parser.add_argument("--k", type=int, default=5, help="Nearest reference sets reported per query set.")
+    parser.add_argument("--metric", choices=METRICS, default="jaccard", help="Score used to rank neighbours.")
+    parser.add_argument("--save_matrices", action="store_true",
+                        help="Also store the full Jaccard and overlap matrices as .npz.")
+    args = parser.parse_args()
+
+    # Output directory = same directory as the query GMT
+    out_dir = os.path.join(os.path.dirname(args.query_gmt), "evaluation")
+    os.makedirs(out_dir, exist_ok=True)
+
+    query = GeneSetCollection.from_gmt(args.query_gmt)
+    reference = GeneSetCollection.from_gmt(args.reference_gmt)
+
+    q_names, r_names, jaccard, overlap, common = all_pairs(query, reference)
+    print(f"Compared {len(q_names)} x {len(r_names)} gene sets ({common.nnz} overlapping pairs)")
+
+    nearest_csv = os.path.join(out_dir, "gene_set_nearest.csv")
+    write_nearest_csv(nearest_csv, q_names, r_names, jaccard, overlap, common, args.k, args.metric)
+    print(f"- {nearest_csv}")
+
+    if args.save_matrices:
+        for name, matrix in (("jaccard", jaccard), ("overlap", overlap)):
+            path = os.path.join(out_dir, f"gene_set_{name}.npz")
+            save_matrix(path, matrix, q_names, r_names)
+            print(f"- {path}")
@@ -0,0 +1,219 @@
+import os
+import json
+import math
+import time
+import argparse
+import threading
+import contextvars
+from collections import defaultdict
+
+# One JSON record per graph node execution and per LLM call
+TRACE_FILE = os.environ.get("PIPELINE_TRACE_FILE", "out/traces/pipeline_trace.jsonl")
+
+# Ollama timing fields reported in the response metadata (durations are in nanoseconds)
+OLLAMA_METRICS = [
+    "prompt_eval_count",
+    "eval_count",
+    "total_duration",
+    "load_duration",
+    "prompt_eval_duration",
+    "eval_duration",
+]
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_write_lock = threading.Lock()
+
+
+def write_record(record, trace_file=None):
+    """Append a single trace record to the JSONL trace file."""
+    trace_file = trace_file or TRACE_FILE
+    record.setdefault("timestamp", time.time())
+    line = json.dumps(record, ensure_ascii=False)
+    with _write_lock:
+        os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+        with open(trace_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def record_http_request(count=1):
+    """Count HTTP requests against the node currently being traced."""
+    span = _current_span.get()
+    if span is not None:
+        span["http_requests"] += count
+
+
+def trace_node(stage, fn, model=None):
+    """
+    Wrap a LangGraph node so every execution writes a trace record with its
+    wall time, HTTP request count and LLM call count, tagged with phenotype,
+    gene and model.
+    """
+    def wrapper(state):
+        phenotype = state.get("phenotype", {}) or {}
+        span = {
+            "type": "node",
+            "stage": stage,
+            "phenotype": phenotype.get("name"),
+            "gene": phenotype.get("gene"),
+            "model": model,
+            "http_requests": 0,
+            "llm_calls": 0,
+        }
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            return fn(state)
+        except Exception as e:
+            span["error"] = type(e).__name__
+            raise
+        finally:
+            span["seconds"] = time.perf_counter() - start
+            _current_span.reset(token)
+            write_record(span)
+
+    return wrapper
+
+
+class TracedLLM:
+    """
+    Thin wrapper around a chat model that records every invoke() call
+    together with Ollama's token counts and durations.
+    """
+
+    def __init__(self, llm, model):
+        self.llm = llm
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def invoke(self, *args, **kwargs):
+        span = _current_span.get()
+        record = {
+            "type": "llm",
+            "stage": span["stage"] if span else None,
+            "phenotype": span["phenotype"] if span else None,
+            "gene": span["gene"] if span else None,
+            "model": self.model,
+        }
+        if span is not None:
+            span["llm_calls"] += 1
+
+        start = time.perf_counter()
+        try:
+            result = self.llm.invoke(*args, **kwargs)
+        except Exception as e:
+            record["seconds"] = time.perf_counter() - start
+            record["error"] = type(e).__name__
+            write_record(record)
+            raise
+
+        record["seconds"] = time.perf_counter() - start
+        metadata = getattr(result, "response_metadata", None) or {}
+        for key in OLLAMA_METRICS:
+            if key in metadata:
+                record[key] = metadata[key]
+        write_record(record)
+        return result
+
+
+# SUMMARY
+
+def load_trace(trace_file):
+    records = []
+    with open(trace_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # a worker killed mid-write leaves a partial last line
+                continue
+    return records
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (q in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_stages(records):
+    """p50/p95 wall time per graph node stage."""
+    by_stage = defaultdict(list)
+    http = defaultdict(int)
+    for r in records:
+        if r.get("type") == "node":
+            by_stage[r["stage"]].append(r.get("seconds", 0.0))
+            http[r["stage"]] += r.get("http_requests", 0)
+
+    return {
+        stage: {
+            "count": len(times),
+            "total": sum(times),
+            "p50": percentile(times, 50),
+            "p95": percentile(times, 95),
+            "http_requests": http[stage],
+        }
+        for stage, times in by_stage.items()
+    }
+
+
+def summarize_models(records):
+    """Call counts, token totals and prefill/decode throughput per model."""
+    stats = defaultdict(lambda: defaultdict(float))
+    for r in records:
+        if r.get("type") != "llm":
+            continue
+        s = stats[r.get("model")]
+        s["calls"] += 1
+        s["errors"] += 1 if "error" in r else 0
+        s["seconds"] += r.get("seconds", 0.0)
+        for key in OLLAMA_METRICS:
+            s[key] += r.get(key, 0) or 0
+
+    summary = {}
+    for model, s in stats.items():
+        summary[model] = {
+            "calls": int(s["calls"]),
+            "errors": int(s["errors"]),
+            "seconds": s["seconds"],
+            "prompt_tokens": int(s["prompt_eval_count"]),
+            "output_tokens": int(s["eval_count"]),
+            "prefill_tokens_per_sec": (s["prompt_eval_count"] / (s["prompt_eval_duration"] / 1e9)
+                                       if s["prompt_eval_duration"] else 0.0),
+            "decode_tokens_per_sec": (s["eval_count"] / (s["eval_duration"] / 1e9)
+                                      if s["eval_duration"] else 0.0),
+        }
+    return summary
+
+
+def print_summary(trace_file):
+    records = load_trace(trace_file)
+    print(f"Loaded {len(records)} trace records from {trace_file}\n")
+
+    print("=== STAGES ===")
+    print(f"{'stage':<20}{'count':>8}{'total s':>12}{'p50 s':>10}{'p95 s':>10}{'http':>8}")
+    for stage, s in sorted(summarize_stages(records).items()):
+        print(f"{stage:<20}{s['count']:>8}{s['total']:>12.1f}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['http_requests']:>8}")
+
+    print("\n=== MODELS ===")
+    print(f"{'model':<20}{'calls':>8}{'errors':>8}{'prompt tok':>12}{'output tok':>12}{'prefill tok/s':>15}{'decode tok/s':>14}")
+    for model, s in sorted(summarize_models(records).items(), key=lambda x: str(x[0])):
+        print(f"{str(model):<20}{s['calls']:>8}{s['errors']:>8}{s['prompt_tokens']:>12}{s['output_tokens']:>12}"
+              f"{s['prefill_tokens_per_sec']:>15.1f}{s['decode_tokens_per_sec']:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize pipeline trace records.")
+    parser.add_argument(
+        "--trace_file", type=str, default=TRACE_FILE,
+        help="Path to the JSONL trace file written by the pipelines."
+    )
+    args = parser.parse_args()
+    print_summary(args.trace_file)
@@ -1,40 +1,29 @@
 import operator
 from typing_extensions import TypedDict
-from typing import List, Annotated
-### LLM
-from langchain_ollama import ChatOllama
+from typing import Any, List, Annotated
 import re
 import json
-import mygene
 import os
 import csv
 from collections import defaultdict
-
-# legacy graph state
-# class GraphState(TypedDict):
-#     """
-#     Graph state is a dictionary that contains information we want to propagate to, and modify in, each graph node.
-#     """
-
-#     question: str  # User question
-#     generation: str  # LLM generation
-#     max_retries: int  # Max number of retries for answer generation
-#     answers: int  # Number of answers generated
-#     loop_step: Annotated[int, operator.add]
-#     documents: List[str]  # List of retrieved documents
-
-class GraphState(TypedDict):
-    """
-    Graph state is a dictionary that contains information we want to propagate to, and modify in, each graph node.
-    """
-
-    phenotype: dict  # User question
-    documents: list
-    generation: list  # LLM generation
-    # max_retries: int  # Max number of retries for answer generation
-    # answers: int  # Number of answers generated
-    # loop_step: Annotated[int, operator.add]
-    # documents: List[str]  # List of retrieved documents
+from tracing import TracedLLM
+from retry_queue import BreakerLLM
+
+# Models used by each pipeline (mirrors create_control_flow in the pipelines)
+MAKER_MODELS = ["qwen3:32b", "deepseek-r1:8b", "llama3.1:8b"]
+CHECKER_MODELS = ["llama3.1:8b"]
+
+# Graph state is a dictionary that contains information we want to propagate to, and modify in, each graph node.
+# LangGraph only keeps declared keys, so every per-model key the grade and
+# generate nodes return ("documents_<model>", "generation_<model>") is declared
+# (the model names contain ":" and ".", hence the functional TypedDict syntax).
+GraphState = TypedDict("GraphState", {
+    "phenotype": dict,  # User question
+    "documents": list,
+    "generation": list,  # LLM generation
+    **{f"documents_{m}": list for m in MAKER_MODELS + CHECKER_MODELS},
+    **{f"generation_{m}": Any for m in MAKER_MODELS + CHECKER_MODELS},
+})
 
 # Post-processing
 def format_docs(docs):
@@ -48,15 +37,22 @@ def format_json_docs(docs):
 # llm = ChatOllama(model=local_llm, temperature=0)
 # llm_json_mode = ChatOllama(model=local_llm, temperature=0, format="json")
 
+# Sampling options shared by every pipeline call (also part of the output input-hashes)
+LLM_OPTIONS = {"temperature": 0}
+
 def get_llm(local_llm="llama3.1:8b"):
-    llm = ChatOllama(model=local_llm, temperature=0)
-    return llm
+    from langchain_ollama import ChatOllama
+    llm = ChatOllama(model=local_llm, **LLM_OPTIONS)
+    return TracedLLM(BreakerLLM(llm), local_llm)
 
 def get_llm_json_mode(local_llm="llama3.1:8b"):
-    llm_json_mode = ChatOllama(model=local_llm, temperature=0, format="json")
-    return llm_json_mode
+    from langchain_ollama import ChatOllama
+    llm_json_mode = ChatOllama(model=local_llm, format="json", **LLM_OPTIONS)
+    return TracedLLM(BreakerLLM(llm_json_mode), local_llm)
 
 def write_gmt(file_path, gene_sets):
+    # resolve every gene once up front (one remote query for all misses)
+    prefetch_ids([g for genes in gene_sets.values() for g in genes])
     with open(file_path, "a") as file:
         for gene_set, genes in gene_sets.items():
             entrez_genes, _, _ = id_mapping(genes)
@@ -66,32 +62,138 @@ def write_gmt(file_path, gene_sets):
 
 def load_gmt(filepath):
     """Load a GMT file into a dict: {gene_set_name: set(genes)}"""
-    gene_sets = {}
-    with open(filepath) as f:
-        for line in f:
-            parts = line.strip().split('\t')
-            if len(parts) > 2:
-                gene_sets[parts[0]] = set(parts[2:])
-    return gene_sets
+    from genesets import load_gene_sets
+    return load_gene_sets(filepath, skip_empty=True)
+
+
+# Gene ID resolution
+# The bundled MSigDB GMTs are line- and column-aligned (symbol i <-> Entrez i),
+# which gives a local symbol <-> Entrez dictionary. Past remote lookups,
+# including misses, are kept in a persistent cache.
+MSIGDB_SYMBOLS_GMT = "geneset data/c5.hpo.v2025.1.Hs.symbols.gmt"
+MSIGDB_ENTREZ_GMT = "geneset data/c5.hpo.v2025.1.Hs.entrez.gmt"
+GENE_ID_CACHE_FILE = "out/gene_id_cache.json"
+
+_local_ids = None
+_id_cache = None
+
+
+def _load_local_ids():
+    """Build {mode: {QUERY: id}} from the aligned MSigDB symbol and Entrez GMTs."""
+    global _local_ids
+    if _local_ids is not None:
+        return _local_ids
+
+    symbol_to_entrez = {}
+    entrez_to_symbol = {}
+    if os.path.exists(MSIGDB_SYMBOLS_GMT) and os.path.exists(MSIGDB_ENTREZ_GMT):
+        from genesets import GeneSetCollection
+        symbols = GeneSetCollection.from_gmt(MSIGDB_SYMBOLS_GMT)
+        entrez = GeneSetCollection.from_gmt(MSIGDB_ENTREZ_GMT)
+        entrez_sizes = entrez.sizes()
+        for i, name in enumerate(symbols.names):
+            sym_ids = symbols.members[symbols.offsets[i]:symbols.offsets[i + 1]]
+            if i >= len(entrez) or entrez.names[i] != name or entrez_sizes[i] != len(sym_ids):
+                print(f"Skipping misaligned gene set {name} while building local ID map")
+                continue
+            ent_ids = entrez.members[entrez.offsets[i]:entrez.offsets[i + 1]]
+            for sym, ent in zip(symbols.decode(sym_ids), entrez.decode(ent_ids)):
+                symbol_to_entrez.setdefault(sym.upper(), ent)
+                entrez_to_symbol.setdefault(ent, sym)
 
-def id_mapping(genes, mode='entrezgene'):
+    # an Entrez ID queried for its Entrez ID maps to itself
+    for ent in entrez_to_symbol:
+        symbol_to_entrez.setdefault(ent, ent)
+
+    _local_ids = {"entrezgene": symbol_to_entrez, "symbol": entrez_to_symbol}
+    return _local_ids
+
+
+def _load_id_cache():
+    global _id_cache
+    if _id_cache is None:
+        if os.path.exists(GENE_ID_CACHE_FILE):
+            with open(GENE_ID_CACHE_FILE, "r") as f:
+                _id_cache = json.load(f)
+        else:
+            _id_cache = {}
+        _id_cache.setdefault("entrezgene", {})
+        _id_cache.setdefault("symbol", {})
+    return _id_cache
+
+
+def _save_id_cache():
+    os.makedirs(os.path.dirname(GENE_ID_CACHE_FILE), exist_ok=True)
+    tmp = GENE_ID_CACHE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(_id_cache, f, indent=2)
+    os.replace(tmp, GENE_ID_CACHE_FILE)
+
+
+def _lookup_local(gene, mode):
+    """Return (found, id); id is None for a cached miss."""
+    local = _load_local_ids()
+    entrez = local["entrezgene"].get(gene.upper())
+    if mode == "entrezgene" and entrez is not None:
+        return True, entrez
+    if mode == "symbol":
+        if gene in local["symbol"]:
+            return True, local["symbol"][gene]
+        if entrez is not None and entrez in local["symbol"]:
+            return True, local["symbol"][entrez]
+    cache = _load_id_cache()[mode]
+    if gene in cache:
+        return True, cache[gene]
+    return False, None
+
+
+def _query_remote(genes, mode):
+    """One bulk mygene query for genes not resolvable locally; results are cached."""
+    import mygene
     mg = mygene.MyGeneInfo()
-    out = []
-    if mode =='entrezgene':
-        out = mg.querymany(genes, scopes='symbol,reporter,accession,entrezgene', fields='entrezgene', species='human')
-    elif mode == 'symbol':
-        out = mg.querymany(genes, scopes='symbol,reporter,accession,entrezgene', fields='symbol', species='human')
+    out = mg.querymany(genes, scopes='symbol,reporter,accession,entrezgene', fields=mode,
+                       species='human', verbose=False)
+
+    cache = _load_id_cache()[mode]
+    resolved = {}
+    for gene_info in out:
+        query = gene_info["query"]
+        if "notfound" in gene_info or mode not in gene_info:
+            resolved.setdefault(query, None)
+        elif resolved.get(query) is None:
+            # keep the best-scoring hit when a query has several
+            resolved[query] = str(gene_info[mode])
+    for gene in genes:
+        cache[gene] = resolved.get(gene)
+    _save_id_cache()
+
+
+def prefetch_ids(genes, mode='entrezgene'):
+    """Resolve all genes not known locally with a single remote query."""
+    missing = sorted({g for g in genes if g and not _lookup_local(g, mode)[0]})
+    if missing:
+        print(f"Resolving {len(missing)} genes not found locally via mygene")
+        _query_remote(missing, mode)
+
+
+def id_mapping(genes, mode='entrezgene'):
+    """
+    Map gene symbols to Entrez IDs (mode='entrezgene') or Entrez IDs to symbols
+    (mode='symbol'). Returns (mapped_genes, valid_genes, invalid_genes), where
+    mapped_genes[i] is the ID for valid_genes[i].
+    """
+    prefetch_ids(genes, mode)
+
     valid_genes = []
     mapped_genes = []
     invalid_genes = []
-    for gene_info in out:
-        if "notfound" in gene_info:
-            # print("got here")
-            invalid_genes.append(gene_info["query"])
+    for gene in genes:
+        _, mapped = _lookup_local(gene, mode)
+        if mapped is None:
+            invalid_genes.append(gene)
         else:
-            valid_genes.append(gene_info["query"])
-            if 'entrezgene' in gene_info:
-                mapped_genes.append(gene_info[mode])
+            valid_genes.append(gene)
+            mapped_genes.append(mapped)
     return mapped_genes, valid_genes, invalid_genes
 
 def parse_out_json(content):
@@ -148,16 +250,6 @@ def phenotype_json_reader(json_file, attributes=["name", "definition", "synonyms
 import re
 import json
 
-def clean_model_output(raw_output: str):
-    # Remove <think>...</think> sections
-    cleaned = re.sub(r"<think>.*?</think>", "", raw_output, flags=re.DOTALL)
-    # Also remove any stray markdown or code fences
-    cleaned = cleaned.strip().replace("```json", "").replace("```", "").strip()
-    return cleaned
-
-
-
-
 # Reads a 'phenotypes-to-genes' txt file and creates a phenotype-to-gene-sets file.
 def build_phenotype_to_gene_sets(input_file: str, output_file: str):
     
@@ -203,18 +295,8 @@ def compare_to_phenotypes_msigdb(phenotype_file, hpo_db_file):
 
 
     # --- Load MSigDB HPO gene set database ---
-    db_gene_sets = set()
-    db_full = {}
-
-    with open(hpo_db_file, "r", encoding="utf-8") as f:
-        for line in f:
-            parts = line.strip().split("\t")
-            if not parts:
-                continue
-            gs_name = parts[0].strip()
-            # gs_name = parts[0].strip('HP_')
-            db_gene_sets.add(gs_name)
-            db_full[gs_name] = parts[1:]  # keep the rest if needed
+    from genesets import GeneSetCollection
+    db_gene_sets = set(GeneSetCollection.from_gmt(hpo_db_file).names)
     print(list(phenotype_names)[:2])
 
     print(list(db_gene_sets)[:2])
@@ -257,25 +339,11 @@ def read_gmt(file_path):
     Cleans gene set names such as 'HP_11_PAIRS_OF_RIBS' → '11 pairs of ribs'.
     This must match the phenotype['name'] used in the maker pipeline.
     """
-    gene_sets = {}
-    with open(file_path, "r") as f:
-        for line in f:
-            parts = line.strip().split("\t")
-            if len(parts) < 3:
-                continue
-            raw_name = parts[0]
-            cleaned_name = (
-                raw_name.replace("HP_", "")
-                        .replace("MP_", "")
-                        .replace("_", " ")
-                        .strip()
-                        .capitalize()
-            )
-            genes = parts[2:]
-            gene_sets[cleaned_name] = genes
-    return gene_sets
+    from genesets import load_gene_sets, clean_name
+    return load_gene_sets(file_path, name_fn=clean_name, as_sets=False, skip_empty=True)
 
 def read_phenotype_to_gene_sets(file_path):
+    from genesets import clean_name
     gene_sets = {}
     with open(file_path, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f, delimiter="\t")
@@ -283,12 +351,5 @@ def read_phenotype_to_gene_sets(file_path):
             hpo_id = row["hpo_id"].strip()
             hpo_name = row["hpo_name"].strip()
             genes = [gene.strip() for gene in row["genes"].split(",") if gene.strip()]
-            cleaned_name = (
-                hpo_name.replace("HP_", "")
-                        .replace("MP_", "")
-                        .replace("_", " ")
-                        .strip()
-                        .capitalize()
-            )
-            gene_sets[cleaned_name] = genes
+            gene_sets[clean_name(hpo_name)] = genes
     return gene_sets
\ No newline at end of file